@@ -2,17 +2,33 @@
 Main pipeline for synthetic data generation
 Replicates Meta's Llama Synthetic Data Kit functionality using AWS Bedrock Claude Sonnet
 """
+import argparse
+import sys
 import yaml
 import logging
 import json
 from pathlib import Path
+from typing import Optional
 
 from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
 from synthetic_data_kit.ingest.pdf_parser import PDFParser
 from synthetic_data_kit.utils.chunker import chunk_text
+from synthetic_data_kit.create.allocator import allocate_uniform
 from synthetic_data_kit.create.qa_generator import Generator
 from synthetic_data_kit.create.tool_use_generator import ToolUseGenerator
-from synthetic_data_kit.curate.judge import QualityCurator
+from synthetic_data_kit.create.summarizer import DocumentSummarizer
+from synthetic_data_kit.curate.cascade import CascadedCurator
+from synthetic_data_kit.curate.tool_judge import ToolUseCurator
+from synthetic_data_kit.curate.analytics import RatingArrays, build_report, write_report
+from synthetic_data_kit.curate.yield_controller import YieldController
+from synthetic_data_kit.pipeline.document_stream import DocumentStream
+from synthetic_data_kit.pipeline.incremental import IncrementalPipeline, write_final_dataset
+from synthetic_data_kit.pipeline.sharding import Shard, ShardMerger, shard_config
+from synthetic_data_kit.utils.checkpoint import JournalSet
+from synthetic_data_kit.utils.json_parser import get_parse_stats
+from synthetic_data_kit.utils.json_repair import JSONRepairer
+from synthetic_data_kit.utils.question_index import QuestionIndex, group_by_source
+from synthetic_data_kit.utils.scheduler import PriorityScheduler
 
 # Setup logging
 logging.basicConfig(
@@ -28,6 +44,50 @@ def load_config(config_path: str = "configs/config.yaml"):
         return yaml.safe_load(f)
 
 
+# One append-only checkpoint journal per paid stage
+JOURNAL_STAGES = ["qa", "cot", "tool_use", "curate_qa", "curate_cot", "curate_tool_use"]
+
+
+def parse_args():
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="Synthetic data generation pipeline")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Replay checkpointed work from the previous run and only issue missing calls",
+    )
+    parser.add_argument(
+        "--recurate",
+        action="store_true",
+        help="Rewrite curated files from stored ratings without generating or judging anything",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Override curate.threshold (combined score a pair needs to be kept)",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Show which incremental build steps would rebuild and why, without running them",
+    )
+    parser.add_argument(
+        "--shard",
+        default=None,
+        metavar="I/N",
+        help="Process only shard I of N (documents partitioned by file-name hash); outputs go to data/shards/",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Merge the final datasets of all N shards with global dedup, without generating anything",
+    )
+    return parser.parse_args()
+
+
 def main():
     """
     Main pipeline that processes PDFs and generates synthetic training data for LLM fine-tuning
@@ -44,9 +104,23 @@ def main():
     # INITIALIZATION
     # ═══════════════════════════════════════════════════════════════
     
+    args = parse_args()
+
     # Load configuration
     config = load_config()
     logger.info("✓ Loaded configuration from configs/config.yaml")
+    if args.threshold is not None:
+        config["curate"]["threshold"] = args.threshold
+
+    if args.merge_shards is not None:
+        ShardMerger(config, args.merge_shards).merge()
+        return
+
+    # A shard keeps its outputs, rating store and caches under data/shards/<shard>
+    shard = Shard.parse(args.shard) if args.shard else None
+    if shard is not None:
+        config = shard_config(config, shard)
+        logger.info(f"✓ Running {shard.name}")
 
     # Initialize Bedrock provider
     provider = BedrockProvider(
@@ -55,11 +129,92 @@ def main():
     )
     logger.info(f"✓ Initialized Bedrock provider ({config['bedrock']['model']})")
 
+    # Optional cheap-model repair pass for malformed JSON, shared by every stage
+    repairer = JSONRepairer.from_config(config)
+    if repairer is not None:
+        logger.info(f"✓ JSON repair enabled ({config['repair']['model']})")
+
+    if args.recurate:
+        recurate(config, provider, repairer)
+        return
+
     # Setup directories with fallbacks
     input_dir = Path(config.get("data", {}).get("input_dir", "data/input"))
     output_dir = Path(config.get("data", {}).get("output_dir", "data"))
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    # A dry run: no journals are opened and no build state is written
+    if args.explain:
+        explain_incremental(config, provider, repairer, input_dir, output_dir, shard=shard)
+        return
+
+    # Crash-safe journals: every completed chunk/batch is fsynced as it finishes
+    journals = JournalSet(output_dir / "checkpoints", JOURNAL_STAGES, resume=args.resume)
+    if args.resume:
+        logger.info(f"✓ Resuming from checkpoints in {journals.checkpoint_dir}")
+
+    # One worker pool for every model call, sized to the Bedrock quota
+    scheduler = PriorityScheduler.from_config(config)
+    if scheduler is not None:
+        logger.info(f"✓ Shared scheduler: {scheduler.max_concurrency} concurrent requests")
+
+    try:
+        if config.get("pipeline", {}).get("mode") == "incremental":
+            run_incremental(config, provider, repairer, journals, input_dir, output_dir,
+                            shard=shard, scheduler=scheduler)
+        else:
+            run_pipeline(config, provider, repairer, journals, input_dir, output_dir, shard=shard,
+                         scheduler=scheduler)
+    except KeyboardInterrupt:
+        journals.close()
+        logger.warning("⚠️ Interrupted. Completed work is checkpointed; rerun with --resume to continue.")
+        sys.exit(130)
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown(wait=False, cancel_futures=True)
+        journals.close()
+
+
+def recurate(config, provider, repairer):
+    """Re-apply the curation thresholds to every stored run of the current judge prompts"""
+    curators = [
+        CascadedCurator.from_config(provider, config, repairer=repairer),
+        ToolUseCurator(provider, config, repairer=repairer),
+    ]
+    runs = [(curator, run) for curator in curators
+            for run in curator.rating_store.runs(curator.prompt_version, curator.accept_version)]
+    if not runs:
+        logger.warning(f"⚠️ No stored ratings for the current judge prompts in {curators[0].rating_store.path}")
+        return
+    for curator, (source, generation_type) in runs:
+        _, metrics = curator.recurate(source, generation_type, collect=False)
+        logger.info(f"✓ Re-curated {source} {generation_type}: {metrics['kept']}/{metrics['total']} kept "
+                    f"at threshold {metrics['threshold']}")
+
+
+def generate_per_document(qa_generator, documents, summaries, num_pairs, generation_type, journal):
+    """Split the pair budget evenly across documents and generate from each under its own name"""
+    pairs = []
+    for (name, text), budget in zip(documents.items(), allocate_uniform(len(documents), num_pairs)):
+        if budget:
+            pairs.extend(qa_generator.process_document(
+                text=text,
+                num_pairs=budget,
+                generation_type=generation_type,
+                journal=journal,
+                source=name,
+                summary=summaries.get(name),
+            ))
+    return pairs
+
+
+def run_stages(config, journals, pdf_files, summarizer, qa_generator, curator):
+    """Ingest every PDF, then generate QA and CoT pairs, one step after another"""
+    # With a curated target, generation and judging run together until it is met
+    yield_controller = YieldController.from_config(config)
+    target_qa = config["curate"].get("target_qa_pairs")
+    target_cot = config["curate"].get("target_cot_pairs")
+
     # ═══════════════════════════════════════════════════════════════
     # STEP 1: PDF INGESTION AND PARSING
     # ═══════════════════════════════════════════════════════════════
@@ -68,10 +223,9 @@ def main():
     logger.info("=" * 50)
 
     pdf_parser = PDFParser()
+    documents = {}
     all_chunks = {}
-
-    pdf_files = list(input_dir.glob("*.pdf"))
-    logger.info(f"Found {len(pdf_files)} PDF(s).")
+    summaries = {}
 
     for pdf_path in pdf_files:
         logger.info(f"\nProcessing {pdf_path.name}")
@@ -79,6 +233,7 @@ def main():
         # Parse PDF to extract text
         text = pdf_parser.parse(str(pdf_path))
         logger.info(f"Extracted {len(text)} characters")
+        documents[pdf_path.stem] = text
 
         # Chunk text for processing
         chunks = chunk_text(
@@ -90,6 +245,10 @@ def main():
 
         all_chunks[pdf_path.stem] = chunks
 
+        # One cached summary per document, used as compact global context
+        if summarizer is not None:
+            summaries[pdf_path.stem] = summarizer.summarize(text)
+
         # Save parsed text for reference
         parsed_dir = Path("data/parsed")
         parsed_dir.mkdir(parents=True, exist_ok=True)
@@ -103,6 +262,11 @@ def main():
 
     logger.info(f"\nTotal chunks across all PDFs: {len(all_combined_chunks)}")
 
+    # Each chunk's own document summary, aligned with all_combined_chunks
+    chunk_summaries = [summaries.get(name) for name, chunks in all_chunks.items() for _ in chunks]
+    if summarizer is not None:
+        logger.info(f"✓ Document summaries: {summarizer.cache_hits} cached, {summarizer.cache_misses} generated")
+
     # ═══════════════════════════════════════════════════════════════
     # STEP 2: QA PAIR GENERATION
     # ═══════════════════════════════════════════════════════════════
@@ -110,15 +274,23 @@ def main():
     logger.info("STEP 2: QA Generation")
     logger.info("=" * 50)
 
-    qa_generator = Generator(provider, config)
     num_qa_questions = config["generation"]["num_qa_pairs"]
 
+    curated_qa = curated_cot = None
+    qa_metrics = cot_metrics = None
+
     # Generate QA pairs from combined document content
-    qa_pairs = qa_generator.process_document(
-        text="\n".join(all_combined_chunks),
-        num_pairs=num_qa_questions,
-        generation_type="qa",
-    )
+    if target_qa:
+        qa_pairs, curated_qa, qa_metrics = yield_controller.generate_curated(
+            qa_generator, curator, documents, target_qa,
+            generation_type="qa", pdf_name="combined",
+            generation_journal=journals["qa"], curation_journal=journals["curate_qa"],
+            summaries=summaries,
+        )
+    else:
+        qa_pairs = generate_per_document(
+            qa_generator, documents, summaries, num_qa_questions, "qa", journals["qa"]
+        )
     qa_generator.save_pairs(qa_pairs, "combined", generation_type="qa")
     logger.info(f"✓ Generated {len(qa_pairs)} QA pairs")
 
@@ -132,13 +304,111 @@ def main():
     num_cot_questions = config["generation"]["num_cot_pairs"]
 
     # Generate COT pairs with reasoning steps
-    cot_pairs = qa_generator.process_document(
-        text="\n".join(all_combined_chunks),
-        num_pairs=num_cot_questions,
-        generation_type="cot",
-    )
+    if target_cot:
+        cot_pairs, curated_cot, cot_metrics = yield_controller.generate_curated(
+            qa_generator, curator, documents, target_cot,
+            generation_type="cot", pdf_name="combined",
+            generation_journal=journals["cot"], curation_journal=journals["curate_cot"],
+            summaries=summaries,
+        )
+    else:
+        cot_pairs = generate_per_document(
+            qa_generator, documents, summaries, num_cot_questions, "cot", journals["cot"]
+        )
     qa_generator.save_pairs(cot_pairs, "combined", generation_type="cot")
     logger.info(f"✓ Generated {len(cot_pairs)} COT pairs")
+    if qa_generator.deduplicator is not None:
+        logger.info(f"✓ Duplicate filter: {qa_generator.deduplicator.stats}")
+
+    return (all_combined_chunks, chunk_summaries, qa_pairs, cot_pairs,
+            curated_qa, curated_cot, qa_metrics, cot_metrics)
+
+
+def run_streaming(config, journals, pdf_files, summarizer, qa_generator, curator):
+    """Parse, generate and judge every PDF concurrently through bounded queues"""
+    logger.info("\n" + "=" * 50)
+    logger.info("STEPS 1-3: Streaming Ingestion, Generation and Curation")
+    logger.info("=" * 50)
+
+    stream = DocumentStream(config, qa_generator, curator, summarizer=summarizer, journals=journals)
+    stage_stats = stream.run(pdf_files)
+    logger.info(f"✓ Streaming stages: {stage_stats}")
+    logger.info(f"✓ First curated pair after {stage_stats['sink']['first_output_seconds']}s")
+
+    all_combined_chunks = [chunk for f in pdf_files for chunk in stream.chunks.get(f.stem, [])]
+    chunk_summaries = [stream.summaries.get(f.stem) for f in pdf_files for _ in stream.chunks.get(f.stem, [])]
+    qa_pairs, cot_pairs = stream.generated["qa"], stream.generated["cot"]
+    qa_generator.save_pairs(qa_pairs, "combined", generation_type="qa")
+    qa_generator.save_pairs(cot_pairs, "combined", generation_type="cot")
+    if qa_generator.deduplicator is not None:
+        logger.info(f"✓ Duplicate filter: {qa_generator.deduplicator.stats}")
+
+    return (all_combined_chunks, chunk_summaries, qa_pairs, cot_pairs,
+            stream.curated["qa"], stream.curated["cot"], stream.metrics("qa"), stream.metrics("cot"))
+
+
+def explain_incremental(config, provider, repairer, input_dir: Path, output_dir: Path,
+                        shard: Optional[Shard] = None):
+    """Report which steps an incremental build would rebuild and why, without building"""
+    graph = IncrementalPipeline(config, provider, repairer, None, input_dir, output_dir,
+                                shard=shard, dry_run=True).graph()
+    for decision in graph.explain():
+        logger.info(f"{decision['step']:<10} {decision['status']:<13} {decision['reason']}")
+
+
+def run_incremental(config, provider, repairer, journals, input_dir: Path, output_dir: Path,
+                    shard: Optional[Shard] = None, scheduler: Optional[PriorityScheduler] = None):
+    """Rebuild only the steps whose inputs or config changed since the last build"""
+    graph = IncrementalPipeline(config, provider, repairer, journals, input_dir, output_dir,
+                                shard=shard, scheduler=scheduler).graph()
+    values = graph.build()
+    rebuilt = [d["step"] for d in graph.decisions if d["status"] == "rebuilt"]
+    logger.info("\n" + "=" * 50)
+    logger.info("INCREMENTAL BUILD COMPLETE - SUMMARY")
+    logger.info("=" * 50)
+    logger.info(f"🔁 Rebuilt: {', '.join(rebuilt) or 'nothing'}")
+    logger.info(f"📊 Curated examples: {values['final']['counts']}")
+    if scheduler is not None:
+        logger.info(f"🚦 Scheduler: {scheduler.summary()}")
+    logger.info(f"💾 Checkpoints: {journals.summary()}")
+
+
+def run_pipeline(config, provider, repairer, journals, input_dir: Path, output_dir: Path,
+                 shard: Optional[Shard] = None, scheduler: Optional[PriorityScheduler] = None):
+    """Run ingestion, generation, tool-use, curation and compilation steps"""
+    pdf_files = list(input_dir.glob("*.pdf"))
+    if shard is not None:
+        pdf_files = shard.select(pdf_files)
+    logger.info(f"Found {len(pdf_files)} PDF(s).")
+    summarizer = DocumentSummarizer.from_config(provider, config)
+
+    # Cross-run index of already-curated questions, bootstrapped from data/curated
+    question_index = QuestionIndex.from_config(config)
+    if question_index is not None and not question_index.documents():
+        indexed = question_index.build_from_curated(str(output_dir / "curated"))
+        logger.info(f"✓ Built question index from {indexed} curated pairs")
+
+    # Judge batches run ahead of generation on the shared scheduler, so unjudged pairs do not pile up
+    judge_executor = scheduler.lane("judge") if scheduler is not None else None
+    qa_generator = Generator(provider, config, repairer=repairer, question_index=question_index, executor=scheduler)
+    curator = CascadedCurator.from_config(provider, config, repairer=repairer, executor=judge_executor)
+
+    # Curated targets need the generate-then-judge loop, which runs step by step
+    streaming = config.get("pipeline", {}).get("mode", "stages") == "streaming"
+    if streaming and (config["curate"].get("target_qa_pairs") or config["curate"].get("target_cot_pairs")):
+        logger.info("Curated targets are set; running stage by stage instead of streaming")
+        streaming = False
+
+    if streaming:
+        (all_combined_chunks, chunk_summaries, qa_pairs, cot_pairs,
+         curated_qa, curated_cot, qa_metrics, cot_metrics) = run_streaming(
+            config, journals, pdf_files, summarizer, qa_generator, curator
+        )
+    else:
+        (all_combined_chunks, chunk_summaries, qa_pairs, cot_pairs,
+         curated_qa, curated_cot, qa_metrics, cot_metrics) = run_stages(
+            config, journals, pdf_files, summarizer, qa_generator, curator
+        )
 
     # ═══════════════════════════════════════════════════════════════
     # STEP 4: TOOL-USE CONVERSATION GENERATION
@@ -149,7 +419,11 @@ def main():
         logger.info("=" * 50)
 
         try:
-            tool_use_generator = ToolUseGenerator(provider)
+            tool_use_generator = ToolUseGenerator.from_config(
+                provider, config, repairer=repairer,
+                executor=scheduler.lane("tool_use") if scheduler is not None else None,
+            )
+            tool_executor = tool_use_generator.tool_executor
             queries_per_chunk = config["tool_use"].get("queries_per_chunk", 3)
 
             # Limit chunks to avoid excessive API calls
@@ -160,6 +434,8 @@ def main():
             tool_examples = tool_use_generator.generate_from_chunks(
                 chunks=selected_chunks,
                 queries_per_chunk=queries_per_chunk,
+                journal=journals["tool_use"],
+                summaries=chunk_summaries[:max_chunks_for_tools],
             )
 
             # Save tool-use examples
@@ -171,6 +447,12 @@ def main():
                     f.write(json.dumps(example) + "\n")
 
             logger.info(f"✓ Generated {len(tool_examples)} tool-calling conversation examples")
+            if tool_use_generator.mode == "single_call":
+                logger.info(f"✓ Single-call results: {tool_use_generator.single_call_stats}")
+            logger.info(f"✓ Tool-use step latency (s): {tool_use_generator.step_latency}")
+            if tool_executor is not None:
+                logger.info(f"✓ Real tool results: {tool_use_generator.real_tool_stats}")
+                logger.info(f"✓ Tool executor: {tool_executor.summary()}")
             logger.info(f"✓ Saved to {tool_output_file}")
             
             # Also save as regular JSON for easier inspection
@@ -193,16 +475,44 @@ def main():
     logger.info("STEP 5: Quality Curation")
     logger.info("=" * 50)
 
-    curator = QualityCurator(provider, config)
-
-    # Curate QA pairs
-    curated_qa, qa_metrics = curator.curate(qa_pairs, "combined", "qa")
+    # Curate QA pairs (already done alongside generation when a target is set)
+    if curated_qa is None:
+        curated_qa, qa_metrics = curator.curate(
+            qa_pairs, "combined", "qa", journal=journals["curate_qa"], sources=qa_generator.chunk_texts
+        )
     logger.info(f"✓ QA curation complete: {len(curated_qa)}/{len(qa_pairs)} pairs kept")
 
     # Curate COT pairs
-    curated_cot, cot_metrics = curator.curate(cot_pairs, "combined", "cot")
+    if curated_cot is None:
+        curated_cot, cot_metrics = curator.curate(
+            cot_pairs, "combined", "cot", journal=journals["curate_cot"], sources=qa_generator.chunk_texts
+        )
     logger.info(f"✓ COT curation complete: {len(curated_cot)}/{len(cot_pairs)} pairs kept")
 
+    # Curate tool-use conversations, several per judge call
+    tool_use_metrics = None
+    if tool_examples:
+        tool_curator = ToolUseCurator(provider, config, repairer=repairer, executor=judge_executor)
+        curated_tool_use, tool_use_metrics = tool_curator.curate(
+            tool_examples, "combined", "tool_use", journal=journals["curate_tool_use"]
+        )
+        logger.info(f"✓ Tool-use curation complete: {len(curated_tool_use)}/{len(tool_examples)} conversations kept")
+    else:
+        curated_tool_use = []
+
+    # Score distributions and a threshold sweep over everything rated by this judge prompt
+    report = build_report(RatingArrays.from_store(curator.rating_store, curator.prompt_version,
+                                                  curator.accept_version), curator.threshold)
+    write_report(report, str(output_dir / "reports" / "curation"))
+    logger.info(f"✓ Curation report: {output_dir / 'reports' / 'curation.json'}")
+
+    # Remember what was curated so the next run asks new questions
+    if question_index is not None:
+        for doc, pairs in group_by_source(curated_qa + curated_cot).items():
+            question_index.add(doc, pairs)
+        question_index.save()
+        logger.info(f"✓ Question index updated ({qa_generator.skipped_saturated} saturated chunks skipped)")
+
     # ═══════════════════════════════════════════════════════════════
     # STEP 6: FINAL DATASET COMPILATION
     # ═══════════════════════════════════════════════════════════════
@@ -210,25 +520,15 @@ def main():
     logger.info("STEP 6: Final Dataset Compilation")
     logger.info("=" * 50)
 
-    # Create final training dataset
-    final_dataset = {
-        "qa_pairs": curated_qa,
-        "cot_pairs": curated_cot,
-        "tool_use_conversations": tool_examples,
-        "metadata": {
-            "source_pdfs": [f.name for f in pdf_files],
-            "total_chunks": len(all_combined_chunks),
-            "generation_config": config["generation"],
-            "qa_metrics": qa_metrics,
-            "cot_metrics": cot_metrics
-        }
-    }
-
-    # Save final compiled dataset
     final_dataset_file = output_dir / "final_training_dataset.json"
-    with open(final_dataset_file, "w") as f:
-        json.dump(final_dataset, f, indent=2)
-
+    write_final_dataset(
+        final_dataset_file,
+        {"qa": curated_qa, "cot": curated_cot, "tool_use": curated_tool_use},
+        {"qa": qa_metrics, "cot": cot_metrics, "tool_use": tool_use_metrics},
+        [f.name for f in pdf_files],
+        len(all_combined_chunks),
+        config,
+    )
     logger.info(f"✓ Final training dataset saved to {final_dataset_file}")
 
     # ═══════════════════════════════════════════════════════════════
@@ -241,9 +541,24 @@ def main():
     logger.info(f"📝 Total chunks: {len(all_combined_chunks)}")
     logger.info(f"❓ QA pairs: {len(qa_pairs)} → curated: {len(curated_qa)}")
     logger.info(f"🧠 COT pairs: {len(cot_pairs)} → curated: {len(curated_cot)}")
-    logger.info(f"🔧 Tool-use examples: {len(tool_examples)}")
+    logger.info(f"🔧 Tool-use examples: {len(tool_examples)} → curated: {len(curated_tool_use)}")
     logger.info(f"💾 Final dataset: {final_dataset_file}")
-    logger.info(f"📊 Total training examples: {len(curated_qa) + len(curated_cot) + len(tool_examples)}")
+    logger.info(f"📊 Total training examples: {len(curated_qa) + len(curated_cot) + len(curated_tool_use)}")
+    logger.info(f"🧩 JSON recovery paths: {get_parse_stats()}")
+    logger.info(f"⚖️  Judge re-rating: {curator.judge_stats}")
+    if isinstance(curator, CascadedCurator):
+        cascade = curator.cascade_summary()
+        logger.info(f"🪜 Judge cascade: {cascade}")
+        if cascade["estimated_cost_saved"] < 0:
+            logger.warning(f"⚠️ The judge cascade cost more than rating every pair with the strong model "
+                           f"({cascade['escalation_rate']:.0%} escalated); narrow cascade.band or disable the cascade")
+    if curator.accept_version is not None:
+        logger.info(f"🔎 Pre-filter auto-accept audit: {curator.audit_summary()}")
+    if scheduler is not None:
+        logger.info(f"🚦 Scheduler: {scheduler.summary()}")
+    if repairer is not None:
+        logger.info(f"🔧 JSON repair: {repairer.stats}")
+    logger.info(f"💾 Checkpoints: {journals.summary()}")
 
 
 if __name__ == "__main__":
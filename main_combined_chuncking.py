@@ -6,6 +6,7 @@ from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
 from synthetic_data_kit.ingest.pdf_parser import PDFParser
 from synthetic_data_kit.utils.chunker import chunk_text
 from synthetic_data_kit.create.qa_generator import Generator
+from synthetic_data_kit.create.summarizer import DocumentSummarizer
 from synthetic_data_kit.curate.judge import QualityCurator
 
 
@@ -15,8 +16,8 @@ def load_config(path="configs/config.yaml"):
         return yaml.safe_load(f)
 
 
-def ingest_all_pdfs(input_dir: str, config):
-    """Step 4: Ingest all PDFs → combined chunks"""
+def ingest_all_pdfs(input_dir: str, config, summarizer=None):
+    """Step 4: Ingest all PDFs → combined chunks, tagged with a cached document summary"""
     print("\n" + "=" * 60)
     print("STEP 4: PDF INGESTION (ALL FILES)")
     print("=" * 60)
@@ -39,6 +40,8 @@ def ingest_all_pdfs(input_dir: str, config):
         total_chars += len(text)
         print(f"   ✅ Extracted {len(text):,} characters")
         
+        summary = summarizer.summarize(text) if summarizer else None
+
         # Chunk this PDF
         chunks = chunk_text(
             text,
@@ -53,6 +56,7 @@ def ingest_all_pdfs(input_dir: str, config):
             else:
                 chunk_dict = chunk
                 chunk_dict['source_pdf'] = pdf_path.stem
+            chunk_dict['summary'] = summary
             
             all_chunks.append(chunk_dict)
     
@@ -77,17 +81,28 @@ def generate_pairs_in_batches(all_chunks, num_total, generation_type, provider,
     for batch_num in range(num_batches):
         pairs_needed = min(batch_size, num_total - len(all_pairs))
         
-        # Sample random chunks for this batch
-        sampled_chunks = random.sample(all_chunks, min(5, len(all_chunks)))
-        combined_text = "\n\n".join([c["text"] for c in sampled_chunks])
-        
         print(f"   Batch {batch_num + 1}/{num_batches}: generating {pairs_needed} pairs...")
-        
-        batch_pairs = generator.process_document(
-            combined_text, 
-            num_pairs=pairs_needed, 
-            generation_type=generation_type
-        )
+
+        chunk = random.choice(all_chunks)
+        if chunk.get("summary"):
+            # One chunk plus its cached document summary gives document-level grounding
+            batch_pairs = generator.process_document(
+                chunk["text"],
+                num_pairs=pairs_needed,
+                generation_type=generation_type,
+                source=chunk["source_pdf"],
+                summary=chunk["summary"],
+            )
+        else:
+            # Sample random chunks for this batch
+            sampled_chunks = random.sample(all_chunks, min(5, len(all_chunks)))
+            combined_text = "\n\n".join([c["text"] for c in sampled_chunks])
+
+            batch_pairs = generator.process_document(
+                combined_text, 
+                num_pairs=pairs_needed, 
+                generation_type=generation_type
+            )
         
         all_pairs.extend(batch_pairs)
         print(f"   ✅ Generated {len(batch_pairs)} pairs (total so far: {len(all_pairs)})")
@@ -177,7 +192,8 @@ if __name__ == "__main__":
         exit(1)
 
     # ---- Step 4: Ingest all PDFs ----
-    all_chunks = ingest_all_pdfs(input_dir, config)
+    summarizer = DocumentSummarizer.from_config(provider, config)
+    all_chunks = ingest_all_pdfs(input_dir, config, summarizer)
     
     if not all_chunks:
         print("❌ No chunks generated. Exiting.")
@@ -0,0 +1,115 @@
+# synthetic_data_kit/create/allocator.py
+"""Information-density-driven allocation of a pair budget across chunks.
+
+Chunks are scored locally (no model calls) from entity and number density,
+lexical diversity and distinct-term counts. The budget is split in proportion
+to those scores, and chunks below a floor get nothing, so boilerplate-heavy
+chunks stop costing generation calls.
+"""
+import math
+import re
+from typing import Dict, List
+
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z'\-]*|\d[\d,.%$]*")
+_NUMBER_RE = re.compile(r"\d")
+_SENTENCE_END = (".", "!", "?", ":", ";")
+_DIVERSITY_WINDOW = 100
+
+STOPWORDS = frozenset("""
+a about above after again all also an and any are as at be because been before being
+between both but by can could did do does doing during each for from further had has
+have having he her here hers him his how i if in into is it its itself may more most
+must no nor not of on once only or other our out over own same shall she should so
+some such than that the their them then there these they this those through to too
+under until up upon very was we were what when where which while who whom why will
+with would you your
+""".split())
+
+# Relative weight of each feature in the chunk score
+FEATURE_WEIGHTS = {
+    "lexical_diversity": 0.35,
+    "number_density": 0.25,
+    "entity_density": 0.25,
+    "distinct_terms": 0.15,
+}
+
+
+def chunk_features(text: str) -> Dict[str, float]:
+    """Local information-density features, each scaled to roughly [0, 1]"""
+    raw_tokens = _TOKEN_RE.findall(text)
+    if not raw_tokens:
+        return {name: 0.0 for name in FEATURE_WEIGHTS}
+
+    n = len(raw_tokens)
+    tokens = [t.lower() for t in raw_tokens]
+    content = [t for t in tokens if t not in STOPWORDS and len(t) > 2]
+
+    numbers = sum(1 for t in raw_tokens if _NUMBER_RE.match(t))
+
+    # Capitalised words that do not start a sentence approximate named entities
+    entities = 0
+    for prev, tok in zip(raw_tokens, raw_tokens[1:]):
+        if tok[0].isupper() and not prev.endswith(_SENTENCE_END) and tok.lower() not in STOPWORDS:
+            entities += 1
+
+    # Type-token ratio averaged over fixed windows so chunk length does not bias it
+    windows = [content[i:i + _DIVERSITY_WINDOW] for i in range(0, len(content), _DIVERSITY_WINDOW)]
+    windows = [w for w in windows if len(w) == _DIVERSITY_WINDOW] or windows or [[]]
+    diversity = sum(len(set(w)) / max(len(w), 1) for w in windows) / len(windows)
+
+    distinct = len(set(content))
+    return {
+        "lexical_diversity": diversity,
+        "number_density": min(1.0, 10.0 * numbers / n),
+        "entity_density": min(1.0, 5.0 * entities / n),
+        "distinct_terms": min(1.0, math.log1p(distinct) / math.log1p(400)),
+    }
+
+
+def score_chunk(text: str) -> float:
+    """Weighted information-density score in [0, 1]"""
+    features = chunk_features(text)
+    return sum(FEATURE_WEIGHTS[name] * value for name, value in features.items())
+
+
+def allocate_pairs(chunks: List[str], num_pairs: int, min_score: float = 0.0) -> List[int]:
+    """
+    Split a pair budget across chunks in proportion to their density scores
+
+    Uses largest-remainder rounding so the allocations sum to ``num_pairs``.
+    Chunks scoring below ``min_score`` get 0 pairs.
+
+    Args:
+        chunks: Chunk texts
+        num_pairs: Total pairs to request
+        min_score: Floor below which a chunk is skipped
+
+    Returns:
+        Number of pairs to request from each chunk, aligned with ``chunks``
+    """
+    if not chunks or num_pairs <= 0:
+        return [0] * len(chunks)
+
+    scores = [score_chunk(chunk) for chunk in chunks]
+    weights = [s if s >= min_score else 0.0 for s in scores]
+    total = sum(weights)
+    if total == 0:
+        # Nothing clears the floor: fall back to the single densest chunk
+        best = max(range(len(chunks)), key=lambda i: scores[i])
+        return [num_pairs if i == best else 0 for i in range(len(chunks))]
+
+    shares = [num_pairs * w / total for w in weights]
+    allocation = [int(share) for share in shares]
+    leftover = num_pairs - sum(allocation)
+    by_remainder = sorted(range(len(chunks)), key=lambda i: (shares[i] - allocation[i], weights[i]), reverse=True)
+    for i in by_remainder[:leftover]:
+        allocation[i] += 1
+    return allocation
+
+
+def allocate_uniform(num_chunks: int, num_pairs: int) -> List[int]:
+    """Even split with the remainder spread over the first chunks"""
+    if num_chunks == 0:
+        return []
+    base, extra = divmod(num_pairs, num_chunks)
+    return [base + (1 if i < extra else 0) for i in range(num_chunks)]
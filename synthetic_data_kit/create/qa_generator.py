@@ -1,24 +1,67 @@
 # synthetic_data_kit/create/qa_generator.py
 import os
 import json
-from typing import List, Dict, Any
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from synthetic_data_kit.utils.chunker import chunk_text
+from synthetic_data_kit.create.allocator import allocate_pairs, allocate_uniform
+from synthetic_data_kit.utils.json_parser import extract_json_list
+from synthetic_data_kit.utils.dedup import PairDeduplicator
+from synthetic_data_kit.utils.question_index import QuestionIndex, chunk_id
+from synthetic_data_kit.utils.checkpoint import CheckpointJournal, content_hash
+from synthetic_data_kit.utils.json_repair import JSONRepairer, QA_SCHEMA, COT_SCHEMA
 from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
 
 class Generator:
-    def __init__(self, provider: BedrockProvider, config: Dict[str, Any]):
+    def __init__(self, provider: BedrockProvider, config: Dict[str, Any],
+                 repairer: Optional[JSONRepairer] = None,
+                 question_index: Optional[QuestionIndex] = None,
+                 executor: Optional[Executor] = None):
         self.provider = provider
         self.config = config
         self.prompts = config['prompts']
+        self.repairer = repairer if repairer is not None else JSONRepairer.from_config(config)
+        # Streaming duplicate filter shared by every call on this generator
+        self.deduplicator = PairDeduplicator.from_config(config)
+        self.dedup_report: List[Dict[str, Any]] = []
+        # Cross-run index of questions already curated for each source document
+        self.question_index = question_index
+        self._seeded_sources = set()
+        index_cfg = config.get('index', {})
+        self.saturation_pairs = index_cfg.get('saturation_pairs', 5)
+        self.num_negative_examples = index_cfg.get('negative_examples', 5)
+        self.skipped_saturated = 0
+        # Chunks allocated no pairs: below min_chunk_score, or rounded down to zero
+        self.chunks_without_pairs = 0
+        # Questions generated this run per (chunk id, generation type), so later rounds ask new ones;
+        # QA and CoT of a chunk run concurrently, so a shared list would make prompts timing-dependent
+        self._asked: Dict[Tuple[str, str], List[str]] = {}
+        # Chunk texts by chunk id, so curation can check pairs against their source
+        self.chunk_texts: Dict[str, str] = {}
+        # Guards the per-run state above when chunks are generated from several threads
+        self._lock = threading.RLock()
+        # Chunks are generated concurrently on a shared executor if given (a PriorityScheduler
+        # gets one lane per generation type), else one after another
+        self.executor = executor
 
-    def generate_pairs(self, text_chunk: str, num_pairs: int = 5, generation_type: str = "qa") -> List[Dict[str, Any]]:
-        """Generate QA or CoT pairs from a single chunk"""
+    def generate_pairs(self, text_chunk: str, num_pairs: int = 5, generation_type: str = "qa",
+                       avoid_questions: Optional[List[str]] = None,
+                       summary: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Generate QA or CoT pairs from a single chunk, steering away from avoid_questions"""
         if generation_type not in ["qa", "cot"]:
             raise ValueError("generation_type must be 'qa' or 'cot'")
 
         prompt_key = "qa_generation" if generation_type == "qa" else "cot_generation"
         prompt_template = self.prompts[prompt_key]
         prompt = prompt_template.format(text=text_chunk, num_pairs=num_pairs)
+        if summary:
+            prompt = (f"Document summary (background only; every answer must come from the text below):\n"
+                      f"{summary}\n\n{prompt}")
+        if avoid_questions:
+            prompt += "\n\nThese questions were already asked about this text. Ask about different facts:\n"
+            prompt += "\n".join(f"- {q}" for q in avoid_questions)
 
         response = self.provider.generate(
             prompt,
@@ -30,65 +73,216 @@ class Generator:
         if "content" in response and len(response["content"]) > 0:
             text_output = response["content"][0]["text"]
 
-        # Parse JSON
-        try:
-            pairs = json.loads(text_output.strip())
-            if not isinstance(pairs, list):
-                pairs = [pairs]
-            return pairs
-        except json.JSONDecodeError:
+        # Parse JSON, salvaging complete pairs from truncated or wrapped output
+        pairs = self.parse_json_response(text_output)
+        if not pairs and self.repairer is not None:
+            schema = QA_SCHEMA if generation_type == "qa" else COT_SCHEMA
+            repaired = self.repairer.repair(text_output, schema)
+            if isinstance(repaired, list):
+                pairs = [p for p in repaired if isinstance(p, dict)]
+            if pairs:
+                print(f"🔧 Repaired malformed JSON ({len(pairs)} pairs recovered)")
+        if not pairs:
             print("❌ Failed to parse JSON.")
             print("Raw response:", text_output)
-            return []
+        return pairs
+
+    def process_document(self, text: str, num_pairs: int = 10, generation_type: str = "qa",
+                         journal: Optional[CheckpointJournal] = None,
+                         source: Optional[str] = None,
+                         summary: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Split doc into chunks and generate pairs, replaying chunks already in the journal
 
-    def process_document(self, text: str, num_pairs: int = 10, generation_type: str = "qa") -> List[Dict[str, Any]]:
-        """Split doc into chunks and generate pairs"""
+        When a question index is attached and ``source`` names the document,
+        chunks that already have enough curated questions are skipped and the
+        rest are prompted with a few of their existing questions to avoid.
+        ``summary`` is prepended to every prompt as document-level context.
+        """
+        all_pairs = []
+        for pairs in self.iter_document(text, num_pairs, generation_type, journal, source, summary):
+            all_pairs.extend(pairs)
+            if len(all_pairs) >= num_pairs:
+                break
+
+        return all_pairs[:num_pairs]
+
+    def iter_document(self, text: str, num_pairs: int = 10, generation_type: str = "qa",
+                      journal: Optional[CheckpointJournal] = None,
+                      source: Optional[str] = None,
+                      summary: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily generate deduplicated pairs chunk by chunk; stop iterating to stop calling the model
+
+        With an executor, up to ``max_workers`` chunks ahead are generated
+        concurrently; pairs are still yielded in chunk order.
+        """
+        plan = self.plan_document(text, num_pairs, source)
+        if self.executor is None:
+            for i, chunk, pairs_this_chunk in plan:
+                yield self.generate_chunk_pairs(i, chunk, pairs_this_chunk, generation_type, journal, source, summary)
+            return
+
+        ahead = getattr(self.executor, "max_workers", None) or 8
+        window = deque()
+        try:
+            for i, chunk, pairs_this_chunk in plan:
+                window.append(self.submit_chunk_pairs(i, chunk, pairs_this_chunk, generation_type,
+                                                      journal, source, summary))
+                if len(window) >= ahead:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            for future in window:
+                future.cancel()
+
+    def submit_chunk_pairs(self, chunk_index: int, chunk: str, num_pairs: int, generation_type: str = "qa",
+                           journal: Optional[CheckpointJournal] = None,
+                           source: Optional[str] = None,
+                           summary: Optional[str] = None) -> Future:
+        """Schedule generate_chunk_pairs on the executor, in the generation type's lane if it has lanes"""
+        executor = self.executor.lane(generation_type) if hasattr(self.executor, "lane") else self.executor
+        return executor.submit(self.generate_chunk_pairs, chunk_index, chunk, num_pairs, generation_type,
+                               journal, source, summary)
+
+    def plan_document(self, text: str, num_pairs: int = 10,
+                      source: Optional[str] = None) -> List[Tuple[int, str, int]]:
+        """
+        Split a document and allocate its pair budget
+
+        Returns:
+            (chunk index, chunk, pairs to request) for every chunk that gets
+            pairs; saturated chunks and chunks allocated no pairs are left out
+        """
         chunk_size = self.config['generation']['chunk_size']
         chunk_overlap = self.config['generation']['chunk_overlap']
 
         chunks = chunk_text(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        pairs_per_chunk = max(1, num_pairs // len(chunks))
+        with self._lock:
+            self._seed_from_index(source)
 
-        all_pairs = []
+        # Saturated chunks hand their share of the budget to the others
+        candidates = []
         for i, chunk in enumerate(chunks):
-            # Adjust for last chunk
-            if i == len(chunks) - 1:
-                remaining = num_pairs - len(all_pairs)
-                pairs_this_chunk = max(pairs_per_chunk, remaining)
-            else:
-                pairs_this_chunk = pairs_per_chunk
-
-            pairs = self.generate_pairs(chunk, pairs_this_chunk, generation_type)
-            all_pairs.extend(pairs)
+            if self._is_saturated(source, chunk):
+                with self._lock:
+                    self.skipped_saturated += 1
+                print(f"⏭️  Chunk {i + 1}: already saturated in the question index, skipping")
+                continue
+            candidates.append((i, chunk))
 
-            if len(all_pairs) >= num_pairs:
-                break
+        allocation = self.allocate([chunk for _, chunk in candidates], num_pairs)
 
-        return all_pairs[:num_pairs]
+        plan = []
+        for (i, chunk), pairs_this_chunk in zip(candidates, allocation):
+            if pairs_this_chunk == 0:
+                with self._lock:
+                    self.chunks_without_pairs += 1
+                continue
+            plan.append((i, chunk, pairs_this_chunk))
+        return plan
+
+    def generate_chunk_pairs(self, chunk_index: int, chunk: str, num_pairs: int, generation_type: str = "qa",
+                             journal: Optional[CheckpointJournal] = None,
+                             source: Optional[str] = None,
+                             summary: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Generate deduplicated pairs for one planned chunk; safe to call from several threads"""
+        cid = chunk_id(chunk)
+        with self._lock:
+            self.chunk_texts[cid] = chunk
+            avoid = self._avoid_questions(source, chunk, cid, generation_type)
+        pairs = self._generate_chunk(chunk, num_pairs, generation_type, journal, avoid, summary)
+        with self._lock:
+            pairs = self._drop_duplicates(pairs, chunk_index, generation_type)
+            for pair in pairs:
+                pair.setdefault("chunk_id", cid)
+                if source is not None:
+                    pair.setdefault("source_pdf", source)
+            self._asked.setdefault((cid, generation_type), []).extend(p.get("question", "") for p in pairs)
+        return pairs
+
+    def _avoid_questions(self, source: Optional[str], chunk: str, cid: str,
+                         generation_type: str) -> Optional[List[str]]:
+        """Already-asked questions for a chunk: curated in earlier runs plus generated this run for this type"""
+        avoid = []
+        if self.question_index is not None and source is not None:
+            avoid.extend(self.question_index.negative_examples(source, chunk, self.num_negative_examples))
+        asked = [q[:120] for q in self._asked.get((cid, generation_type), []) if q]
+        avoid.extend(asked[-self.num_negative_examples:])
+        return avoid or None
+
+    def allocate(self, chunks: List[str], num_pairs: int) -> List[int]:
+        """Pairs to request from each chunk, by information density unless configured uniform"""
+        gen_cfg = self.config['generation']
+        if gen_cfg.get('allocation', 'density') == 'uniform':
+            return allocate_uniform(len(chunks), num_pairs)
+        return allocate_pairs(chunks, num_pairs, min_score=gen_cfg.get('min_chunk_score', 0.0))
+
+    def _is_saturated(self, source: Optional[str], chunk: str) -> bool:
+        if self.question_index is None or source is None:
+            return False
+        return self.question_index.chunk_coverage(source, chunk) >= self.saturation_pairs
+
+    def _drop_duplicates(self, pairs: List[Dict[str, Any]], chunk_index: int,
+                         generation_type: str) -> List[Dict[str, Any]]:
+        """Drop exact and near-duplicate questions before they reach curation"""
+        if self.deduplicator is None or not pairs:
+            return pairs
+
+        kept, counts = self.deduplicator.filter(pairs)
+        dropped = counts["exact"] + counts["near"]
+        rate = dropped / counts["total"]
+        self.dedup_report.append({
+            "chunk": chunk_index,
+            "generation_type": generation_type,
+            **counts,
+            "duplicate_rate": round(rate, 3),
+        })
+        if dropped:
+            print(f"🧹 Chunk {chunk_index + 1}: dropped {dropped}/{counts['total']} duplicates "
+                  f"({counts['exact']} exact, {counts['near']} near, {rate:.0%})")
+        return kept
+
+    def _seed_from_index(self, source: Optional[str]):
+        """Load a source's already-curated questions into the duplicate filter once"""
+        if (self.question_index is None or self.deduplicator is None
+                or source is None or source in self._seeded_sources):
+            return
+        seeded = self.question_index.seed(source, self.deduplicator)
+        self._seeded_sources.add(source)
+        if seeded:
+            print(f"📇 Loaded {seeded} previously curated questions for {source}")
+
+    def _generate_chunk(self, chunk: str, num_pairs: int, generation_type: str,
+                        journal: Optional[CheckpointJournal],
+                        avoid_questions: Optional[List[str]] = None,
+                        summary: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Generate pairs for one chunk through the checkpoint journal"""
+        if journal is None:
+            return self.generate_pairs(chunk, num_pairs, generation_type, avoid_questions, summary)
+
+        prompt_key = "qa_generation" if generation_type == "qa" else "cot_generation"
+        key = content_hash("generate", generation_type, num_pairs, self.prompts[prompt_key], chunk,
+                           avoid_questions or [], summary or "")
+        # Failed chunks (nothing parsed, even after repair) are not journaled, so resume retries them
+        if journal.entries.get(key):
+            return journal.get(key)
+
+        pairs = self.generate_pairs(chunk, num_pairs, generation_type, avoid_questions, summary)
+        if pairs:
+            journal.record(key, pairs)
+        return pairs
 
     def save_pairs(self, pairs: List[Dict[str, Any]], pdf_name: str, generation_type: str):
-        os.makedirs("data/generated", exist_ok=True)
+        out_dir = os.path.join(self.config.get("data", {}).get("output_dir", "data"), "generated")
+        os.makedirs(out_dir, exist_ok=True)
         suffix = "qa" if generation_type == "qa" else "cot"
-        out_path = f"data/generated/{pdf_name}_{suffix}.json"
+        out_path = os.path.join(out_dir, f"{pdf_name}_{suffix}.json")
         with open(out_path, "w", encoding="utf-8") as f:
             json.dump(pairs, f, indent=2)
         print(f"💾 Saved {len(pairs)} {generation_type.upper()} pairs to {out_path}")
 
     def parse_json_response(self, response_text: str) -> List[Dict]:
-        """Parse JSON response from the model"""
-        try:
-            # Clean up markdown formatting
-            cleaned_text = response_text.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:]
-            if cleaned_text.startswith("```"):
-                cleaned_text = cleaned_text[3:]
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]
-            cleaned_text = cleaned_text.strip()
-            
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError as e:
-            print(f"❌ Failed to parse JSON.")
-            print(f"Raw response: {response_text[:200]}...")
-            return []
\ No newline at end of file
+        """Parse JSON response from the model, keeping only object items"""
+        return [p for p in extract_json_list(response_text) if isinstance(p, dict)]
@@ -0,0 +1,67 @@
+# synthetic_data_kit/create/summarizer.py
+"""Per-document summaries used as compact global context in prompts.
+
+Summaries are computed once per document with ``prompts.summary`` and cached
+on disk by content hash, so reruns and every chunk of the same document reuse
+them without another model call.
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
+from synthetic_data_kit.utils.checkpoint import content_hash
+
+
+class DocumentSummarizer:
+    """Summarizes whole documents and caches the result by content hash"""
+
+    def __init__(self, provider: BedrockProvider, config: Dict[str, Any]):
+        self.provider = provider
+        self.prompt = config['prompts']['summary']
+        summary_cfg = config.get('summary', {})
+        self.cache_dir = summary_cfg.get('cache_dir', 'data/summaries')
+        self.max_tokens = summary_cfg.get('max_tokens', 300)
+        self.max_input_chars = config['generation'].get('max_context_length', 8000)
+        self.model_id = getattr(provider, 'model_id', '')
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def from_config(cls, provider: BedrockProvider, config: Dict[str, Any]) -> Optional["DocumentSummarizer"]:
+        """Build a summarizer if the ``summary`` config section enables it"""
+        if not config.get('summary', {}).get('enabled', False):
+            return None
+        return cls(provider, config)
+
+    def _excerpt(self, text: str, windows: int = 8) -> str:
+        """Evenly spaced windows covering the whole document within the input budget"""
+        if len(text) <= self.max_input_chars:
+            return text
+        width = self.max_input_chars // windows
+        step = (len(text) - width) / (windows - 1)
+        return "\n...\n".join(text[int(i * step):int(i * step) + width] for i in range(windows))
+
+    def summarize(self, text: str) -> str:
+        """Return the cached summary for a document, generating it on first use"""
+        key = content_hash("summary", self.prompt, self.model_id, text)
+        cache_path = os.path.join(self.cache_dir, f"{key}.json")
+
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.cache_hits += 1
+                return json.load(f)["summary"]
+
+        self.cache_misses += 1
+        prompt = f"{self.prompt.strip()}\n\nDocument:\n{self._excerpt(text)}"
+        response = self.provider.generate(prompt, temperature=0.3, max_tokens=self.max_tokens)
+
+        summary = ""
+        if "content" in response and len(response["content"]) > 0:
+            summary = response["content"][0]["text"].strip()
+
+        if summary:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"summary": summary}, f, indent=2)
+        return summary
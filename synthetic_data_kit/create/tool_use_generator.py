@@ -1,59 +1,73 @@
 # synthetic_data_kit/create/tool_use_generator.py
 import json
 import logging
-import hashlib
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import Executor, Future, as_completed
+from typing import List, Dict, Any, Optional
 from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
+from synthetic_data_kit.utils.json_parser import extract_json, strip_code_fences
+from synthetic_data_kit.utils.checkpoint import CheckpointJournal, content_hash
+from synthetic_data_kit.utils.scheduler import DAGScheduler
+from synthetic_data_kit.utils.json_repair import JSONRepairer, QUERIES_SCHEMA, TOOL_BATCH_SCHEMA
+from synthetic_data_kit.tools.fixtures import FixtureMissing
+from synthetic_data_kit.tools.tool_executor import ToolExecutor, is_error_result
+from synthetic_data_kit.tools.registry import ToolRegistry
 
 logger = logging.getLogger(__name__)
 
 
+def _fixture_missing(error: Optional[BaseException]) -> Optional[FixtureMissing]:
+    """The FixtureMissing behind ``error``, following DependencyFailed causes"""
+    while error is not None:
+        if isinstance(error, FixtureMissing):
+            return error
+        error = error.__cause__
+    return None
+
+
 class ToolUseGenerator:
-    def __init__(self, provider: BedrockProvider):
+    def __init__(self, provider: BedrockProvider, repairer: Optional[JSONRepairer] = None,
+                 mode: str = "multi_call", max_workers: int = 4,
+                 tool_executor: Optional[ToolExecutor] = None, registry: Optional[ToolRegistry] = None,
+                 executor: Optional[Executor] = None):
+        if mode not in ["multi_call", "single_call"]:
+            raise ValueError("mode must be 'multi_call' or 'single_call'")
         self.provider = provider
+        self.repairer = repairer
+        # single_call: one structured call per batch of queries instead of three per query
+        self.mode = mode
+        self.single_call_stats = {"structured": 0, "fallback": 0}
+        # Conversations are independent, so their steps share one bounded pool
+        self.max_workers = max_workers
+        # A shared executor (e.g. a scheduler lane) replaces the private pool
+        self.executor = executor
+        self.step_latency: Dict[str, Dict[str, float]] = {}
+        # With an executor the tool turn holds real search results instead of an LLM-written one
+        self.tool_executor = tool_executor
+        self.tool_results = "real" if tool_executor is not None else "synthetic"
+        self.real_tool_stats = {"real": 0, "fallback": 0}
+        self._stats_lock = threading.Lock()
         
-        # Define available tools
-        self.tools = {
-            "arxiv_search": {
-                "type": "function",
-                "function": {
-                    "name": "arxiv_search",
-                    "description": "Search for academic papers on arXiv repository",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string", 
-                                "description": "Search query for academic papers"
-                            },
-                            "max_results": {
-                                "type": "integer", 
-                                "description": "Maximum number of results to return",
-                                "default": 5
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                }
-            },
-            "duckduckgo_search": {
-                "type": "function", 
-                "function": {
-                    "name": "duckduckgo_search",
-                    "description": "Search the web using DuckDuckGo for current information",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "Search query for web search"
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                }
-            }
-        }
+        # Tool schemas, argument validation and routing all come from one registry
+        self.registry = registry or ToolRegistry()
+
+    @classmethod
+    def from_config(cls, provider: BedrockProvider, config: Dict[str, Any],
+                    repairer: Optional[JSONRepairer] = None,
+                    executor: Optional[Executor] = None) -> "ToolUseGenerator":
+        """Generator for the ``tool_use`` config section; real tool results get a live executor"""
+        tool_cfg = config.get("tool_use", {})
+        tool_executor = None
+        if tool_cfg.get("tool_results", "synthetic") == "real":
+            tool_executor = ToolExecutor.from_config(config)
+        return cls(
+            provider,
+            repairer=repairer,
+            mode=tool_cfg.get("mode", "multi_call"),
+            max_workers=tool_cfg.get("max_workers", 4),
+            tool_executor=tool_executor,
+            executor=executor,
+        )
 
     def generate_tool_requiring_queries(self, context: str, num_queries: int = 3) -> List[str]:
         """Generate queries that would require tool usage based on context"""
@@ -93,33 +107,22 @@ Return ONLY a JSON array of {num_queries} questions:
         else:
             text_output = str(response)
         
-        # Clean and parse JSON
-        text_output = text_output.strip()
-        if text_output.startswith("```json"):
-            text_output = text_output[7:]
-        if text_output.startswith("```"):
-            text_output = text_output[3:]
-        if text_output.endswith("```"):
-            text_output = text_output[:-3]
-        text_output = text_output.strip()
-        
-        try:
-            queries = json.loads(text_output)
-            return queries[:num_queries] if isinstance(queries, list) else [text_output]
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse queries JSON, extracting manually")
-            # Fallback: extract questions from text
-            lines = [l.strip(' "[],-') for l in text_output.split('\n') if l.strip() and '?' in l]
-            return lines[:num_queries]
+        # Parse JSON, salvaging complete queries from truncated output
+        queries = extract_json(text_output, expect="array")
+        if not isinstance(queries, list) and self.repairer is not None:
+            queries = self.repairer.repair(text_output, QUERIES_SCHEMA)
+        if isinstance(queries, list):
+            return [q for q in queries if isinstance(q, str)][:num_queries]
+
+        logger.warning("Failed to parse queries JSON, extracting manually")
+        # Fallback: extract questions from text
+        text_output = strip_code_fences(text_output.strip())
+        lines = [l.strip(' "[],-') for l in text_output.split('\n') if l.strip() and '?' in l]
+        return lines[:num_queries]
 
     def determine_appropriate_tool(self, query: str) -> str:
         """Determine which tool should be used for a given query"""
-        academic_keywords = ["research", "papers", "academic", "study", "studies", "journal", "publication", "scholar"]
-        
-        if any(keyword in query.lower() for keyword in academic_keywords):
-            return "arxiv_search"
-        else:
-            return "duckduckgo_search"
+        return self.registry.route(query)
 
     def extract_search_terms(self, query: str, tool_name: str) -> str:
         """Extract appropriate search terms from query"""
@@ -148,13 +151,16 @@ Keep it concise (2-5 key terms)."""
         
         return text_output.strip().strip('"')
 
-    def generate_synthetic_tool_result(self, tool_name: str, search_query: str, context: str) -> str:
-        """Generate realistic tool results"""
+    def generate_synthetic_tool_result(self, tool_name: str, search_query: str, context: str,
+                                       summary: Optional[str] = None) -> str:
+        """Generate realistic tool results, grounded in the document summary when given"""
         
+        context = summary if summary else f"{context[:500]}..."
+
         if tool_name == "arxiv_search":
             prompt = f"""Generate realistic arXiv search results for query: "{search_query}"
 
-Context: {context[:500]}...
+Context: {context}
 
 Generate 2-3 realistic academic paper results with:
 - Paper titles
@@ -167,7 +173,7 @@ Make them relevant to the context and search query. Format as a realistic search
         else:  # duckduckgo_search
             prompt = f"""Generate realistic web search results for query: "{search_query}"
 
-Context: {context[:500]}...
+Context: {context}
 
 Generate 2-3 realistic web search results with:
 - Page titles
@@ -193,16 +199,44 @@ Format as realistic search results."""
         
         return text_output.strip()
 
-    def generate_final_response(self, query: str, tool_result: str, context: str) -> str:
+    def execute_tool_result(self, tool_name: str, search_terms: str, context: str,
+                            summary: Optional[str] = None) -> str:
+        """Run the tool for real, falling back to a synthetic result if it fails or finds nothing"""
+        result = self.tool_executor.execute_tool(tool_name, self._tool_args(tool_name, search_terms))
+        if is_error_result(result):
+            with self._stats_lock:
+                self.real_tool_stats["fallback"] += 1
+            logger.warning(f"{tool_name} returned no usable results for '{search_terms}', using synthetic result")
+            return self.generate_synthetic_tool_result(tool_name, search_terms, context, summary)
+
+        with self._stats_lock:
+            self.real_tool_stats["real"] += 1
+        return json.dumps(result, ensure_ascii=False, indent=2)
+
+    def generate_tool_result(self, tool_name: str, search_terms: str, context: str,
+                             summary: Optional[str] = None) -> str:
+        """Tool turn content, real or synthetic depending on the generator's tool results"""
+        if self.tool_executor is not None:
+            return self.execute_tool_result(tool_name, search_terms, context, summary)
+        return self.generate_synthetic_tool_result(tool_name, search_terms, context, summary)
+
+    def generate_final_response(self, query: str, tool_result: str, context: str,
+                                summary: Optional[str] = None) -> str:
         """Generate final assistant response using tool results and context"""
         
+        if summary:
+            # The summary carries document-level grounding, so a short excerpt is enough
+            document_context = f"{summary}\n\nExcerpt: {context[:300]}..."
+        else:
+            document_context = f"{context[:800]}..."
+
         prompt = f"""You are an AI assistant that just received search results. Generate a comprehensive answer using both the search results and document context.
 
 User Question: {query}
 
 Search Results: {tool_result}
 
-Document Context: {context[:800]}...
+Document Context: {document_context}
 
 Generate a helpful response that:
 1. References the search results naturally
@@ -229,7 +263,8 @@ Keep response focused and under 200 words."""
         
         return text_output.strip()
 
-    def create_tool_calling_conversation(self, query: str, context: str) -> Dict[str, Any]:
+    def create_tool_calling_conversation(self, query: str, context: str,
+                                         summary: Optional[str] = None) -> Dict[str, Any]:
         """Create a complete tool-calling conversation example for training"""
         
         # Determine appropriate tool
@@ -239,16 +274,19 @@ Keep response focused and under 200 words."""
         search_terms = self.extract_search_terms(query, tool_name)
         
         # Create tool arguments
-        if tool_name == "arxiv_search":
-            tool_args = {"query": search_terms, "max_results": 5}
-        else:
-            tool_args = {"query": search_terms}
+        tool_args = self._tool_args(tool_name, search_terms)
         
-        # Generate synthetic tool results
-        tool_result = self.generate_synthetic_tool_result(tool_name, search_terms, context)
+        # Run the tool, or generate synthetic tool results
+        tool_result = self.generate_tool_result(tool_name, search_terms, context, summary)
         
         # Generate final response
-        final_response = self.generate_final_response(query, tool_result, context)
+        final_response = self.generate_final_response(query, tool_result, context, summary)
+        
+        return self.build_conversation(query, tool_name, tool_args, tool_result, final_response, context)
+
+    def build_conversation(self, query: str, tool_name: str, tool_args: Dict[str, Any],
+                           tool_result: str, final_response: str, context: str) -> Dict[str, Any]:
+        """Assemble the training conversation from its generated parts"""
         
         # Create unique call ID
         call_id = f"call_{abs(hash(query + tool_name)) % 10000:04d}"
@@ -285,38 +323,207 @@ Keep response focused and under 200 words."""
                     "content": final_response
                 }
             ],
-            "tools": [self.tools[tool_name]],
+            "tools": [self.registry.schema(tool_name)],
             "metadata": {
                 "source_context": context[:200] + "...",
                 "tool_used": tool_name,
-                "search_query": search_terms
+                "search_query": tool_args.get("query", "")
             }
         }
         
         return conversation
 
-    def generate_from_chunks(self, chunks: List[str], queries_per_chunk: int = 3) -> List[Dict[str, Any]]:
-        """Generate tool-calling examples from document chunks"""
-        
-        tool_examples = []
-        
+    def create_tool_calling_conversations_batch(self, queries: List[str], context: str,
+                                                summary: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Create conversations for a batch of queries with a single structured call
+
+        The model returns tool choice, arguments, a synthetic tool result and the
+        final answer for every query as one JSON array. Items that are missing
+        or fail schema validation fall back to the step-by-step path.
+        """
+        tool_specs = "\n".join(
+            f"- {name}: {tool['description']} "
+            f"Arguments: {json.dumps(tool['input_schema']['properties'])}, "
+            f"required: {tool['input_schema'].get('required', [])}"
+            for name, tool in self.registry.tools.items()
+        )
+        numbered = "\n".join(f'{{"id": "q{i}", "question": {json.dumps(q)}}}' for i, q in enumerate(queries))
+        document_context = summary if summary else f"{context[:800]}..."
+
+        prompt = f"""You are creating tool-calling training examples. For each question below, choose the best tool, write its arguments, write a realistic result that tool would return, and write the assistant's final answer.
+
+Available tools:
+{tool_specs}
+
+Document Context: {document_context}
+
+Questions:
+{numbered}
+
+Rules:
+1. "arguments" must follow the tool's argument schema; "query" should be 2-5 focused search terms
+2. "tool_result": 2-3 realistic results (arXiv: titles, authors, 1-2 sentence abstracts, IDs like 2024.XXXX; web: page titles and snippets)
+3. "final_answer": under 200 words, references the results naturally and connects them to the document context
+4. Return ONLY a JSON array with one object per question:
+[{{"id": "q0", "tool": "tool_name", "arguments": {{"query": "..."}}, "tool_result": "...", "final_answer": "..."}}]"""
+
+        response = self.provider.generate(
+            prompt=prompt,
+            max_tokens=min(900 * len(queries) + 200, 8000),
+            temperature=0.7
+        )
+
+        # Extract text from response
+        if isinstance(response, dict) and "content" in response:
+            text_output = ""
+            for content_block in response["content"]:
+                if content_block.get("type") == "text":
+                    text_output += content_block.get("text", "")
+        else:
+            text_output = str(response)
+
+        items = extract_json(text_output, expect="array")
+        if not isinstance(items, list) and self.repairer is not None:
+            items = self.repairer.repair(text_output, TOOL_BATCH_SCHEMA)
+        # Unhashable ids or tool names from a malformed response must fall back, not raise
+        by_id = {item["id"]: item for item in (items or [])
+                 if isinstance(item, dict) and isinstance(item.get("id"), str)}
+
+        conversations = []
+        for i, query in enumerate(queries):
+            item = by_id.get(f"q{i}")
+            valid = (
+                item is not None
+                and isinstance(item.get("tool"), str)
+                and self.registry.validate(item.get("tool"), item.get("arguments"))
+                and isinstance(item.get("tool_result"), str) and item["tool_result"].strip()
+                and isinstance(item.get("final_answer"), str) and item["final_answer"].strip()
+            )
+            with self._stats_lock:
+                self.single_call_stats["structured" if valid else "fallback"] += 1
+            if valid:
+                conversations.append(self.build_conversation(
+                    query, item["tool"], item["arguments"],
+                    item["tool_result"].strip(), item["final_answer"].strip(), context,
+                ))
+            else:
+                logger.warning(f"Structured result missing or invalid for query, falling back: {query[:60]}...")
+                conversations.append(self.create_tool_calling_conversation(query, context, summary))
+
+        return conversations
+
+    def _tool_args(self, tool_name: str, search_terms: str) -> Dict[str, Any]:
+        """Tool arguments for the extracted search terms"""
+        if tool_name == "arxiv_search":
+            return {"query": search_terms, "max_results": 5}
+        return {"query": search_terms}
+
+    def _submit_conversation(self, scheduler: DAGScheduler, query: str, context: str,
+                             summary: Optional[str]) -> Future:
+        """Schedule one conversation as a small DAG: terms → tool result → final answer → build"""
+        tool_name = self.determine_appropriate_tool(query)
+        terms = scheduler.submit(
+            "search_terms", lambda: self.extract_search_terms(query, tool_name))
+        result = scheduler.submit(
+            "tool_result", lambda t: self.generate_tool_result(tool_name, t, context, summary), terms)
+        final = scheduler.submit(
+            "final_response", lambda r: self.generate_final_response(query, r, context, summary), result)
+        return scheduler.submit(
+            "build",
+            lambda t, r, f: self.build_conversation(query, tool_name, self._tool_args(tool_name, t), r, f, context),
+            terms, result, final,
+        )
+
+    def _submit_chunk_conversations(self, scheduler: DAGScheduler, queries: List[str], context: str,
+                                    summary: Optional[str]) -> List[Future]:
+        """Schedule every conversation for one chunk's queries"""
+        queries = [q for q in queries if len(q.strip()) > 10]  # Skip very short queries
+        if not queries:
+            return []
+        # Real results must exist before the answer is written, so they always take the step-by-step path
+        if self.mode == "single_call" and self.tool_executor is None:
+            return [scheduler.submit(
+                "single_call", lambda: self.create_tool_calling_conversations_batch(queries, context, summary))]
+        return [self._submit_conversation(scheduler, q, context, summary) for q in queries]
+
+    def generate_from_chunks(self, chunks: List[str], queries_per_chunk: int = 3,
+                             journal: Optional[CheckpointJournal] = None,
+                             summary: Optional[str] = None,
+                             summaries: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Generate tool-calling examples from document chunks, replaying chunks already in the journal
+
+        Every chunk's query generation and every conversation step run concurrently
+        on one bounded worker pool; results are still returned in chunk and query
+        order, and a failure only drops the chunk it happened in.
+
+        ``summaries`` gives each chunk the summary of its own document (aligned
+        with ``chunks``); otherwise every chunk gets ``summary``.
+
+        Raises:
+            FixtureMissing: in fixture replay mode, if a tool call has no recording
+        """
+        scheduler = DAGScheduler(max_workers=self.max_workers, executor=self.executor)
+        if summaries is None:
+            summaries = [summary] * len(chunks)
+        keys = [
+            content_hash("tool_use", self.mode, self.tool_results, queries_per_chunk, chunk, chunk_summary or "")
+            for chunk, chunk_summary in zip(chunks, summaries)
+        ]
+        query_futures: Dict[Future, int] = {}
+
         for i, chunk in enumerate(chunks):
+            if journal is not None and keys[i] in journal:
+                continue
             logger.info(f"Generating tool-use examples from chunk {i+1}/{len(chunks)}")
-            
-            try:
-                # Generate queries that require tools
-                queries = self.generate_tool_requiring_queries(chunk, queries_per_chunk)
-                
-                # Create tool-calling conversations for each query
-                for query in queries:
-                    if len(query.strip()) > 10:  # Skip very short queries
-                        conversation = self.create_tool_calling_conversation(query, chunk)
-                        tool_examples.append(conversation)
-                        logger.info(f"✓ Created tool-calling example: {query[:60]}...")
-                
-            except Exception as e:
-                logger.error(f"Error processing chunk {i+1}: {e}")
+            future = scheduler.submit(
+                "queries", lambda c=chunk: self.generate_tool_requiring_queries(c, queries_per_chunk))
+            query_futures[future] = i
+
+        # Expand each chunk's conversations as soon as its queries arrive
+        chunk_futures: Dict[int, List[Future]] = {}
+        chunk_errors: Dict[int, BaseException] = {}
+        for future in as_completed(query_futures):
+            i = query_futures[future]
+            if future.exception() is not None:
+                chunk_errors[i] = future.exception()
                 continue
-        
+            chunk_futures[i] = self._submit_chunk_conversations(scheduler, future.result(), chunks[i], summaries[i])
+
+        tool_examples = []
+        try:
+            for i, chunk in enumerate(chunks):
+                if journal is not None and keys[i] in journal:
+                    tool_examples.extend(journal.get(keys[i]))
+                    logger.info(f"↺ Replayed tool-use examples for chunk {i+1}/{len(chunks)} from checkpoint")
+                    continue
+
+                try:
+                    if i in chunk_errors:
+                        raise chunk_errors[i]
+
+                    chunk_examples = []
+                    for future in chunk_futures.get(i, []):
+                        result = future.result()
+                        chunk_examples.extend(result if isinstance(result, list) else [result])
+                    for conversation in chunk_examples:
+                        logger.info(f"✓ Created tool-calling example: {conversation['messages'][0]['content'][:60]}...")
+
+                    tool_examples.extend(chunk_examples)
+                    if journal is not None:
+                        journal.record(keys[i], chunk_examples)
+
+                except Exception as e:
+                    # A replay run without a recording must stop, not drop the chunk
+                    missing = _fixture_missing(e)
+                    if missing is not None:
+                        raise missing
+                    logger.error(f"Error processing chunk {i+1}: {e}")
+                    continue
+        finally:
+            scheduler.shutdown()
+
+        self.step_latency = scheduler.latency_stats()
         logger.info(f"Generated {len(tool_examples)} total tool-calling examples")
-        return tool_examples
\ No newline at end of file
+        return tool_examples
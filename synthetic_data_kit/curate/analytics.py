@@ -0,0 +1,206 @@
+# synthetic_data_kit/curate/analytics.py
+"""Vectorized analytics over stored judge ratings.
+
+Ratings are loaded once from the rating store's score columns into numpy
+arrays with a single query, no per-row JSON parsing; threshold sweeps, percentiles, histograms and per-source / per-generation-type
+breakdowns are then whole-array operations, so they stay well under a second
+on millions of ratings. Reports are written as JSON plus CSV tables.
+
+Usage:
+    python -m synthetic_data_kit.curate.analytics --store data/ratings/ratings.sqlite --out data/reports/curation
+"""
+import argparse
+import csv
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from synthetic_data_kit.curate.rating_store import RatingStore
+
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+class RatingArrays:
+    """Judge ratings as column arrays plus integer-coded groups"""
+
+    def __init__(self, metrics: Dict[str, np.ndarray], sources: np.ndarray, generation_types: np.ndarray,
+                 source_names: List[str], type_names: List[str], auto_accepted: int = 0):
+        self.metrics = metrics
+        self.combined = metrics["combined_score"]
+        self.sources = sources
+        self.generation_types = generation_types
+        self.source_names = source_names
+        self.type_names = type_names
+        self.auto_accepted = auto_accepted
+
+    def __len__(self) -> int:
+        return len(self.combined)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "RatingArrays":
+        """Build from dicts with ``source``, ``generation_type`` and numeric metric fields"""
+        first = records[0] if records else {"combined_score": 0}
+        metric_names = [k for k in first if k not in ("source", "generation_type")]
+        metrics = {name: np.array([r.get(name, np.nan) for r in records], dtype=np.float64) for name in metric_names}
+        source_names, sources = np.unique([r["source"] for r in records] or np.empty(0, dtype=str), return_inverse=True)
+        type_names, types = np.unique([r["generation_type"] for r in records] or np.empty(0, dtype=str),
+                                      return_inverse=True)
+        return cls(metrics, sources, types, list(source_names), list(type_names))
+
+    @classmethod
+    def from_store(cls, store: RatingStore, prompt_version: Optional[str] = None,
+                   accept_version: Optional[str] = None) -> "RatingArrays":
+        """
+        Load judged ratings for one prompt version (the most common one if not given)
+
+        Groups are the documents pairs came from. Auto-accepts stored under
+        ``accept_version`` are counted, not loaded.
+        """
+        if prompt_version is None:
+            prompt_version = store.most_common_version() or ""
+
+        names, rows = store.score_columns(prompt_version)
+        # One float matrix for every score column; NULL becomes NaN
+        values = np.array([row[2:] for row in rows], dtype=np.float64).reshape(len(rows), len(names) + 1)
+        metrics = {
+            name: values[:, i] for i, name in enumerate(["combined_score", *names])
+            # Columns of metrics this judge does not rate are all NULL
+            if i == 0 or not np.isnan(values[:, i]).all()
+        }
+        source_names, sources = np.unique(np.array([row[0] for row in rows], dtype=str), return_inverse=True)
+        type_names, types = np.unique(np.array([row[1] for row in rows], dtype=str), return_inverse=True)
+        auto_accepted = store.count(accept_version) if accept_version is not None else 0
+        return cls(metrics, sources, types, list(source_names), list(type_names), auto_accepted)
+
+    @classmethod
+    def concat(cls, parts: Sequence["RatingArrays"], names: Optional[Sequence[str]] = None) -> "RatingArrays":
+        """Several sets of ratings as one; with ``names`` each part is grouped under its name"""
+        if names is None:
+            labels = [np.array(part.source_names, dtype=str)[part.sources] for part in parts]
+        else:
+            labels = [np.full(len(part), name) for part, name in zip(parts, names)]
+        type_labels = [np.array(part.type_names, dtype=str)[part.generation_types] for part in parts]
+        metric_names = list(dict.fromkeys(name for part in parts for name in part.metrics)) or ["combined_score"]
+        metrics = {
+            name: np.concatenate([part.metrics.get(name, np.full(len(part), np.nan)) for part in parts]
+                                 or [np.empty(0)])
+            for name in metric_names
+        }
+        source_names, sources = np.unique(np.concatenate(labels or [np.empty(0, dtype=str)]), return_inverse=True)
+        type_names, types = np.unique(np.concatenate(type_labels or [np.empty(0, dtype=str)]), return_inverse=True)
+        return cls(metrics, sources, types, list(source_names), list(type_names),
+                   sum(part.auto_accepted for part in parts))
+
+
+def threshold_sweep(combined: np.ndarray, thresholds: Sequence[float]) -> Dict[str, List[float]]:
+    """Pairs kept (score >= threshold) for every threshold, from one sort and one searchsorted"""
+    ordered = np.sort(combined)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    kept = len(ordered) - np.searchsorted(ordered, thresholds, side="left")
+    keep_rate = kept / len(ordered) if len(ordered) else np.zeros(len(thresholds))
+    return {
+        "threshold": thresholds.tolist(),
+        "kept": kept.tolist(),
+        "keep_rate": np.round(keep_rate, 4).tolist(),
+    }
+
+
+def percentiles(values: np.ndarray, pcts: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+    if len(values) == 0:
+        return {f"p{p:g}": 0.0 for p in pcts}
+    return {f"p{p:g}": float(v) for p, v in zip(pcts, np.percentile(values, pcts))}
+
+
+def histogram(values: np.ndarray) -> Dict[str, int]:
+    """Counts per integer score (scores are rounded)"""
+    if len(values) == 0:
+        return {}
+    ints = np.rint(values).astype(np.int64)
+    low = ints.min()
+    counts = np.bincount(ints - low)
+    return {str(low + i): int(c) for i, c in enumerate(counts) if c}
+
+
+def breakdown(arrays: RatingArrays, threshold: float) -> List[Dict[str, Any]]:
+    """Count, kept, keep rate and mean score per (source, generation type) via bincount"""
+    n_types = max(len(arrays.type_names), 1)
+    group = arrays.sources * n_types + arrays.generation_types
+    size = len(arrays.source_names) * n_types
+    counts = np.bincount(group, minlength=size)
+    kept = np.bincount(group, weights=arrays.combined >= threshold, minlength=size)
+    sums = np.bincount(group, weights=arrays.combined, minlength=size)
+
+    rows = []
+    for g in np.nonzero(counts)[0]:
+        rows.append({
+            "source": arrays.source_names[g // n_types],
+            "generation_type": arrays.type_names[g % n_types],
+            "count": int(counts[g]),
+            "kept": int(kept[g]),
+            "keep_rate": round(float(kept[g] / counts[g]), 4),
+            "mean_combined_score": round(float(sums[g] / counts[g]), 3),
+        })
+    return rows
+
+
+def build_report(arrays: RatingArrays, threshold: float, thresholds: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+    """Sweep, per-metric distributions and group breakdown in one JSON-serialisable dict"""
+    if thresholds is None:
+        top = float(arrays.combined.max()) if len(arrays) else 10.0
+        thresholds = np.arange(0.0, top + 0.5, 0.5)
+    return {
+        "ratings": len(arrays),
+        "auto_accepted": arrays.auto_accepted,
+        "threshold": threshold,
+        "kept_at_threshold": int((arrays.combined >= threshold).sum()),
+        "sweep": threshold_sweep(arrays.combined, thresholds),
+        "metrics": {
+            name: {
+                "mean": round(float(np.nanmean(values)), 3) if len(values) else 0.0,
+                "percentiles": percentiles(values[~np.isnan(values)]),
+                "histogram": histogram(values[~np.isnan(values)]),
+            }
+            for name, values in arrays.metrics.items()
+        },
+        "breakdown": breakdown(arrays, threshold),
+    }
+
+
+def write_report(report: Dict[str, Any], out_prefix: str):
+    """Write ``<prefix>.json``, ``<prefix>_sweep.csv`` and ``<prefix>_breakdown.csv``"""
+    os.makedirs(os.path.dirname(out_prefix) or ".", exist_ok=True)
+    with open(f"{out_prefix}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    sweep = report["sweep"]
+    with open(f"{out_prefix}_sweep.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["threshold", "kept", "keep_rate"])
+        writer.writerows(zip(sweep["threshold"], sweep["kept"], sweep["keep_rate"]))
+
+    with open(f"{out_prefix}_breakdown.csv", "w", newline="", encoding="utf-8") as f:
+        fields = ["source", "generation_type", "count", "kept", "keep_rate", "mean_combined_score"]
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(report["breakdown"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Curation analytics over stored judge ratings")
+    parser.add_argument("--store", default="data/ratings/ratings.sqlite", help="Rating store path")
+    parser.add_argument("--prompt-version", default=None, help="Judge prompt version (default: most common)")
+    parser.add_argument("--threshold", type=float, default=7.0, help="Threshold for kept counts and breakdowns")
+    parser.add_argument("--out", default="data/reports/curation", help="Output path prefix")
+    args = parser.parse_args()
+
+    store = RatingStore(args.store)
+    arrays = RatingArrays.from_store(store, args.prompt_version, store.most_common_version(auto_accepted=True))
+    report = build_report(arrays, args.threshold)
+    write_report(report, args.out)
+    print(f"📊 {report['ratings']} ratings, {report['kept_at_threshold']} kept at {args.threshold} → {args.out}.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# synthetic_data_kit/curate/cascade.py
+"""Two-stage judging: a cheap model rates every pair, the strong model only the uncertain ones.
+
+Pairs whose cheap combined score lands within ``band`` of the threshold, or
+that the cheap model failed to rate, are escalated to the strong model and its
+rating replaces the cheap one. A small deterministic audit sample of confident
+pairs is escalated too, so agreement between the two judges is measured on
+both the borderline and the confident pairs.
+
+Each rating records which judge made it. Escalation is decided against the
+threshold at rating time, so when pairs are selected at another threshold
+(``--threshold``, ``--recurate``, an incremental rebuild) stored cheap-only
+ratings inside the band around that threshold are escalated then.
+"""
+import zlib
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
+from synthetic_data_kit.curate.judge import QualityCurator
+from synthetic_data_kit.curate.rating_store import pair_hash
+from synthetic_data_kit.utils.checkpoint import content_hash
+from synthetic_data_kit.utils.json_repair import JSONRepairer
+
+# Stored rows checked for re-escalation at a time while selecting
+_ESCALATE_BLOCK = 500
+
+
+class CascadedCurator(QualityCurator):
+    """QualityCurator that escalates only borderline pairs to its (strong) provider"""
+
+    def __init__(self, provider: BedrockProvider, cheap_provider: BedrockProvider, config: Dict[str, Any],
+                 repairer: Optional[JSONRepairer] = None, executor: Optional[Executor] = None):
+        super().__init__(provider, config, repairer=repairer, executor=executor)
+        cascade_cfg = config.get("cascade", {})
+        self.cheap_provider = cheap_provider
+        self.band = cascade_cfg.get("band", 1.5)
+        self.audit_rate = cascade_cfg.get("audit_rate", 0.05)
+        self.cost_ratio = cascade_cfg.get("cost_ratio", 0.33)
+        self.cascade_stats = {
+            "rated": 0, "cheap_rated": 0, "escalated": 0, "audited": 0, "re_escalated": 0,
+            "band_agree": 0, "band_compared": 0, "audit_agree": 0, "audit_compared": 0,
+            "score_diff_sum": 0.0,
+        }
+        # Cascaded ratings are a different judge, so they are stored and journaled separately
+        self.prompt_version = content_hash(
+            self.prompt_key, self.rating_prompt, getattr(provider, "model_id", ""),
+            getattr(cheap_provider, "model_id", ""), self.band, sorted(self.METRICS)
+        )[:16]
+
+    @classmethod
+    def from_config(cls, provider: BedrockProvider, config: Dict[str, Any],
+                    repairer: Optional[JSONRepairer] = None,
+                    executor: Optional[Executor] = None) -> QualityCurator:
+        """A cascaded curator if ``cascade.enabled``, else a plain QualityCurator on ``provider``"""
+        cascade_cfg = config.get("cascade", {})
+        if not cascade_cfg.get("enabled", False):
+            return QualityCurator(provider, config, repairer=repairer, executor=executor)
+
+        cheap_provider = BedrockProvider(
+            model_id=cascade_cfg["model"],
+            region=cascade_cfg.get("region", config["bedrock"]["region"]),
+        )
+        return cls(provider, cheap_provider, config, repairer=repairer, executor=executor)
+
+    def _audited(self, pair: Dict[str, Any]) -> bool:
+        """Deterministic sample of ``audit_rate`` of all pairs, stable across runs"""
+        return zlib.crc32(pair_hash(pair).encode("utf-8")) % 10000 < self.audit_rate * 10000
+
+    def _rate_batch_usage(self, qa_pairs: List[Dict[str, Any]]):
+        cheap, usage = self._rate_pairs(qa_pairs, self.cheap_provider)
+
+        borderline, audit = set(), set()
+        for i, pair in enumerate(qa_pairs):
+            if i not in cheap or abs(cheap[i]["combined_score"] - self.threshold) < self.band:
+                borderline.add(i)
+            elif self._audited(pair):
+                audit.add(i)
+
+        escalate = sorted(borderline | audit)
+        strong = {}
+        if escalate:
+            rated, strong_usage = self._rate_pairs([qa_pairs[i] for i in escalate])
+            strong = {escalate[j]: eval_dict for j, eval_dict in rated.items()}
+            usage = [usage[0] + strong_usage[0], usage[1] + strong_usage[1]]
+
+        with self._stats_lock:
+            stats = self.cascade_stats
+            stats["rated"] += len(qa_pairs)
+            stats["cheap_rated"] += len(cheap)
+            stats["escalated"] += len(borderline)
+            stats["audited"] += len(audit)
+            for i, eval_dict in strong.items():
+                if i not in cheap:
+                    continue
+                agree = (cheap[i]["combined_score"] >= self.threshold) == (eval_dict["combined_score"] >= self.threshold)
+                group = "audit" if i in audit else "band"
+                stats[f"{group}_compared"] += 1
+                stats[f"{group}_agree"] += int(agree)
+                stats["score_diff_sum"] += abs(cheap[i]["combined_score"] - eval_dict["combined_score"])
+
+        # A strong rating overrides the cheap one; cheap ratings stand for confident pairs
+        final = {**{i: {**s, "judge": "cheap"} for i, s in cheap.items()},
+                 **{i: {**s, "judge": "strong"} for i, s in strong.items()}}
+        # Borderline pairs the strong model could not rate are left unrated rather than kept on a cheap guess
+        for i in borderline - strong.keys():
+            final.pop(i, None)
+        return self._attach_ratings(qa_pairs, final), usage
+
+    def _needs_escalation(self, scores: Dict[str, Any], threshold: float) -> bool:
+        # Ratings stored before judges were recorded may be cheap ones
+        return scores.get("judge", "cheap") == "cheap" and abs(scores["combined_score"] - threshold) < self.band
+
+    def _escalate_block(self, rows: List[Tuple[Dict[str, Any], Dict[str, Any], bool]], threshold: float):
+        """Strong ratings for the cheap-only rows in the band; rows the strong model cannot rate are dropped"""
+        stale = [i for i, (_, scores, auto) in enumerate(rows) if not auto and self._needs_escalation(scores, threshold)]
+        if not stale:
+            return rows
+
+        pairs = [rows[i][0] for i in stale]
+        pool = self.executor or ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = [(start, pool.submit(self._rate_pairs, batch)) for start, batch in self.plan_batches(pairs)]
+            strong = {}
+            for start, future in futures:
+                rated, usage = future.result()
+                self.observe_usage(*usage)
+                strong.update({stale[start + j]: {**s, "judge": "strong"} for j, s in rated.items()})
+        finally:
+            if self.executor is None:
+                pool.shutdown(wait=True)
+
+        self.rating_store.update([(rows[i][0], scores) for i, scores in strong.items()], self.prompt_version)
+        with self._stats_lock:
+            self.cascade_stats["re_escalated"] += len(stale)
+        return [
+            (pair, strong.get(i, scores), auto)
+            for i, (pair, scores, auto) in enumerate(rows)
+            if i in strong or i not in stale
+        ]
+
+    def _escalated(self, rows: Iterable[Tuple[Dict[str, Any], Dict[str, Any], bool]],
+                   threshold: float) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], bool]]:
+        """
+        Stored rows with cheap-only ratings near ``threshold`` escalated, in order
+
+        Rows pass straight through until one needs escalation; from then on
+        they are held (to keep the order) until the block is escalated.
+        """
+        block = []
+        for row in rows:
+            _, scores, auto = row
+            if not block and (auto or not self._needs_escalation(scores, threshold)):
+                yield row
+                continue
+            block.append(row)
+            if len(block) >= _ESCALATE_BLOCK:
+                yield from self._escalate_block(block, threshold)
+                block = []
+        yield from self._escalate_block(block, threshold)
+
+    def _select(self, stored, total: Optional[int], pdf_name: str, generation_type: str,
+                threshold: Optional[float], collect: bool, extra_metrics: Dict[str, Any]):
+        threshold = self.threshold if threshold is None else threshold
+        return super()._select(self._escalated(stored, threshold), total, pdf_name, generation_type,
+                               threshold, collect, extra_metrics)
+
+    def judge_pairs(self, qa_pairs: List[Dict[str, Any]], pdf_name: str, generation_type: str,
+                    journal=None, sources: Optional[Dict[str, str]] = None):
+        """``QualityCurator.judge_pairs`` with stored cheap-only ratings near the threshold escalated"""
+        return list(self._escalated(
+            super().judge_pairs(qa_pairs, pdf_name, generation_type, journal, sources), self.threshold
+        ))
+
+    def cascade_summary(self) -> Dict[str, Any]:
+        """Escalation and agreement rates, and judge cost relative to rating every pair with the strong model"""
+        with self._stats_lock:
+            stats = dict(self.cascade_stats)
+        rated = stats["rated"]
+        strong_items = stats["escalated"] + stats["audited"] + stats["re_escalated"]
+        compared = stats["band_compared"] + stats["audit_compared"]
+        cost = rated * self.cost_ratio + strong_items
+        return {
+            "rated": rated,
+            "escalated": stats["escalated"],
+            "audited": stats["audited"],
+            "re_escalated": stats["re_escalated"],
+            "escalation_rate": round(stats["escalated"] / rated, 4) if rated else 0.0,
+            "band_agreement": round(stats["band_agree"] / stats["band_compared"], 4) if stats["band_compared"] else None,
+            "audit_agreement": round(stats["audit_agree"] / stats["audit_compared"], 4) if stats["audit_compared"] else None,
+            "mean_abs_score_diff": round(stats["score_diff_sum"] / compared, 3) if compared else None,
+            "strong_ratings_avoided": rated - strong_items,
+            "estimated_cost_saved": round(1 - cost / rated, 4) if rated else 0.0,
+        }
@@ -1,166 +1,660 @@
 # synthetic_data_kit/curate/judge.py
 import os
 import json
-import re
-from typing import List, Dict, Any, Tuple
+import threading
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Tuple, Optional
 from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
+from synthetic_data_kit.utils.json_parser import extract_json, strip_code_fences
+from synthetic_data_kit.utils.checkpoint import CheckpointJournal, content_hash
+from synthetic_data_kit.utils.json_repair import JSONRepairer, RATING_SCHEMA
+from synthetic_data_kit.curate.prefilter import ACCEPT, JUDGE, REJECT, PairPreFilter
+from synthetic_data_kit.curate.rating_store import RatingStore, pair_hash
+
+# Pairs looked up in the rating store per query while selecting
+_SELECT_BLOCK = 500
 
 
 class QualityCurator:
-    def __init__(self, provider: BedrockProvider, config: Dict[str, Any]):
+    # Rated metrics and their maximum scores; combined_score is their sum
+    METRICS = {"accuracy": 3, "relevance": 2, "clarity": 2, "usefulness": 3}
+    prompt_key = "qa_rating"
+    rating_schema = RATING_SCHEMA
+
+    def __init__(self, provider: BedrockProvider, config: Dict[str, Any],
+                 repairer: Optional[JSONRepairer] = None, executor: Optional[Executor] = None):
         self.provider = provider
         self.config = config
-        self.rating_prompt = config['prompts']['qa_rating']
+        self.repairer = repairer if repairer is not None else JSONRepairer.from_config(config)
+        self.rating_prompt = config['prompts'][self.prompt_key]
         self.threshold = config['curate']['threshold']
+        self.output_dir = config.get('data', {}).get('output_dir', 'data')
         self.batch_size = config['curate']['batch_size']
+        # Judge batches run concurrently on a shared executor if given, else on a private pool
+        self.executor = executor
+        # A shared scheduler lane reports the global limit, so the in-flight window can fill it
+        self.max_workers = getattr(executor, 'max_workers', None) or config['curate'].get('max_workers', 4)
+        self.rerate_attempts = config['curate'].get('rerate_attempts', 1)
+        self.judge_stats = {"rerated": 0, "unrated": 0, "split": 0}
+        # Batches are packed to token budgets using a moving average of output tokens per rating
+        curate_cfg = config['curate']
+        self.batching = curate_cfg.get('batching', 'tokens')
+        self.max_batch_size = curate_cfg.get('max_batch_size', 32)
+        self.max_tokens = curate_cfg.get('max_tokens', 4096)
+        self.input_token_budget = curate_cfg.get('input_token_budget', 12000)
+        self.output_token_margin = curate_cfg.get('output_token_margin', 0.8)
+        self.output_tokens_per_item = float(curate_cfg.get('initial_output_tokens_per_item', 60))
+        self.usage_smoothing = curate_cfg.get('usage_smoothing', 0.2)
+        self.prefilter = PairPreFilter.from_config(config)
+        # Ratings persist per judge prompt version, so re-curating never re-judges
+        self.rating_store = RatingStore.from_config(config)
+        self.prompt_version = content_hash(
+            self.prompt_key, self.rating_prompt, getattr(provider, "model_id", ""), sorted(self.METRICS)
+        )[:16]
+        self._stats_lock = threading.Lock()
+        self.audit_stats = {"audited": 0, "agree": 0}
+
+    @property
+    def accept_version(self) -> Optional[str]:
+        """
+        Version auto-accepted pairs are stored under, or None without auto-accept
+
+        It covers the judge version and every pre-filter setting, so changing
+        the pre-filter (or turning auto-accept off) sends those pairs back to
+        the judge instead of reusing a stale acceptance.
+        """
+        if self.prefilter is None or not self.prefilter.auto_accept:
+            return None
+        return content_hash("auto_accept", self.prompt_version, self.prefilter.settings())[:16]
+
+    def auto_accept_scores(self, confidence: float) -> Dict[str, Any]:
+        """Scores for an auto-accepted pair: its pre-filter confidence on the combined-score scale"""
+        return {
+            "prefilter": "auto_accept",
+            "confidence": round(float(confidence), 3),
+            "combined_score": round(float(confidence) * sum(self.METRICS.values()), 2),
+        }
 
     def clean_json_response(self, text: str) -> str:
         """Remove markdown code fences and extra whitespace"""
-        text = text.strip()
+        return strip_code_fences(text.strip())
 
-        # Remove ```json ... ``` or ``` ... ``` blocks
-        if text.startswith("```"):
-            text = re.sub(r"```[a-zA-Z]*\n?", "", text)
-            text = text.replace("```", "").strip()
+    def safe_json_parse(self, text_output: str):
+        """Parse JSON with fallbacks for fences, prose and truncated arrays"""
+        parsed = extract_json(text_output, default=None)
+        if parsed is None:
+            # Fallback: return empty to avoid crash
+            print("❌ Still failed to parse JSON, returning []. Raw starts with:")
+            print(text_output[:300])
+            return []
+        return parsed
 
-        return text
+    def render_pair(self, pair: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields of a pair shown to the judge"""
+        return {"question": pair.get("question"), "answer": pair.get("answer")}
 
-    def safe_json_parse(self, text_output: str):
-        """Try to parse JSON with fallbacks for minor formatting issues"""
-        text_output = self.clean_json_response(text_output)
+    def _parse_rating(self, rating_obj: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Scores from one judge item, or None if any metric is missing or not a number"""
+        eval_dict = {}
+        for name in self.METRICS:
+            value = rating_obj.get(name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            eval_dict[name] = value
+        combined = rating_obj.get("combined_score")
+        if isinstance(combined, bool) or not isinstance(combined, (int, float)):
+            combined = sum(eval_dict.values())
+        eval_dict["combined_score"] = combined
+        return eval_dict
 
-        try:
-            return json.loads(text_output)
-        except json.JSONDecodeError:
-            # Try trimming trailing commas/brackets
-            repaired = text_output.rstrip(", \n")
-            try:
-                return json.loads(repaired)
-            except Exception:
-                # Fallback: return empty to avoid crash
-                print("❌ Still failed to parse JSON, returning []. Raw starts with:")
-                print(text_output[:300])
-                return []
+    def _request_ratings(self, items: Dict[str, Dict[str, Any]], provider: Optional[BedrockProvider] = None):
+        """
+        One judge call for id -> pair, on ``provider`` (default: the curator's own)
 
-    def rate_batch(
-        self, qa_pairs: List[Dict[str, Any]]
-    ) -> List[Tuple[Dict[str, Any], Dict[str, float]]]:
-        """Send a batch of QA pairs to model for rating"""
+        Returns:
+            (scores for every id the judge rated validly, output tokens used,
+            whether the response was cut off at ``max_tokens``)
+        """
         pairs_json = json.dumps(
-            [{"question": p.get("question"), "answer": p.get("answer")} for p in qa_pairs],
+            [{"id": item_id, **self.render_pair(pair)} for item_id, pair in items.items()],
             indent=2
         )
 
         prompt = self.rating_prompt.format(pairs=pairs_json)
-        
-        # ← INCREASED max_tokens for curation to 4096
-        response = self.provider.generate(prompt, temperature=0.2, max_tokens=4096)
+
+        response = (provider or self.provider).generate(prompt, temperature=0.2, max_tokens=self.max_tokens)
 
         # Extract text
         text_output = ""
         if "content" in response and len(response["content"]) > 0:
             text_output = response["content"][0]["text"]
+        truncated = response.get("stop_reason") == "max_tokens"
+        output_tokens = response.get("usage", {}).get("output_tokens") or self.estimate_tokens(text_output)
 
         ratings = self.safe_json_parse(text_output)
+        if not ratings and self.repairer is not None and not truncated:
+            ratings = self.repairer.repair(text_output, self.rating_schema) or []
         if not isinstance(ratings, list):
             ratings = [ratings] if ratings else []
 
+        rated = {}
+        for rating_obj in ratings:
+            if not isinstance(rating_obj, dict):
+                continue
+            item_id = str(rating_obj.get("id", "")).strip()
+            if item_id.isdigit():
+                item_id = f"p{item_id}"
+            eval_dict = self._parse_rating(rating_obj)
+            if item_id in items and eval_dict is not None:
+                rated.setdefault(item_id, eval_dict)
+        return rated, output_tokens, truncated
+
+    def _rate_items(self, items: Dict[str, Dict[str, Any]], usage: List[int],
+                    provider: Optional[BedrockProvider] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Rate items, splitting and retrying whatever a truncated response lost
+
+        Complete ratings salvaged from a truncated response are kept; the rest
+        is split in half and re-requested. ``usage`` accumulates
+        [output tokens, items those tokens covered].
+        """
+        rated, output_tokens, truncated = self._request_ratings(items, provider)
+        usage[0] += output_tokens
+        usage[1] += len(rated) if truncated else len(items)
+
+        missing = {item_id: pair for item_id, pair in items.items() if item_id not in rated}
+        if truncated and len(missing) > 1:
+            with self._stats_lock:
+                self.judge_stats["split"] += 1
+            ids = list(missing)
+            half = len(ids) // 2
+            for part in (ids[:half], ids[half:]):
+                rated.update(self._rate_items({item_id: missing[item_id] for item_id in part}, usage, provider))
+        return rated
+
+    def _rate_pairs(self, qa_pairs: List[Dict[str, Any]], provider: Optional[BedrockProvider] = None):
+        """
+        Rate pairs with re-rating of missing items
+
+        Returns:
+            (index in ``qa_pairs`` -> scores for every rated pair, [output tokens, items covered])
+        """
+        items = {f"p{i}": pair for i, pair in enumerate(qa_pairs)}
+        usage = [0, 0]
+        rated = self._rate_items(items, usage, provider)
+
+        for _ in range(self.rerate_attempts):
+            missing = {item_id: pair for item_id, pair in items.items() if item_id not in rated}
+            if not missing:
+                break
+            with self._stats_lock:
+                self.judge_stats["rerated"] += len(missing)
+            rated.update(self._rate_items(missing, usage, provider))
+
+        return {i: rated[f"p{i}"] for i in range(len(qa_pairs)) if f"p{i}" in rated}, usage
+
+    def _attach_ratings(self, qa_pairs: List[Dict[str, Any]], rated: Dict[int, Dict[str, float]]):
+        """(pair with evaluation, scores) for rated pairs in input order; the rest are counted as unrated"""
         results = []
-        for pair, rating_obj in zip(qa_pairs, ratings):
-            accuracy = rating_obj.get("accuracy", 0)
-            relevance = rating_obj.get("relevance", 0)
-            clarity = rating_obj.get("clarity", 0)
-            usefulness = rating_obj.get("usefulness", 0)
-            combined = rating_obj.get(
-                "combined_score",
-                accuracy + relevance + clarity + usefulness,
-            )
+        for i, pair in enumerate(qa_pairs):
+            eval_dict = rated.get(i)
+            if eval_dict is None:
+                with self._stats_lock:
+                    self.judge_stats["unrated"] += 1
+                continue
 
             # Attach evaluation metrics to pair
-            pair_with_eval = {
-                **pair,
-                "evaluation": {
-                    "accuracy": accuracy,
-                    "relevance": relevance,
-                    "clarity": clarity,
-                    "usefulness": usefulness,
-                    "combined_score": combined,
-                },
-            }
+            pair_with_eval = {**pair, "evaluation": dict(eval_dict)}
+            results.append((pair_with_eval, eval_dict))
+        return results
 
-            eval_dict = {
-                "accuracy": accuracy,
-                "relevance": relevance,
-                "clarity": clarity,
-                "usefulness": usefulness,
-                "combined_score": combined,
-            }
+    def _rate_batch_usage(self, qa_pairs: List[Dict[str, Any]]):
+        """``rate_batch`` that also returns [output tokens, items covered]"""
+        rated, usage = self._rate_pairs(qa_pairs)
+        return self._attach_ratings(qa_pairs, rated), usage
 
-            results.append((pair_with_eval, eval_dict))
+    def rate_batch(
+        self, qa_pairs: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, float]]]:
+        """
+        Send a batch of QA pairs to model for rating
 
+        Each pair gets a short id and ratings are matched back by id, so items
+        the judge drops or reorders never receive another pair's scores.
+        Responses cut off at ``max_tokens`` are split and retried, and items
+        still missing are re-rated on their own, up to
+        ``curate.rerate_attempts`` extra rounds; any still unrated are left out.
+        """
+        results, usage = self._rate_batch_usage(qa_pairs)
+        self.observe_usage(*usage)
         return results
 
-    def curate(self, qa_pairs: List[Dict[str, Any]], pdf_name: str, generation_type: str):
-        """Curate dataset by filtering low-rated pairs"""
-        curated = []
+    def _rate_checkpointed_usage(self, batch: List[Dict[str, Any]], journal: Optional[CheckpointJournal]):
+        """
+        Rate through the journal; replayed batches return their recorded usage
 
-        all_accuracy, all_relevance, all_clarity, all_usefulness, all_combined = (
-            [],
-            [],
-            [],
-            [],
-            [],
-        )
+        Only fully rated batches are journaled, so a batch with pairs the judge
+        left unrated is rated again on resume (as are such batches journaled
+        by older runs).
+        """
+        if journal is None:
+            return self._rate_batch_usage(batch)
+
+        key = content_hash("rate", self.prompt_version, batch)
+        entry = journal.entries.get(key)
+        if isinstance(entry, list):
+            # Journaled before usage was recorded
+            entry = {"results": entry, "usage": [0, 0]}
+        if entry is not None and len(entry["results"]) == len(batch):
+            journal.get(key)  # counted as a replay
+            return [tuple(item) for item in entry["results"]], entry["usage"]
+
+        results, usage = self._rate_batch_usage(batch)
+        if len(results) == len(batch):
+            journal.record(key, {"results": [list(item) for item in results], "usage": usage})
+        return results, usage
+
+    def rate_batch_checkpointed(
+        self, batch: List[Dict[str, Any]], journal: Optional[CheckpointJournal]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, float]]]:
+        """Rate a batch through the checkpoint journal"""
+        results, usage = self._rate_checkpointed_usage(batch, journal)
+        self.observe_usage(*usage)
+        return results
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token count (about four characters per token)"""
+        return len(text) // 4 + 1
+
+    def observe_usage(self, output_tokens: int, items: int):
+        """Fold observed output tokens per rated item into the moving average"""
+        if items <= 0:
+            return
+        with self._stats_lock:
+            per_item = output_tokens / items
+            self.output_tokens_per_item += self.usage_smoothing * (per_item - self.output_tokens_per_item)
+
+    def plan_batches(self, qa_pairs: List[Dict[str, Any]]) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Yield (start index, batch) packed to the input and output token budgets
+
+        A batch grows until its rendered pairs would exceed the input budget,
+        its expected ratings (at the current output tokens per item) would
+        exceed the output budget, or it reaches ``max_batch_size``. The budget
+        is read as each batch is planned, so batches adapt as usage is observed.
+        With ``curate.batching: fixed`` batches are ``batch_size`` pairs.
+        """
+        if self.batching == "fixed":
+            for i in range(0, len(qa_pairs), self.batch_size):
+                yield i, qa_pairs[i : i + self.batch_size]
+            return
+
+        prompt_tokens = self.estimate_tokens(self.rating_prompt)
+        output_budget = self.max_tokens * self.output_token_margin
+        start = 0
+        while start < len(qa_pairs):
+            input_tokens = prompt_tokens
+            end = start
+            while end < len(qa_pairs) and end - start < self.max_batch_size:
+                cost = self.estimate_tokens(json.dumps(self.render_pair(qa_pairs[end]))) + 8
+                fits_input = input_tokens + cost <= self.input_token_budget
+                fits_output = (end - start + 1) * self.output_tokens_per_item <= output_budget
+                if end > start and not (fits_input and fits_output):
+                    break
+                input_tokens += cost
+                end += 1
+            yield start, qa_pairs[start:end]
+            start = end
+
+    def count_batches(self, qa_pairs: List[Dict[str, Any]]) -> int:
+        """Judge calls the current budgets would take for ``qa_pairs``"""
+        return sum(1 for _ in self.plan_batches(qa_pairs))
+
+    def _iter_rated(self, qa_pairs: List[Dict[str, Any]], journal: Optional[CheckpointJournal]):
+        """
+        Rate batches concurrently, yielding (end index, results) in input order
 
-        for i in range(0, len(qa_pairs), self.batch_size):
-            batch = qa_pairs[i : i + self.batch_size]
-            batch_results = self.rate_batch(batch)
+        ``end`` is the index just past the batch, so every pair before it has
+        been rated once its results are yielded. At most ``2 * max_workers`` batches are in flight, so memory stays
+        bounded however many pairs are curated. Usage is folded into the
+        token estimate as results are consumed, in order, so batch boundaries
+        are the same on a resumed run.
+        """
+        batches = self.plan_batches(qa_pairs)
+        pool = self.executor or ThreadPoolExecutor(max_workers=self.max_workers)
+        window = deque()
 
-            for pair_with_eval, eval_dict in batch_results:
-                all_accuracy.append(eval_dict["accuracy"])
-                all_relevance.append(eval_dict["relevance"])
-                all_clarity.append(eval_dict["clarity"])
-                all_usefulness.append(eval_dict["usefulness"])
-                all_combined.append(eval_dict["combined_score"])
+        def consume():
+            end, future = window.popleft()
+            results, usage = future.result()
+            self.observe_usage(*usage)
+            return end, results
 
-                if eval_dict["combined_score"] >= self.threshold:
+        try:
+            for start, batch in batches:
+                window.append((start + len(batch), pool.submit(self._rate_checkpointed_usage, batch, journal)))
+                if len(window) >= 2 * self.max_workers:
+                    yield consume()
+            while window:
+                yield consume()
+        finally:
+            for _, future in window:
+                future.cancel()
+            if self.executor is None:
+                pool.shutdown(wait=True)
+
+    def record_ratings(self, results: List[Tuple[Dict[str, Any], Dict[str, float]]], source: str,
+                       generation_type: str):
+        """Persist judge results in the rating store under the current prompt version"""
+        self.rating_store.add(results, self.prompt_version, source, generation_type)
+
+    def curate(self, qa_pairs: List[Dict[str, Any]], pdf_name: str, generation_type: str,
+               journal: Optional[CheckpointJournal] = None, collect: bool = True,
+               sources: Optional[Dict[str, str]] = None, threshold: Optional[float] = None):
+        """
+        Curate dataset by filtering low-rated pairs, replaying batches already in the journal
+
+        Every rating is written to the rating store, and pairs the store has
+        already rated under the current judge prompt are not judged again.
+        Kept pairs are streamed to the output file in input order as the
+        judge batches covering them finish. With ``collect=False`` kept pairs
+        are not held in memory and None is returned in their place.
+
+        With a pre-filter configured, ``sources`` (chunk texts keyed by chunk
+        id) lets it reject hopeless pairs and auto-accept near-certain ones
+        before any judge call.
+        """
+        hashes, candidates, unrated, audit, extra_metrics = self._pending(qa_pairs, pdf_name, generation_type,
+                                                                          sources)
+        rows = self._rated_rows(qa_pairs, hashes, candidates, unrated, audit, extra_metrics, journal,
+                                pdf_name, generation_type)
+        return self._select(rows, len(qa_pairs), pdf_name, generation_type, threshold, collect, extra_metrics)
+
+    def _rated_rows(self, qa_pairs: List[Dict[str, Any]], hashes: List[str], candidates: List[int],
+                    unrated: List[int], audit: Dict[str, float], extra_metrics: Dict[str, Any],
+                    journal: Optional[CheckpointJournal], pdf_name: str, generation_type: str):
+        """
+        (pair, scores, auto_accepted) for ``candidates`` in input order, as soon as each is final
+
+        A candidate is final once every unrated pair before it has been
+        judged; reused ratings and auto-accepts come from the store, fresh
+        judge ratings straight from their batch. The audit agreement is added
+        to ``extra_metrics`` once the last batch is in.
+        """
+        position = 0
+        for end, results in self._iter_rated([qa_pairs[i] for i in unrated], journal):
+            self.record_ratings(results, pdf_name, generation_type)
+            until = unrated[end] if end < len(unrated) else len(qa_pairs)
+            ready = bisect_left(candidates, until, lo=position)
+            judged = {pair_hash(pair): scores for pair, scores in results}
+            yield from self._stored(qa_pairs, hashes, candidates[position:ready], judged)
+            position = ready
+        if audit:
+            extra_metrics["prefilter_audit_agreement"] = self._check_audit(audit)
+        yield from self._stored(qa_pairs, hashes, candidates[position:])
+
+    def rate_all(self, qa_pairs: List[Dict[str, Any]], pdf_name: str, generation_type: str,
+                 journal: Optional[CheckpointJournal] = None, sources: Optional[Dict[str, str]] = None):
+        """
+        Make sure every pair that passes the pre-filter has a stored rating
+
+        Returns:
+            (pair hashes, indices of pairs not rejected, pre-filter and reuse metrics)
+        """
+        hashes, candidates, unrated, audit, extra_metrics = self._pending(qa_pairs, pdf_name, generation_type,
+                                                                          sources)
+        for _, batch_results in self._iter_rated([qa_pairs[i] for i in unrated], journal):
+            self.record_ratings(batch_results, pdf_name, generation_type)
+        if audit:
+            extra_metrics["prefilter_audit_agreement"] = self._check_audit(audit)
+        return hashes, candidates, extra_metrics
+
+    def judge_pairs(self, qa_pairs: List[Dict[str, Any]], pdf_name: str, generation_type: str,
+                    journal: Optional[CheckpointJournal] = None,
+                    sources: Optional[Dict[str, str]] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any], bool]]:
+        """
+        Pre-filter, rate and store a small set of pairs on the calling thread
+
+        The streaming counterpart of ``curate``: no output file is written.
+        Without a shared executor batches are rated one after another, so
+        callers get their concurrency from running several ``judge_pairs``
+        at once; with one, the batches are submitted to it and awaited.
+
+        Returns:
+            (pair, scores, auto_accepted) for every pair not rejected, in input order
+        """
+        hashes, candidates, unrated, audit, _ = self._pending(qa_pairs, pdf_name, generation_type, sources)
+        batches = self.plan_batches([qa_pairs[i] for i in unrated])
+        if self.executor is None:
+            for _, batch in batches:
+                self.record_ratings(self.rate_batch_checkpointed(batch, journal), pdf_name, generation_type)
+        else:
+            futures = [self.executor.submit(self.rate_batch_checkpointed, batch, journal) for _, batch in batches]
+            for future in futures:
+                self.record_ratings(future.result(), pdf_name, generation_type)
+        if audit:
+            self._check_audit(audit)
+        return list(self._stored(qa_pairs, hashes, candidates))
+
+    def _pending(self, qa_pairs: List[Dict[str, Any]], pdf_name: str, generation_type: str,
+                 sources: Optional[Dict[str, str]]):
+        """
+        Run the pre-filter and find the pairs that still need the judge
+
+        Auto-accepted pairs are stored under ``accept_version``; the audit
+        sample of them is judged as well.
+
+        Returns:
+            (pair hashes, indices of pairs not rejected, indices of pairs to rate,
+            audited hash -> auto-accept score, metrics)
+        """
+        hashes = [pair_hash(pair) for pair in qa_pairs]
+        candidates = list(range(len(qa_pairs)))
+        to_judge = candidates
+        audit: Dict[str, float] = {}
+        extra_metrics: Dict[str, Any] = {}
+        if self.prefilter is not None:
+            with self._stats_lock:
+                decisions, confidence = self.prefilter.score(qa_pairs, sources, generation_type)
+            candidates = [i for i in candidates if decisions[i] != REJECT]
+            accepted = []
+            for i in candidates:
+                if decisions[i] == ACCEPT:
+                    scores = self.auto_accept_scores(confidence[i])
+                    accepted.append((qa_pairs[i], scores))
+                    if self.prefilter.audited(hashes[i]):
+                        audit[hashes[i]] = scores["combined_score"]
+            to_judge = [i for i in candidates if decisions[i] == JUDGE or hashes[i] in audit]
+            if accepted:
+                self.rating_store.add(accepted, self.accept_version, pdf_name, generation_type, auto_accepted=True)
+            extra_metrics = {
+                "prefilter_rejected": int((decisions == REJECT).sum()),
+                "prefilter_accepted": len(accepted),
+                "judge_calls_avoided": self.count_batches(qa_pairs) - self.count_batches([qa_pairs[i] for i in to_judge]),
+            }
+
+        # Only pairs never rated under this judge prompt cost a call
+        known = self.rating_store.rated([hashes[i] for i in to_judge], self.prompt_version)
+        unrated = [i for i in to_judge if hashes[i] not in known]
+        extra_metrics["ratings_reused"] = len(to_judge) - len(unrated)
+        return hashes, candidates, unrated, audit, extra_metrics
+
+    def _check_audit(self, audit: Dict[str, float]) -> Optional[float]:
+        """Compare judge ratings of audited auto-accepts with their pre-filter scores; the agreement rate"""
+        judged = self.rating_store.lookup(audit, self.prompt_version)
+        agree = sum((audit[h] >= self.threshold) == (scores["combined_score"] >= self.threshold)
+                    for h, (scores, _) in judged.items())
+        with self._stats_lock:
+            self.audit_stats["audited"] += len(judged)
+            self.audit_stats["agree"] += agree
+        return round(agree / len(judged), 4) if judged else None
+
+    def audit_summary(self) -> Dict[str, Any]:
+        """How often the judge agreed with the pre-filter on the audited auto-accepts"""
+        with self._stats_lock:
+            stats = dict(self.audit_stats)
+        stats["agreement"] = round(stats["agree"] / stats["audited"], 4) if stats["audited"] else None
+        return stats
+
+    def _stored(self, qa_pairs: List[Dict[str, Any]], hashes: List[str], candidates: List[int],
+                judged: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        (pair, scores, auto_accepted) from the store for ``candidates``, in input order
+
+        ``judged`` holds ratings just made (by pair hash), used without a
+        store lookup. A judge rating wins over an auto-accept, so audited
+        pairs use the judge's scores.
+        """
+        judged = judged or {}
+        accept_version = self.accept_version
+        for block_start in range(0, len(candidates), _SELECT_BLOCK):
+            indices = candidates[block_start:block_start + _SELECT_BLOCK]
+            block = [hashes[i] for i in indices]
+            found = self.rating_store.lookup([h for h in block if h not in judged], self.prompt_version)
+            if accept_version is not None:
+                found = {**self.rating_store.lookup([h for h in block if h not in found and h not in judged],
+                                                    accept_version), **found}
+            found.update({h: (judged[h], False) for h in block if h in judged})
+            for i, h in zip(indices, block):
+                if h in found:
+                    yield (qa_pairs[i], *found[h])
+
+    def recurate(self, pdf_name: str, generation_type: str, threshold: Optional[float] = None,
+                 collect: bool = True):
+        """
+        Re-curate a stored run at any threshold without calling the judge
+
+        Auto-accepts count only if made under the current pre-filter settings
+        and not since rated by the judge.
+        """
+        stored = self.rating_store.iter_ratings(self.prompt_version, pdf_name, generation_type,
+                                                fallback_version=self.accept_version)
+        return self._select(stored, None, pdf_name, generation_type, threshold, collect, {})
+
+    def _select(self, stored, total: Optional[int], pdf_name: str, generation_type: str,
+                threshold: Optional[float], collect: bool, extra_metrics: Dict[str, Any]):
+        """Write the pairs that pass ``threshold`` from (pair, scores, auto_accepted) rows"""
+        threshold = self.threshold if threshold is None else threshold
+        curated = [] if collect else None
+        running = self.running_metrics()
+        seen = 0
+
+        with CuratedWriter(self.output_path(pdf_name, generation_type)) as writer:
+            for pair, scores, auto_accepted in stored:
+                seen += 1
+                # Averages are over judge ratings; auto-accepts only have a combined score
+                if not auto_accepted:
+                    running.add(scores)
+                if scores["combined_score"] < threshold:
+                    continue
+                pair_with_eval = {**pair, "evaluation": scores}
+                writer.write(pair_with_eval)
+                if collect:
                     curated.append(pair_with_eval)
 
-        # Compute averages
-        metrics = {
-            "total": len(qa_pairs),
-            "kept": len(curated),
-            "avg_accuracy": round(sum(all_accuracy) / len(all_accuracy), 2)
-            if all_accuracy
-            else 0,
-            "avg_relevance": round(sum(all_relevance) / len(all_relevance), 2)
-            if all_relevance
-            else 0,
-            "avg_clarity": round(sum(all_clarity) / len(all_clarity), 2)
-            if all_clarity
-            else 0,
-            "avg_usefulness": round(sum(all_usefulness) / len(all_usefulness), 2)
-            if all_usefulness
-            else 0,
-            "avg_combined_score": round(sum(all_combined) / len(all_combined), 2)
-            if all_combined
-            else 0,
-        }
+            total = seen if total is None else total
+            metrics = running.metrics(total, writer.count)
+            metrics["threshold"] = threshold
+            metrics.update(extra_metrics)
 
-        # Save curated output
-        os.makedirs("data/curated", exist_ok=True)
+        self.print_summary(writer.count, total, metrics, writer.path, generation_type)
+        return curated, metrics
+
+    def compute_metrics(self, total: int, kept: int, evals: List[Dict[str, float]]) -> Dict[str, Any]:
+        """Average each rating metric over every rated pair"""
+        running = self.running_metrics()
+        for eval_dict in evals:
+            running.add(eval_dict)
+        return running.metrics(total, kept)
+
+    def running_metrics(self) -> "RunningMetrics":
+        return RunningMetrics(list(self.METRICS) + ["combined_score"])
+
+    def output_path(self, pdf_name: str, generation_type: str) -> str:
         suffix = "qa" if generation_type == "qa" else "cot"
-        out_file = f"data/curated/{pdf_name}_{suffix}_curated.json"
+        return os.path.join(self.output_dir, "curated", f"{pdf_name}_{suffix}_curated.json")
 
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(curated, f, indent=2)
+    def save_curated(self, curated: List[Dict[str, Any]], total: int, metrics: Dict[str, Any],
+                     pdf_name: str, generation_type: str):
+        """Save curated pairs and print the metrics summary"""
+        with CuratedWriter(self.output_path(pdf_name, generation_type)) as writer:
+            for pair in curated:
+                writer.write(pair)
+        self.print_summary(len(curated), total, metrics, writer.path, generation_type)
 
-        print(f"\n💾 Saved {len(curated)}/{len(qa_pairs)} curated {generation_type.upper()} pairs → {out_file}")
+    def print_summary(self, kept: int, total: int, metrics: Dict[str, Any], out_file: str, generation_type: str):
+        print(f"\n💾 Saved {kept}/{total} curated {generation_type.upper()} pairs → {out_file}")
         print("📊 Metrics:")
-        print(f"   - Accuracy:    {metrics['avg_accuracy']}/3")
-        print(f"   - Relevance:   {metrics['avg_relevance']}/2")
-        print(f"   - Clarity:     {metrics['avg_clarity']}/2")
-        print(f"   - Usefulness:  {metrics['avg_usefulness']}/3")
-        print(f"   - Combined:    {metrics['avg_combined_score']}/10")
+        width = max(12, *(len(name) + 2 for name in self.METRICS))
+        for name, max_score in self.METRICS.items():
+            print(f"   - {name.capitalize() + ':':<{width}} {metrics[f'avg_{name}']}/{max_score}")
+        print(f"   - {'Combined:':<{width}} {metrics['avg_combined_score']}/{sum(self.METRICS.values())}")
+        if "judge_calls_avoided" in metrics:
+            print(f"   - Pre-filter:  {metrics['prefilter_rejected']} rejected, "
+                  f"{metrics['prefilter_accepted']} auto-accepted, "
+                  f"{metrics['judge_calls_avoided']} judge calls avoided")
+        if metrics.get("prefilter_audit_agreement") is not None:
+            print(f"   - Audit:       judge agreed with {metrics['prefilter_audit_agreement']:.0%} of sampled auto-accepts")
+
+
+class RunningMetrics:
+    """Running sums of rating metrics, so averages need no per-pair lists"""
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        self.count = 0
+        self.sums = {field: 0.0 for field in fields}
+
+    def add(self, eval_dict: Dict[str, float]):
+        self.count += 1
+        for field in self.fields:
+            self.sums[field] += eval_dict[field]
+
+    def metrics(self, total: int, kept: int) -> Dict[str, Any]:
+        """``total``, ``kept``, ``rated`` and ``avg_<field>`` for every field"""
+        metrics = {"total": total, "kept": kept, "rated": self.count}
+        for field in self.fields:
+            metrics[f"avg_{field}"] = round(self.sums[field] / self.count, 2) if self.count else 0
+        return metrics
+
+
+class CuratedWriter:
+    """
+    Streams pairs into a JSON array file
+
+    Pairs are written to ``<path>.partial`` as they arrive and the file is
+    moved into place on close, so readers never see a half-written array.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._partial = f"{path}.partial"
+        self._file = open(self._partial, "w", encoding="utf-8")
+        self._file.write("[")
+
+    def write(self, pair: Dict[str, Any]):
+        item = json.dumps(pair, indent=2).replace("\n", "\n  ")
+        self._file.write(("," if self.count else "") + "\n  " + item)
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        os.replace(self._partial, self.path)
+
+    def __enter__(self):
+        return self
 
-        return curated, metrics
\ No newline at end of file
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+        return False
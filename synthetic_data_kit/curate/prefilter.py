@@ -0,0 +1,182 @@
+# synthetic_data_kit/curate/prefilter.py
+"""Local heuristic pre-scoring of generated pairs ahead of the LLM judge.
+
+Pairs are checked against their source chunk (looked up by ``chunk_id``) with
+schema, length and token-overlap tests computed for the whole set at once in
+numpy. Hopeless pairs are rejected without a judge call, a small set of very
+high-confidence pairs is accepted outright, and only the rest are judged.
+A small deterministic sample of the accepted pairs is judged as well, to
+measure how often the judge agrees with the pre-filter.
+"""
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from synthetic_data_kit.create.allocator import STOPWORDS
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+JUDGE = 0
+REJECT = 1
+ACCEPT = 2
+
+
+def _token_ids(text: str) -> List[int]:
+    """Stable 32-bit ids of the content words in ``text``"""
+    return [
+        zlib.crc32(word.encode("utf-8"))
+        for word in _WORD_RE.findall(text.lower())
+        if len(word) > 2 and word not in STOPWORDS
+    ]
+
+
+class PairPreFilter:
+    """Vectorized schema, length and overlap checks that route pairs to reject, accept or judge"""
+
+    def __init__(self, min_question_words: int = 4, min_answer_words: int = 2,
+                 max_answer_to_source: float = 1.0, min_question_overlap: float = 0.0,
+                 auto_accept: bool = False, accept_answer_overlap: float = 0.9,
+                 accept_question_overlap: float = 0.6, accept_answer_words: Tuple[int, int] = (8, 120),
+                 audit_rate: float = 0.05):
+        self.min_question_words = min_question_words
+        self.min_answer_words = min_answer_words
+        self.max_answer_to_source = max_answer_to_source
+        self.min_question_overlap = min_question_overlap
+        self.auto_accept = auto_accept
+        self.accept_answer_overlap = accept_answer_overlap
+        self.accept_question_overlap = accept_question_overlap
+        self.accept_answer_words = accept_answer_words
+        self.audit_rate = audit_rate
+        self.stats = {"seen": 0, "rejected": 0, "accepted": 0, "judged": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["PairPreFilter"]:
+        """Build a pre-filter from the ``prefilter`` config section, or None if disabled"""
+        prefilter_cfg = config.get("prefilter", {})
+        if not prefilter_cfg.get("enabled", False):
+            return None
+        return cls(
+            min_question_words=prefilter_cfg.get("min_question_words", 4),
+            min_answer_words=prefilter_cfg.get("min_answer_words", 2),
+            max_answer_to_source=prefilter_cfg.get("max_answer_to_source", 1.0),
+            min_question_overlap=prefilter_cfg.get("min_question_overlap", 0.0),
+            auto_accept=prefilter_cfg.get("auto_accept", False),
+            accept_answer_overlap=prefilter_cfg.get("accept_answer_overlap", 0.9),
+            accept_question_overlap=prefilter_cfg.get("accept_question_overlap", 0.6),
+            accept_answer_words=tuple(prefilter_cfg.get("accept_answer_words", [8, 120])),
+            audit_rate=prefilter_cfg.get("audit_rate", 0.05),
+        )
+
+    def settings(self) -> Dict[str, Any]:
+        """Every setting that decides which pairs are accepted, for versioning stored auto-accepts"""
+        return {
+            "min_question_words": self.min_question_words,
+            "min_answer_words": self.min_answer_words,
+            "max_answer_to_source": self.max_answer_to_source,
+            "min_question_overlap": self.min_question_overlap,
+            "auto_accept": self.auto_accept,
+            "accept_answer_overlap": self.accept_answer_overlap,
+            "accept_question_overlap": self.accept_question_overlap,
+            "accept_answer_words": list(self.accept_answer_words),
+        }
+
+    def audited(self, pair_hash: str) -> bool:
+        """Deterministic sample of ``audit_rate`` of accepted pairs that the judge rates anyway"""
+        return zlib.crc32(pair_hash.encode("utf-8")) % 10000 < self.audit_rate * 10000
+
+    def _overlap(self, texts: List[str], source_index: np.ndarray,
+                 source_tokens: List[np.ndarray]) -> np.ndarray:
+        """Fraction of each text's content words that appear in its source chunk (NaN without a source)"""
+        ids = [_token_ids(t) for t in texts]
+        lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+        flat = np.fromiter((t for x in ids for t in x), dtype=np.int64, count=int(lengths.sum()))
+        segment = np.repeat(np.arange(len(ids)), lengths)
+
+        # One membership test for every (source, token) key across all pairs
+        keys = source_index[segment] * (1 << 32) + flat
+        source_keys = np.concatenate(
+            [i * (1 << 32) + tokens for i, tokens in enumerate(source_tokens)] or [np.empty(0, dtype=np.int64)]
+        )
+        found = np.isin(keys, source_keys) & (source_index[segment] >= 0)
+
+        hits = np.bincount(segment, weights=found, minlength=len(ids))
+        overlap = np.divide(hits, lengths, out=np.zeros(len(ids)), where=lengths > 0)
+        overlap[source_index < 0] = np.nan
+        return overlap
+
+    def score(self, pairs: List[Dict[str, Any]], sources: Optional[Dict[str, str]] = None,
+              generation_type: str = "qa") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Route every pair to JUDGE, REJECT or ACCEPT
+
+        Args:
+            pairs: Generated pairs; ``chunk_id`` links a pair to its source chunk
+            sources: Chunk texts keyed by chunk id; overlap checks are skipped without one
+            generation_type: "cot" pairs must also carry a non-empty ``reasoning``
+
+        Returns:
+            (decisions, confidence) arrays aligned with ``pairs``
+        """
+        sources = sources or {}
+        n = len(pairs)
+        if n == 0:
+            return np.zeros(0, dtype=np.int8), np.zeros(0)
+
+        def text(pair, field):
+            value = pair.get(field)
+            return value.strip() if isinstance(value, str) else None
+
+        questions = [text(p, "question") for p in pairs]
+        answers = [text(p, "answer") for p in pairs]
+        schema_ok = np.array([bool(q) and bool(a) for q, a in zip(questions, answers)])
+        if generation_type == "cot":
+            schema_ok &= np.array([bool(text(p, "reasoning")) for p in pairs])
+        questions = [q or "" for q in questions]
+        answers = [a or "" for a in answers]
+
+        source_ids = {cid: i for i, cid in enumerate(sorted({p.get("chunk_id") for p in pairs} & sources.keys()))}
+        source_index = np.array([source_ids.get(p.get("chunk_id"), -1) for p in pairs], dtype=np.int64)
+        source_texts = [sources[cid] for cid in source_ids]
+        source_tokens = [np.unique(np.array(_token_ids(t), dtype=np.int64)) for t in source_texts]
+        source_words = np.array([len(t.split()) for t in source_texts] or [0], dtype=np.int64)
+
+        q_words = np.array([len(q.split()) for q in questions])
+        a_words = np.array([len(a.split()) for a in answers])
+        has_source = source_index >= 0
+        src_len = np.where(has_source, source_words[np.maximum(source_index, 0)], np.iinfo(np.int64).max)
+
+        q_overlap = self._overlap(questions, source_index, source_tokens)
+        a_overlap = self._overlap(answers, source_index, source_tokens)
+
+        reject = (
+            ~schema_ok
+            | (q_words < self.min_question_words)
+            | (a_words < self.min_answer_words)
+            | (a_words > self.max_answer_to_source * src_len)
+            | (has_source & (np.nan_to_num(q_overlap, nan=1.0) <= self.min_question_overlap))
+        )
+
+        # Confidence only exists with a source: mean of the two overlaps
+        confidence = np.where(has_source, (np.nan_to_num(q_overlap) + np.nan_to_num(a_overlap)) / 2, 0.0)
+        accept = (
+            self.auto_accept
+            & ~reject
+            & has_source
+            & (np.nan_to_num(a_overlap) >= self.accept_answer_overlap)
+            & (np.nan_to_num(q_overlap) >= self.accept_question_overlap)
+            & (a_words >= self.accept_answer_words[0])
+            & (a_words <= self.accept_answer_words[1])
+            & np.array([q.endswith("?") for q in questions])
+        )
+
+        decisions = np.full(n, JUDGE, dtype=np.int8)
+        decisions[reject] = REJECT
+        decisions[accept] = ACCEPT
+
+        self.stats["seen"] += n
+        self.stats["rejected"] += int(reject.sum())
+        self.stats["accepted"] += int(accept.sum())
+        self.stats["judged"] += int((decisions == JUDGE).sum())
+        return decisions, confidence
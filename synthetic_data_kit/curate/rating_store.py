@@ -0,0 +1,255 @@
+# synthetic_data_kit/curate/rating_store.py
+"""Persistent store of judge ratings, keyed by pair hash and prompt version.
+
+Every rating the judge returns is stored together with the rated pair, so
+curation is a local query over the store: changing the threshold, or
+re-curating an earlier run, never calls the judge again. Ratings from a
+different judge prompt or model live under a different prompt version and
+are never mixed.
+
+Besides the JSON scores, every numeric metric is kept in a real column
+(``m_<metric>``, added the first time the metric is seen) together with the
+pair's source document, so analytics read them with a single SELECT instead
+of parsing JSON per row.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from synthetic_data_kit.utils.checkpoint import content_hash
+
+# Rows per IN (...) lookup, below sqlite's bound-parameter limit
+_LOOKUP_BLOCK = 500
+
+_METRIC_PREFIX = "m_"
+
+
+def _numeric_metrics(scores: Dict[str, Any]) -> Dict[str, float]:
+    """Numeric per-metric scores, excluding combined_score, which has its own column"""
+    return {
+        name: value for name, value in scores.items()
+        if name != "combined_score" and name.isidentifier()
+        and isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def pair_hash(pair: Dict[str, Any]) -> str:
+    """Hash of a pair's content, ignoring any evaluation already attached"""
+    return content_hash("pair", {k: v for k, v in pair.items() if k != "evaluation"})
+
+
+class RatingStore:
+    """sqlite store of rated pairs, queried to curate at any threshold"""
+
+    def __init__(self, path: str = "data/ratings/ratings.sqlite"):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pairs (
+                hash TEXT PRIMARY KEY,
+                pair TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ratings (
+                pair_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                source TEXT NOT NULL,
+                generation_type TEXT NOT NULL,
+                combined_score REAL,
+                document TEXT,
+                scores TEXT NOT NULL,
+                auto_accepted INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                PRIMARY KEY (pair_hash, prompt_version)
+            );
+            CREATE INDEX IF NOT EXISTS ratings_by_run ON ratings (prompt_version, source, generation_type);
+            """
+        )
+        self._columns = {row[1] for row in self._conn.execute("PRAGMA table_info(ratings)")}
+        if "document" not in self._columns:
+            # Stores written before per-document columns: fill them from the stored pairs
+            self._conn.execute("ALTER TABLE ratings ADD COLUMN document TEXT")
+            self._conn.execute(
+                "UPDATE ratings SET document = (SELECT json_extract(pair, '$.source_pdf') FROM pairs "
+                "WHERE hash = ratings.pair_hash)"
+            )
+            self._columns.add("document")
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RatingStore":
+        """Store at ``ratings.path``; an in-memory store if ``ratings.enabled`` is false"""
+        ratings_cfg = config.get("ratings", {})
+        if not ratings_cfg.get("enabled", False):
+            return cls(":memory:")
+        return cls(ratings_cfg.get("path", "data/ratings/ratings.sqlite"))
+
+    def rated(self, hashes: Iterable[str], prompt_version: str) -> Set[str]:
+        """Which of ``hashes`` already have a rating under ``prompt_version``"""
+        return set(self.lookup(hashes, prompt_version))
+
+    def lookup(self, hashes: Iterable[str], prompt_version: str) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+        """hash -> (scores, auto_accepted) for every hash rated under ``prompt_version``"""
+        hashes = list(hashes)
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), _LOOKUP_BLOCK):
+                block = hashes[i:i + _LOOKUP_BLOCK]
+                rows = self._conn.execute(
+                    f"SELECT pair_hash, scores, auto_accepted FROM ratings "
+                    f"WHERE prompt_version = ? AND pair_hash IN ({','.join('?' * len(block))})",
+                    [prompt_version, *block],
+                )
+                for h, scores, auto in rows:
+                    found[h] = (json.loads(scores), bool(auto))
+        return found
+
+    def _ensure_metric_columns(self, names: Iterable[str]):
+        """Add a REAL column for every new metric, backfilled from the JSON scores (caller holds the lock)"""
+        for name in names:
+            column = _METRIC_PREFIX + name
+            if column in self._columns:
+                continue
+            self._conn.execute(f"ALTER TABLE ratings ADD COLUMN {column} REAL")
+            self._conn.execute(f"UPDATE ratings SET {column} = json_extract(scores, ?)", (f"$.{name}",))
+            self._columns.add(column)
+
+    def add(self, rated: List[Tuple[Dict[str, Any], Dict[str, Any]]], prompt_version: str,
+            source: str, generation_type: str, auto_accepted: bool = False):
+        """
+        Store (pair, scores) ratings; a pair already rated under this version keeps its first rating
+
+        ``source`` names the run (its curated output); the document a pair
+        came from is taken from its ``source_pdf``, falling back to ``source``.
+        """
+        now = time.time()
+        metric_names = sorted({name for _, scores in rated for name in _numeric_metrics(scores)})
+        pair_rows, rating_rows = [], []
+        for pair, scores in rated:
+            h = pair_hash(pair)
+            pair_rows.append((h, json.dumps({k: v for k, v in pair.items() if k != "evaluation"})))
+            rating_rows.append((h, prompt_version, source, pair.get("source_pdf") or source, generation_type,
+                                scores.get("combined_score"), json.dumps(scores), int(auto_accepted), now,
+                                *(scores.get(name) for name in metric_names)))
+        columns = ", ".join(_METRIC_PREFIX + name for name in metric_names)
+        with self._lock:
+            self._ensure_metric_columns(metric_names)
+            self._conn.executemany("INSERT OR IGNORE INTO pairs (hash, pair) VALUES (?, ?)", pair_rows)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO ratings (pair_hash, prompt_version, source, document, generation_type, "
+                f"combined_score, scores, auto_accepted, created{', ' + columns if columns else ''}) "
+                f"VALUES ({', '.join('?' * (9 + len(metric_names)))})",
+                rating_rows,
+            )
+            self._conn.commit()
+
+    def update(self, rated: List[Tuple[Dict[str, Any], Dict[str, Any]]], prompt_version: str):
+        """Replace the scores of pairs already rated under ``prompt_version``, keeping their place in the run"""
+        metric_names = sorted({name for _, scores in rated for name in _numeric_metrics(scores)})
+        columns = "".join(f", {_METRIC_PREFIX}{name} = ?" for name in metric_names)
+        rows = [
+            (scores.get("combined_score"), json.dumps(scores), *(scores.get(name) for name in metric_names),
+             pair_hash(pair), prompt_version)
+            for pair, scores in rated
+        ]
+        with self._lock:
+            self._ensure_metric_columns(metric_names)
+            self._conn.executemany(
+                f"UPDATE ratings SET combined_score = ?, scores = ?{columns} WHERE pair_hash = ? AND prompt_version = ?",
+                rows,
+            )
+            self._conn.commit()
+
+    def iter_ratings(self, prompt_version: str, source: Optional[str] = None,
+                     generation_type: Optional[str] = None,
+                     fallback_version: Optional[str] = None) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], bool]]:
+        """
+        (pair, scores, auto_accepted) in the order pairs were first rated
+
+        Rows under ``fallback_version`` are included for pairs with no rating
+        under ``prompt_version``.
+        """
+        query = ("SELECT p.pair, r.scores, r.auto_accepted FROM ratings r JOIN pairs p ON p.hash = r.pair_hash "
+                 "WHERE (r.prompt_version = ?")
+        params: List[Any] = [prompt_version]
+        if fallback_version is not None:
+            query += (" OR (r.prompt_version = ? AND NOT EXISTS (SELECT 1 FROM ratings j "
+                      "WHERE j.pair_hash = r.pair_hash AND j.prompt_version = ?))")
+            params.extend([fallback_version, prompt_version])
+        query += ")"
+        if source is not None:
+            query += " AND r.source = ?"
+            params.append(source)
+        if generation_type is not None:
+            query += " AND r.generation_type = ?"
+            params.append(generation_type)
+        query += " ORDER BY r.rowid"
+
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(_LOOKUP_BLOCK)
+            if not rows:
+                break
+            for pair, scores, auto in rows:
+                yield json.loads(pair), json.loads(scores), bool(auto)
+
+    def score_columns(self, prompt_version: str) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """
+        Judged (not auto-accepted) ratings under ``prompt_version`` as plain rows
+
+        Returns:
+            (metric names, rows of (document, generation_type, combined_score,
+            *metric values)); metrics another judge rates are None here
+        """
+        with self._lock:
+            names = [column[len(_METRIC_PREFIX):] for column in sorted(self._columns)
+                     if column.startswith(_METRIC_PREFIX)]
+            columns = "".join(f", {_METRIC_PREFIX}{name}" for name in names)
+            rows = self._conn.execute(
+                f"SELECT COALESCE(document, source), generation_type, combined_score{columns} FROM ratings "
+                "WHERE prompt_version = ? AND auto_accepted = 0",
+                (prompt_version,),
+            ).fetchall()
+        return names, rows
+
+    def count(self, prompt_version: str) -> int:
+        """Ratings stored under ``prompt_version``"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM ratings WHERE prompt_version = ?", (prompt_version,)
+            ).fetchone()[0]
+
+    def most_common_version(self, auto_accepted: bool = False) -> Optional[str]:
+        """Prompt version with the most judge ratings (or auto-accepts), or None if there are none"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT prompt_version FROM ratings WHERE auto_accepted = ? "
+                "GROUP BY prompt_version ORDER BY COUNT(*) DESC LIMIT 1",
+                (int(auto_accepted),),
+            ).fetchone()
+        return row[0] if row else None
+
+    def runs(self, *prompt_versions: Optional[str]) -> List[Tuple[str, str]]:
+        """Distinct (source, generation_type) combinations in the store, under any of ``prompt_versions`` if given"""
+        query = "SELECT DISTINCT source, generation_type FROM ratings"
+        params = [version for version in prompt_versions if version is not None]
+        if params:
+            query += f" WHERE prompt_version IN ({','.join('?' * len(params))})"
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute(query, params)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,64 @@
+# synthetic_data_kit/curate/tool_judge.py
+"""Batched judging of tool-use conversations.
+
+Conversations go through the same batching, concurrency, re-rating and rating
+store as QA curation; only the metrics, the prompt and the rendering differ.
+Each conversation is shown to the judge as a compact request / call / result /
+answer record with long tool results clipped, so many fit in one call.
+"""
+import json
+import os
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional
+
+from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
+from synthetic_data_kit.curate.judge import QualityCurator
+from synthetic_data_kit.utils.json_repair import JSONRepairer, TOOL_USE_RATING_SCHEMA
+
+# Characters of each tool result and final answer shown to the judge
+_RESULT_CHARS = 800
+_ANSWER_CHARS = 2000
+
+
+def _clip(text: Any, limit: int) -> str:
+    text = text if isinstance(text, str) else json.dumps(text)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class ToolUseCurator(QualityCurator):
+    """Rates tool choice, argument quality and answer grounding of tool-use conversations"""
+
+    METRICS = {"tool_choice": 3, "argument_quality": 3, "grounding": 4}
+    prompt_key = "tool_use_rating"
+    rating_schema = TOOL_USE_RATING_SCHEMA
+
+    def __init__(self, provider: BedrockProvider, config: Dict[str, Any],
+                 repairer: Optional[JSONRepairer] = None, executor: Optional[Executor] = None):
+        super().__init__(provider, config, repairer=repairer, executor=executor)
+        self.threshold = config['curate'].get('tool_use_threshold', self.threshold)
+        # The pre-filter's checks are for question/answer pairs
+        self.prefilter = None
+
+    def render_pair(self, conversation: Dict[str, Any]) -> Dict[str, Any]:
+        """User request, tool calls, clipped tool results and final answer"""
+        rendered: Dict[str, Any] = {"request": None, "calls": [], "results": [], "answer": None}
+        for message in conversation.get("messages", []):
+            role = message.get("role")
+            if role == "user" and rendered["request"] is None:
+                rendered["request"] = message.get("content")
+            elif role == "assistant" and message.get("tool_calls"):
+                for call in message["tool_calls"]:
+                    function = call.get("function", {})
+                    try:
+                        arguments = json.loads(function.get("arguments") or "{}")
+                    except (TypeError, ValueError):
+                        arguments = function.get("arguments")
+                    rendered["calls"].append({"tool": function.get("name"), "arguments": arguments})
+            elif role == "tool":
+                rendered["results"].append(_clip(message.get("content", ""), _RESULT_CHARS))
+            elif role == "assistant":
+                rendered["answer"] = _clip(message.get("content", ""), _ANSWER_CHARS)
+        return rendered
+
+    def output_path(self, pdf_name: str, generation_type: str) -> str:
+        return os.path.join(self.output_dir, "curated", f"{pdf_name}_tool_use_curated.json")
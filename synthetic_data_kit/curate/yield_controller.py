@@ -0,0 +1,148 @@
+# synthetic_data_kit/curate/yield_controller.py
+"""Closed-loop control of generation so runs hit a curated-pair target.
+
+The controller tracks the judge's keep rate per (source, generation type),
+asks the generator for just enough pairs to reach the target at that rate,
+and judges them as they arrive, stopping both generation and judging as soon
+as the target number of curated pairs is reached.
+"""
+import math
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+from synthetic_data_kit.create.allocator import allocate_uniform
+from synthetic_data_kit.create.qa_generator import Generator
+from synthetic_data_kit.curate.judge import QualityCurator
+from synthetic_data_kit.utils.checkpoint import CheckpointJournal
+
+
+class YieldController:
+    """Sizes generation rounds from the observed keep rate"""
+
+    def __init__(self, prior_keep_rate: float = 0.7, prior_weight: float = 8.0,
+                 safety_margin: float = 1.15, max_rounds: int = 5):
+        self.prior_keep_rate = prior_keep_rate
+        self.prior_weight = prior_weight
+        self.safety_margin = safety_margin
+        self.max_rounds = max_rounds
+        self.observed: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "YieldController":
+        curate_cfg = config.get("curate", {})
+        return cls(
+            prior_keep_rate=curate_cfg.get("prior_keep_rate", 0.7),
+            safety_margin=curate_cfg.get("safety_margin", 1.15),
+            max_rounds=curate_cfg.get("max_rounds", 5),
+        )
+
+    def observe(self, source: str, generation_type: str, rated: int, kept: int):
+        """Record judge outcomes for one batch"""
+        stats = self.observed.setdefault((source, generation_type), {"rated": 0, "kept": 0})
+        stats["rated"] += rated
+        stats["kept"] += kept
+
+    def keep_rate(self, source: str, generation_type: str) -> float:
+        """Keep rate smoothed towards the prior until enough pairs are rated"""
+        stats = self.observed.get((source, generation_type), {"rated": 0, "kept": 0})
+        rate = (stats["kept"] + self.prior_keep_rate * self.prior_weight) / (stats["rated"] + self.prior_weight)
+        return min(max(rate, 0.05), 1.0)
+
+    def request_size(self, source: str, generation_type: str, remaining: int) -> int:
+        """Pairs to generate so that ``remaining`` survive curation"""
+        if remaining <= 0:
+            return 0
+        return math.ceil(remaining * self.safety_margin / self.keep_rate(source, generation_type))
+
+    def generate_curated(self, generator: Generator, curator: QualityCurator, documents: Dict[str, str],
+                         target: int, generation_type: str, pdf_name: str,
+                         generation_journal: Optional[CheckpointJournal] = None,
+                         curation_journal: Optional[CheckpointJournal] = None,
+                         summaries: Optional[Dict[str, Optional[str]]] = None):
+        """
+        Generate and judge in rounds until ``target`` curated pairs are kept
+
+        ``documents`` maps source names to text. Each round splits the
+        remaining target evenly across documents and sizes each document's
+        request from its own keep rate.
+
+        Returns:
+            (generated pairs, curated pairs, metrics); metrics also report the
+            target, rounds used, pairs generated and the final keep rate
+        """
+        generated: List[Dict[str, Any]] = []
+        curated: List[Dict[str, Any]] = []
+        evals: List[Dict[str, float]] = []
+        rounds = 0
+
+        def judge(batch: List[Dict[str, Any]], source: str):
+            # Same path as curate(): pre-filter, stored ratings, token-packed batches on the executor
+            passed = 0
+            sources = {pair["chunk_id"]: generator.chunk_texts[pair["chunk_id"]]
+                       for pair in batch if pair.get("chunk_id") in generator.chunk_texts}
+            judged = curator.judge_pairs(batch, pdf_name, generation_type, curation_journal, sources=sources)
+            for pair, scores, auto_accepted in judged:
+                if not auto_accepted:
+                    evals.append(scores)
+                if scores["combined_score"] >= curator.threshold:
+                    passed += 1
+                    if len(curated) < target:
+                        curated.append({**pair, "evaluation": scores})
+            self.observe(source, generation_type, len(batch), passed)
+
+        def group_size(source: str) -> int:
+            # Enough pairs to fill the judge's concurrency, but no more than the target still needs
+            needed = self.request_size(source, generation_type, target - len(curated))
+            return max(curator.batch_size, min(needed, curator.batch_size * curator.max_workers))
+
+        summaries = summaries or {}
+        while len(curated) < target and rounds < self.max_rounds:
+            rounds += 1
+            shares = allocate_uniform(len(documents), target - len(curated))
+            print(f"🎯 Round {rounds}: {len(curated)}/{target} curated")
+
+            produced = 0
+            for (source, text), share in zip(documents.items(), shares):
+                request = self.request_size(source, generation_type, share)
+                if request == 0 or len(curated) >= target:
+                    continue
+                print(f"   {source}: keep rate {self.keep_rate(source, generation_type):.0%}, generating {request}")
+
+                doc_produced = 0
+                pending: List[Dict[str, Any]] = []
+                # Closing the generator cancels chunks it is still prefetching
+                with closing(generator.iter_document(text, request, generation_type, generation_journal,
+                                                     source, summaries.get(source))) as chunks:
+                    for pairs in chunks:
+                        pairs = pairs[:request - doc_produced]
+                        generated.extend(pairs)
+                        pending.extend(pairs)
+                        doc_produced += len(pairs)
+
+                        if len(pending) >= group_size(source) and len(curated) < target:
+                            judge(pending, source)
+                            pending = []
+
+                        if len(curated) >= target or doc_produced >= request:
+                            break
+
+                # Judge the tail only if it can still move us towards the target
+                while pending and len(curated) < target:
+                    size = group_size(source)
+                    judge(pending[:size], source)
+                    pending = pending[size:]
+                produced += doc_produced
+
+            if produced == 0:
+                print("⚠️  Generator produced no new pairs; stopping early")
+                break
+
+        metrics = curator.compute_metrics(len(evals), len(curated), evals)
+        metrics.update({
+            "target": target,
+            "rounds": rounds,
+            "generated": len(generated),
+            "keep_rate": {source: round(self.keep_rate(source, generation_type), 3) for source in documents},
+        })
+        curator.save_curated(curated, len(evals), metrics, pdf_name, generation_type)
+        return generated, curated, metrics
@@ -0,0 +1,7 @@
+# synthetic_data_kit/pipeline/__init__.py
+from .streaming import PipelineStopped, Stage, StreamingPipeline
+from .document_stream import DocumentStream
+from .build import BuildGraph, BuildStep
+from .sharding import Shard, ShardMerger
+
+__all__ = ['PipelineStopped', 'Stage', 'StreamingPipeline', 'DocumentStream', 'BuildGraph', 'BuildStep', 'Shard', 'ShardMerger']
@@ -0,0 +1,261 @@
+# synthetic_data_kit/pipeline/build.py
+"""Make-style incremental builds over a DAG of pipeline steps.
+
+Every step's artifact is stored under a key hashed from the digests of its
+inputs (the artifacts of the steps it depends on), the config values it
+reads, and a version string bumped when the step's code changes. A rerun
+reuses every artifact whose key is unchanged and rebuilds the rest. Because
+keys depend on artifact *content*, a rebuilt step whose output is identical
+to before does not invalidate anything downstream (early cutoff).
+
+Artifacts of earlier keys are kept, so reverting a config value reuses the
+artifact built with it. The last build of each step is recorded in a
+manifest, so ``explain`` can say which input or config value changed since.
+"""
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from synthetic_data_kit.utils.checkpoint import content_hash
+
+logger = logging.getLogger(__name__)
+
+def config_value(config: Dict[str, Any], path: str) -> Any:
+    """Value at a dotted config path, or None if any part is missing"""
+    value: Any = config
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+class BuildStep:
+    """One node of the build graph"""
+
+    def __init__(self, name: str, fn: Callable[..., Any], deps: Sequence[str] = (),
+                 config_keys: Sequence[str] = (), version: str = "1",
+                 verify: Optional[Callable[[Any], bool]] = None, always_run: bool = False):
+        """
+        Args:
+            name: Step name, also the artifact directory
+            fn: Called with the values of ``deps`` in order; returns a JSON-serialisable value
+            deps: Steps whose artifacts this step reads
+            config_keys: Dotted config paths the step's output depends on
+            version: Bump when the step's code changes its output
+            verify: Checks that side effects of a reused artifact still exist
+                (files, stored ratings); a failed check rebuilds the step
+            always_run: Cheap steps that observe the outside world (e.g. input
+                files) run on every build; their digest decides the rest
+        """
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.config_keys = list(config_keys)
+        self.version = version
+        self.verify = verify
+        self.always_run = always_run
+
+
+class BuildGraph:
+    """Builds steps in dependency order, reusing artifacts whose inputs are unchanged"""
+
+    def __init__(self, steps: List[BuildStep], config: Dict[str, Any], build_dir: str = "data/build"):
+        self.steps = {step.name: step for step in steps}
+        for step in steps:
+            for dep in step.deps:
+                if dep not in self.steps:
+                    raise ValueError(f"Step {step.name} depends on unknown step {dep}")
+        self.config = config
+        self.build_dir = build_dir
+        self.manifest_path = os.path.join(build_dir, "manifest.json")
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self._values: Dict[str, Any] = {}
+        self._digests: Dict[str, str] = {}
+        self._keys: Dict[str, str] = {}
+        self.decisions: List[Dict[str, Any]] = []
+
+    def _order(self, target: Optional[str]) -> List[str]:
+        """Steps needed for ``target`` (every step if None) in dependency order"""
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through step {name}")
+            visiting.add(name)
+            for dep in self.steps[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in ([target] if target else self.steps):
+            visit(name)
+        return order
+
+    def _artifact_path(self, name: str, key: str) -> str:
+        return os.path.join(self.build_dir, name, f"{key}.json")
+
+    def _config_digests(self, step: BuildStep) -> Dict[str, str]:
+        return {path: content_hash(config_value(self.config, path)) for path in step.config_keys}
+
+    def _key(self, step: BuildStep, dep_digests: Dict[str, str]) -> str:
+        return content_hash("build", step.name, step.version, dep_digests, self._config_digests(step))
+
+    def _why(self, step: BuildStep, dep_digests: Dict[str, Optional[str]]) -> str:
+        """Reason for rebuilding, from the difference to the step's last recorded build"""
+        previous = self.manifest.get(step.name)
+        if previous is None:
+            return "never built"
+        reasons = []
+        if previous.get("version") != step.version:
+            reasons.append(f"step version {previous.get('version')} → {step.version}")
+        for dep, digest in dep_digests.items():
+            if digest is None:
+                reasons.append(f"input {dep} is being rebuilt")
+            elif previous.get("deps", {}).get(dep) != digest:
+                reasons.append(f"input {dep} changed")
+        previous_config = previous.get("config", {})
+        for path, digest in self._config_digests(step).items():
+            if previous_config.get(path) != digest:
+                reasons.append(f"config {path} changed")
+        return "; ".join(reasons) or "artifact missing"
+
+    def _decide(self, step: BuildStep, status: str, reason: str, key: Optional[str] = None, log: bool = True):
+        decision = {"step": step.name, "status": status, "reason": reason, "key": key}
+        self.decisions.append(decision)
+        if log:
+            logger.info(f"{'✓' if status == 'up to date' else '↻'} {step.name}: {status} ({reason})")
+
+    def _load(self, name: str) -> Any:
+        if name not in self._values:
+            key = self._keys.get(name) or self.manifest[name]["key"]
+            with open(self._artifact_path(name, key), "r", encoding="utf-8") as f:
+                self._values[name] = json.load(f)["value"]
+        return self._values[name]
+
+    def _record(self, step: BuildStep, key: str, digest: str, dep_digests: Dict[str, str]):
+        """Make ``key`` the step's current build in the manifest"""
+        history = self.manifest.get(step.name, {}).get("history", {})
+        history[key] = digest
+        self.manifest[step.name] = {
+            "key": key,
+            "digest": digest,
+            "version": step.version,
+            "deps": dep_digests,
+            "config": self._config_digests(step),
+            "built": time.time(),
+            "history": history,
+        }
+        self._save_manifest()
+
+    def _store(self, step: BuildStep, key: str, value: Any, dep_digests: Dict[str, str]) -> str:
+        digest = content_hash(value)
+        path = self._artifact_path(step.name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"digest": digest, "value": value}, f)
+        os.replace(tmp, path)
+        self._record(step, key, digest, dep_digests)
+        return digest
+
+    def _save_manifest(self):
+        os.makedirs(self.build_dir, exist_ok=True)
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _cached_digest(self, step: BuildStep, key: str) -> Optional[str]:
+        """Digest of a stored artifact for ``key`` whose side effects check out, else None"""
+        digest = self.manifest.get(step.name, {}).get("history", {}).get(key)
+        if digest is None or not os.path.exists(self._artifact_path(step.name, key)):
+            return None
+        if step.verify is not None:
+            self._keys[step.name] = key
+            self._values.pop(step.name, None)
+            if not step.verify(self._load(step.name)):
+                return None
+        return digest
+
+    def build(self, target: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Bring ``target`` (every step if None) up to date
+
+        Returns:
+            Values of the steps that were built or loaded
+        """
+        self.decisions = []
+        for name in self._order(target):
+            step = self.steps[name]
+            dep_digests = {dep: self._digests[dep] for dep in step.deps}
+            key = self._key(step, dep_digests)
+            self._keys[name] = key
+
+            digest = None if step.always_run else self._cached_digest(step, key)
+            if digest is not None:
+                if self.manifest[name]["key"] != key:
+                    self._record(step, key, digest, dep_digests)
+                    self._decide(step, "up to date", "reused an earlier build with the same inputs", key)
+                else:
+                    self._decide(step, "up to date", "inputs and config unchanged", key)
+                self._digests[name] = digest
+                continue
+
+            if step.always_run:
+                reason = "always runs"
+            elif self.manifest.get(name, {}).get("key") == key:
+                reason = "artifact missing or incomplete"
+            elif key in self.manifest.get(name, {}).get("history", {}):
+                reason = "outputs of the earlier build with these inputs were overwritten"
+            else:
+                reason = self._why(step, dep_digests)
+            self._decide(step, "rebuilt", reason, key)
+            self._values.pop(name, None)
+            value = step.fn(*[self._load(dep) for dep in step.deps])
+            self._values[name] = value
+            self._digests[name] = self._store(step, key, value, dep_digests)
+        return dict(self._values)
+
+    def explain(self, target: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Dry run: which steps a build would rebuild and why, without running them
+
+        Only ``always_run`` steps are executed, since they observe the inputs.
+        A step downstream of a rebuild is reported as "may rebuild": if the
+        rebuilt input comes out identical, it will be reused.
+        """
+        self.decisions = []
+        for name in self._order(target):
+            step = self.steps[name]
+            if step.always_run:
+                dep_digests = {dep: self._digests[dep] for dep in step.deps}
+                key = self._key(step, dep_digests)
+                self._keys[name] = key
+                self._values[name] = step.fn(*[self._load(dep) for dep in step.deps])
+                self._digests[name] = content_hash(self._values[name])
+                changed = self.manifest.get(name, {}).get("digest") != self._digests[name]
+                self._decide(step, "always runs", "output changed" if changed else "output unchanged", key, log=False)
+                continue
+
+            pending = {dep: self._digests.get(dep) for dep in step.deps}
+            if any(digest is None for digest in pending.values()):
+                self._decide(step, "may rebuild", self._why(step, pending), log=False)
+                continue
+
+            key = self._key(step, pending)
+            digest = self._cached_digest(step, key)
+            if digest is not None:
+                self._digests[name] = digest
+                self._decide(step, "up to date", "inputs and config unchanged", key, log=False)
+            else:
+                self._decide(step, "will rebuild", self._why(step, pending), key, log=False)
+        return self.decisions
@@ -0,0 +1,179 @@
+# synthetic_data_kit/pipeline/document_stream.py
+"""Streaming ingest → generate → judge → curated output for a set of PDFs.
+
+Documents flow through five stages joined by bounded queues:
+
+    parse (process pool) → chunk → generate → judge → sink
+
+so PDFs are still being parsed while earlier chunks are generated and judged,
+and the first curated pair is written seconds after the first document is
+parsed. The pair budget is split evenly across documents and, within a
+document, allocated across chunks exactly as in the stage-by-stage pipeline.
+"""
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from synthetic_data_kit.create.allocator import allocate_uniform
+from synthetic_data_kit.create.qa_generator import Generator
+from synthetic_data_kit.create.summarizer import DocumentSummarizer
+from synthetic_data_kit.curate.judge import CuratedWriter, QualityCurator
+from synthetic_data_kit.pipeline.streaming import Stage, StreamingPipeline
+from synthetic_data_kit.utils.checkpoint import JournalSet
+from synthetic_data_kit.utils.chunker import chunk_text
+
+logger = logging.getLogger(__name__)
+
+GENERATION_TYPES = ("qa", "cot")
+
+# Pairs are generated per document (and carry it as ``source_pdf``) but curated into one output
+SOURCE = "combined"
+
+
+def parse_pdf(path: str) -> List[Tuple[str, str]]:
+    """(document name, cleaned text) for one PDF; runs in a worker process"""
+    from synthetic_data_kit.ingest.pdf_parser import PDFParser
+    return [(Path(path).stem, PDFParser().parse(path))]
+
+
+class DocumentStream:
+    """Runs the generation and curation stages for many documents concurrently"""
+
+    def __init__(self, config: Dict[str, Any], generator: Generator, curator: QualityCurator,
+                 summarizer: Optional[DocumentSummarizer] = None, journals: Optional[JournalSet] = None,
+                 parse_fn=parse_pdf, parsed_dir: str = "data/parsed"):
+        self.config = config
+        self.generator = generator
+        self.curator = curator
+        self.summarizer = summarizer
+        self.journals = journals
+        self.parse_fn = parse_fn
+        self.parsed_dir = Path(parsed_dir)
+
+        stream_cfg = config.get("pipeline", {})
+        self.workers = {"parse": 2, "chunk": 2, "generate": 8, "judge": 4, **stream_cfg.get("workers", {})}
+        # On a shared scheduler the generate workers only wait for slots, so there are enough to fill it
+        scheduler_slots = getattr(generator.executor, "max_concurrency", 0)
+        self.workers["generate"] = max(self.workers["generate"], scheduler_slots)
+        self.queue_size = stream_cfg.get("queue_size", 32)
+        self.judge_batch_chunks = stream_cfg.get("judge_batch_chunks", 4)
+        self.num_pairs = {
+            "qa": config["generation"]["num_qa_pairs"],
+            "cot": config["generation"]["num_cot_pairs"],
+        }
+
+        self.chunks: Dict[str, List[str]] = {}
+        self.summaries: Dict[str, str] = {}
+        self.generated: Dict[str, List[Dict[str, Any]]] = {gtype: [] for gtype in GENERATION_TYPES}
+        self.curated: Dict[str, List[Dict[str, Any]]] = {gtype: [] for gtype in GENERATION_TYPES}
+        self._budgets: Dict[str, Dict[str, int]] = {}
+        self._running = {gtype: curator.running_metrics() for gtype in GENERATION_TYPES}
+        self._writers: Dict[str, CuratedWriter] = {}
+        self._lock = threading.Lock()
+        self.stage_stats: Dict[str, Dict[str, Any]] = {}
+
+    def _journal(self, stage: str):
+        return self.journals[stage] if self.journals is not None else None
+
+    def chunk(self, document: Tuple[str, str]) -> List[Tuple[str, str, int, str, int, Optional[str]]]:
+        """Save the parsed text, summarize it and plan its chunks for every generation type"""
+        name, text = document
+        self.parsed_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.parsed_dir / f"{name}.txt", "w", encoding="utf-8") as f:
+            f.write(text)
+
+        summary = self.summarizer.summarize(text) if self.summarizer is not None else None
+        tasks = []
+        for gtype in GENERATION_TYPES:
+            for i, chunk, num_pairs in self.generator.plan_document(text, self._budgets[gtype][name], name):
+                tasks.append((name, gtype, i, chunk, num_pairs, summary))
+
+        chunks = chunk_text(
+            text,
+            chunk_size=self.config["generation"]["chunk_size"],
+            chunk_overlap=self.config["generation"]["chunk_overlap"],
+        )
+        with self._lock:
+            self.chunks[name] = chunks
+            self.summaries[name] = summary
+        logger.info(f"✓ {name}: {len(text)} characters, {len(tasks)} chunk tasks")
+        return tasks
+
+    def generate(self, task: Tuple[str, str, int, str, int, Optional[str]]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        name, gtype, i, chunk, num_pairs, summary = task
+        if self.generator.executor is not None:
+            # The model call waits for a slot on the shared scheduler
+            pairs = self.generator.submit_chunk_pairs(
+                i, chunk, num_pairs, gtype, self._journal(gtype), name, summary
+            ).result()
+        else:
+            pairs = self.generator.generate_chunk_pairs(i, chunk, num_pairs, gtype, self._journal(gtype), name, summary)
+        with self._lock:
+            self.generated[gtype].extend(pairs)
+        return [(gtype, pairs)] if pairs else []
+
+    def judge(self, batch: List[Tuple[str, List[Dict[str, Any]]]]) -> List[Tuple[str, Dict[str, Any], Dict[str, Any], bool]]:
+        """Rate the pairs of several chunks together, one judge pass per generation type"""
+        rows = []
+        for gtype in GENERATION_TYPES:
+            pairs = [pair for batch_gtype, chunk_pairs in batch if batch_gtype == gtype for pair in chunk_pairs]
+            if not pairs:
+                continue
+            # Generators are still adding chunks, so the pre-filter gets a snapshot of just these
+            sources = {pair["chunk_id"]: self.generator.chunk_texts[pair["chunk_id"]] for pair in pairs}
+            judged = self.curator.judge_pairs(pairs, SOURCE, gtype, self._journal(f"curate_{gtype}"), sources=sources)
+            rows.extend((gtype, *row) for row in judged)
+        return rows
+
+    def sink(self, row: Tuple[str, Dict[str, Any], Dict[str, Any], bool]) -> List[Dict[str, Any]]:
+        """Write a pair to its curated file if it passes the threshold"""
+        gtype, pair, scores, auto_accepted = row
+        if not auto_accepted:
+            self._running[gtype].add(scores)
+        if scores["combined_score"] < self.curator.threshold:
+            return []
+        pair_with_eval = {**pair, "evaluation": scores}
+        self._writers[gtype].write(pair_with_eval)
+        self.curated[gtype].append(pair_with_eval)
+        return [pair_with_eval]
+
+    def run(self, pdf_paths: List[Path]) -> Dict[str, Dict[str, Any]]:
+        """
+        Stream every PDF through the pipeline
+
+        Returns:
+            Per-stage stats from the streaming pipeline
+        """
+        names = [Path(p).stem for p in pdf_paths]
+        for gtype in GENERATION_TYPES:
+            self._budgets[gtype] = dict(zip(names, allocate_uniform(len(names), self.num_pairs[gtype])))
+
+        pipeline = StreamingPipeline([
+            Stage("parse", self.parse_fn, workers=self.workers["parse"], queue_size=self.queue_size, processes=True),
+            Stage("chunk", self.chunk, workers=self.workers["chunk"], queue_size=self.queue_size),
+            Stage("generate", self.generate, workers=self.workers["generate"], queue_size=self.queue_size),
+            Stage("judge", self.judge, workers=self.workers["judge"], queue_size=self.queue_size,
+                  batch_size=self.judge_batch_chunks),
+            Stage("sink", self.sink, workers=1, queue_size=self.queue_size),
+        ])
+
+        self._writers = {gtype: CuratedWriter(self.curator.output_path(SOURCE, gtype)) for gtype in GENERATION_TYPES}
+        try:
+            self.stage_stats = pipeline.run(str(p) for p in pdf_paths)
+        finally:
+            for writer in self._writers.values():
+                writer.close()
+
+        for gtype in GENERATION_TYPES:
+            writer = self._writers[gtype]
+            self.curator.print_summary(writer.count, len(self.generated[gtype]), self.metrics(gtype),
+                                       writer.path, gtype)
+        return self.stage_stats
+
+    def metrics(self, generation_type: str) -> Dict[str, Any]:
+        metrics = self._running[generation_type].metrics(
+            len(self.generated[generation_type]), len(self.curated[generation_type])
+        )
+        metrics["threshold"] = self.curator.threshold
+        return metrics
@@ -0,0 +1,307 @@
+# synthetic_data_kit/pipeline/incremental.py
+"""The generation pipeline as an incremental build graph.
+
+    sources → parsed → chunks → generated ──┐
+                         └──→ tool_use ─────┴→ ratings → curated → final
+
+Each step lists the config values it depends on, so changing
+``curate.threshold`` only re-runs ``curated`` and ``final`` (a query over the
+rating store), changing ``prompts.qa_rating`` re-runs ``ratings`` onward, and
+adding one PDF re-parses only that PDF. Generation here is a pure function of
+its inputs: the cross-run question index is not consulted, since it changes
+with every run.
+"""
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from synthetic_data_kit.create.allocator import allocate_uniform
+from synthetic_data_kit.create.qa_generator import Generator
+from synthetic_data_kit.create.summarizer import DocumentSummarizer
+from synthetic_data_kit.create.tool_use_generator import ToolUseGenerator
+from synthetic_data_kit.curate.analytics import RatingArrays, build_report, write_report
+from synthetic_data_kit.curate.cascade import CascadedCurator
+from synthetic_data_kit.curate.tool_judge import ToolUseCurator
+from synthetic_data_kit.pipeline.build import BuildGraph, BuildStep
+from synthetic_data_kit.pipeline.document_stream import parse_pdf
+from synthetic_data_kit.pipeline.sharding import Shard
+from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
+from synthetic_data_kit.utils.checkpoint import JournalSet
+from synthetic_data_kit.utils.chunker import chunk_text
+from synthetic_data_kit.utils.json_repair import JSONRepairer
+from synthetic_data_kit.utils.scheduler import PriorityScheduler
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "combined"
+
+GENERATION_CONFIG = [
+    "bedrock.model", "generation", "prompts.qa_generation", "prompts.cot_generation",
+    "prompts.summary", "summary", "dedup",
+]
+RATING_CONFIG = [
+    "bedrock.model", "prompts.qa_rating", "prompts.tool_use_rating", "cascade", "prefilter", "ratings",
+    "curate.batching", "curate.batch_size", "curate.max_batch_size", "curate.max_tokens", "curate.rerate_attempts",
+]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digests(paths: List[Path], cache_path: str, save: bool = True) -> Dict[str, str]:
+    """
+    sha256 of every file, keyed by file name
+
+    Hashes are cached by (size, mtime), so unchanged files are not re-read.
+    With ``save=False`` the cache is only read, as dry runs must not write.
+    """
+    cache: Dict[str, Any] = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+    digests = {}
+    for path in sorted(paths):
+        stat = os.stat(path)
+        entry = cache.get(str(path))
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(str(path))}
+            cache[str(path)] = entry
+        digests[Path(path).name] = entry["sha256"]
+
+    if not save:
+        return digests
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    return digests
+
+
+def write_final_dataset(path: Path, curated: Dict[str, List[Dict[str, Any]]], metrics: Dict[str, Any],
+                        source_pdfs: List[str], total_chunks: int, config: Dict[str, Any]):
+    """Write the compiled training dataset"""
+    final_dataset = {
+        "qa_pairs": curated["qa"],
+        "cot_pairs": curated["cot"],
+        "tool_use_conversations": curated["tool_use"],
+        "metadata": {
+            "source_pdfs": source_pdfs,
+            "total_chunks": total_chunks,
+            "generation_config": config["generation"],
+            "qa_metrics": metrics.get("qa"),
+            "cot_metrics": metrics.get("cot"),
+            "tool_use_metrics": metrics.get("tool_use"),
+        }
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(final_dataset, f, indent=2)
+
+
+def _files_match(files: Dict[str, str]) -> bool:
+    """True if every output file still has the content it was built with"""
+    return all(os.path.exists(path) and file_sha256(path) == sha for path, sha in files.items())
+
+
+class IncrementalPipeline:
+    """
+    Build steps for one input directory and config
+
+    A ``dry_run`` pipeline (no journals) only serves ``BuildGraph.explain``:
+    its ``sources`` step reads the file hash cache without updating it.
+    """
+
+    def __init__(self, config: Dict[str, Any], provider: BedrockProvider, repairer: Optional[JSONRepairer],
+                 journals: Optional[JournalSet], input_dir: Path, output_dir: Path, shard: Optional[Shard] = None,
+                 scheduler: Optional[PriorityScheduler] = None, dry_run: bool = False):
+        self.config = config
+        self.provider = provider
+        self.repairer = repairer
+        self.journals = journals
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir)
+        self.shard = shard
+        self.scheduler = scheduler
+        self.dry_run = dry_run
+        self.build_dir = str(self.output_dir / "build")
+        self._curators = None
+
+    def _lane(self, name: str):
+        return self.scheduler.lane(name) if self.scheduler is not None else None
+
+    @property
+    def curators(self):
+        """(QA/CoT curator, tool-use curator), created on first use so dry runs need neither"""
+        if self._curators is None:
+            self._curators = (
+                CascadedCurator.from_config(self.provider, self.config, repairer=self.repairer,
+                                            executor=self._lane("judge")),
+                ToolUseCurator(self.provider, self.config, repairer=self.repairer, executor=self._lane("judge")),
+            )
+        return self._curators
+
+    def sources(self) -> Dict[str, str]:
+        paths = list(self.input_dir.glob("*.pdf"))
+        if self.shard is not None:
+            paths = self.shard.select(paths)
+        return file_digests(paths, os.path.join(self.build_dir, "file_hashes.json"), save=not self.dry_run)
+
+    def parsed(self, sources: Dict[str, str]) -> Dict[str, str]:
+        """Text of every PDF; unchanged PDFs come from the per-document cache"""
+        cache_dir = Path(self.build_dir) / "documents"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        texts, missing = {}, []
+        for name, sha in sources.items():
+            cached = cache_dir / f"{sha}.txt"
+            if cached.exists():
+                texts[name] = cached.read_text(encoding="utf-8")
+            else:
+                missing.append(name)
+
+        if missing:
+            logger.info(f"Parsing {len(missing)} of {len(sources)} PDF(s)")
+            workers = self.config.get("pipeline", {}).get("workers", {}).get("parse", 2)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for [(_, text)], name in zip(pool.map(parse_pdf, [str(self.input_dir / n) for n in missing]), missing):
+                    (cache_dir / f"{sources[name]}.txt").write_text(text, encoding="utf-8")
+                    texts[name] = text
+
+        parsed_dir = Path("data/parsed")
+        parsed_dir.mkdir(parents=True, exist_ok=True)
+        for name, text in texts.items():
+            (parsed_dir / f"{Path(name).stem}.txt").write_text(text, encoding="utf-8")
+        return {name: texts[name] for name in sources}
+
+    def chunks(self, parsed: Dict[str, str]) -> Dict[str, List[str]]:
+        gen_cfg = self.config["generation"]
+        return {
+            name: chunk_text(text, chunk_size=gen_cfg["chunk_size"], chunk_overlap=gen_cfg["chunk_overlap"])
+            for name, text in parsed.items()
+        }
+
+    def _chunk_summaries(self, parsed: Dict[str, str], chunks: Dict[str, List[str]]) -> List[Optional[str]]:
+        """Each chunk's own document summary, in the order of the flattened chunks"""
+        summarizer = DocumentSummarizer.from_config(self.provider, self.config)
+        summaries = {name: summarizer.summarize(parsed[name]) if summarizer is not None else None for name in chunks}
+        return [summaries[name] for name, doc_chunks in chunks.items() for _ in doc_chunks]
+
+    def generated(self, parsed: Dict[str, str], chunks: Dict[str, List[str]]) -> Dict[str, Any]:
+        """QA and CoT pairs per document, the budget split evenly across documents"""
+        generator = Generator(self.provider, self.config, repairer=self.repairer, executor=self.scheduler)
+        summarizer = DocumentSummarizer.from_config(self.provider, self.config)
+        summaries = {name: summarizer.summarize(text) if summarizer is not None else None
+                     for name, text in parsed.items()}
+        pairs = {}
+        for gtype, budget in (("qa", "num_qa_pairs"), ("cot", "num_cot_pairs")):
+            pairs[gtype] = []
+            budgets = allocate_uniform(len(parsed), self.config["generation"][budget])
+            for (name, text), doc_budget in zip(parsed.items(), budgets):
+                if doc_budget:
+                    pairs[gtype].extend(generator.process_document(
+                        text=text,
+                        num_pairs=doc_budget,
+                        generation_type=gtype,
+                        journal=self.journals[gtype],
+                        source=Path(name).stem,
+                        summary=summaries[name],
+                    ))
+            generator.save_pairs(pairs[gtype], SOURCE, generation_type=gtype)
+        return {**pairs, "chunk_texts": generator.chunk_texts}
+
+    def tool_use(self, parsed: Dict[str, str], chunks: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        tool_cfg = self.config.get("tool_use", {})
+        if not tool_cfg.get("enabled", False):
+            return []
+        max_chunks = tool_cfg.get("max_chunks", 5)
+        all_chunks = [chunk for doc_chunks in chunks.values() for chunk in doc_chunks]
+        generator = ToolUseGenerator.from_config(self.provider, self.config, repairer=self.repairer,
+                                                 executor=self._lane("tool_use"))
+        return generator.generate_from_chunks(
+            chunks=all_chunks[:max_chunks],
+            queries_per_chunk=tool_cfg.get("queries_per_chunk", 3),
+            journal=self.journals["tool_use"],
+            summaries=self._chunk_summaries(parsed, chunks)[:max_chunks],
+        )
+
+    def ratings(self, generated: Dict[str, Any], tool_use: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Rate every pair not already in the rating store"""
+        curator, tool_curator = self.curators
+        metrics = {}
+        for gtype in ("qa", "cot"):
+            _, _, metrics[gtype] = curator.rate_all(
+                generated[gtype], SOURCE, gtype, self.journals[f"curate_{gtype}"], generated["chunk_texts"]
+            )
+        _, _, metrics["tool_use"] = tool_curator.rate_all(tool_use, SOURCE, "tool_use", self.journals["curate_tool_use"])
+        return {
+            "prompt_versions": {"qa": curator.prompt_version, "accept": curator.accept_version,
+                                "tool_use": tool_curator.prompt_version},
+            "metrics": metrics,
+        }
+
+    def ratings_stored(self, ratings: Dict[str, Any]) -> bool:
+        """The rating store still holds this build's ratings"""
+        curator, tool_curator = self.curators
+        versions = ratings["prompt_versions"]
+        return (versions["qa"] == curator.prompt_version and versions.get("accept") == curator.accept_version
+                and versions["tool_use"] == tool_curator.prompt_version
+                and bool(curator.rating_store.runs(curator.prompt_version, curator.accept_version)))
+
+    def curated(self, generated: Dict[str, Any], tool_use: List[Dict[str, Any]],
+                ratings: Dict[str, Any]) -> Dict[str, Any]:
+        """Pairs at or above the thresholds; a query over stored ratings"""
+        curator, tool_curator = self.curators
+        curated, metrics, files = {}, {}, {}
+        for gtype in ("qa", "cot"):
+            curated[gtype], metrics[gtype] = curator.curate(
+                generated[gtype], SOURCE, gtype, self.journals[f"curate_{gtype}"], sources=generated["chunk_texts"]
+            )
+            files[curator.output_path(SOURCE, gtype)] = None
+        if tool_use:
+            curated["tool_use"], metrics["tool_use"] = tool_curator.curate(
+                tool_use, SOURCE, "tool_use", self.journals["curate_tool_use"]
+            )
+            files[tool_curator.output_path(SOURCE, "tool_use")] = None
+        else:
+            curated["tool_use"], metrics["tool_use"] = [], None
+
+        report = build_report(RatingArrays.from_store(curator.rating_store, curator.prompt_version,
+                                                  curator.accept_version), curator.threshold)
+        write_report(report, str(self.output_dir / "reports" / "curation"))
+        return {**curated, "metrics": metrics, "files": {path: file_sha256(path) for path in files}}
+
+    def final(self, sources: Dict[str, str], chunks: Dict[str, List[str]], curated: Dict[str, Any]) -> Dict[str, Any]:
+        path = self.output_dir / "final_training_dataset.json"
+        write_final_dataset(path, curated, curated["metrics"], sorted(sources),
+                            sum(len(c) for c in chunks.values()), self.config)
+        logger.info(f"✓ Final training dataset saved to {path}")
+        return {"files": {str(path): file_sha256(str(path))},
+                "counts": {gtype: len(curated[gtype]) for gtype in ("qa", "cot", "tool_use")}}
+
+    def graph(self) -> BuildGraph:
+        steps = [
+            BuildStep("sources", self.sources, always_run=True),
+            BuildStep("parsed", self.parsed, deps=["sources"]),
+            BuildStep("chunks", self.chunks, deps=["parsed"],
+                      config_keys=["generation.chunk_size", "generation.chunk_overlap"]),
+            BuildStep("generated", self.generated, deps=["parsed", "chunks"], config_keys=GENERATION_CONFIG,
+                      version="2"),
+            BuildStep("tool_use", self.tool_use, deps=["parsed", "chunks"],
+                      config_keys=["bedrock.model", "tool_use", "summary", "prompts.summary"], version="2"),
+            BuildStep("ratings", self.ratings, deps=["generated", "tool_use"], config_keys=RATING_CONFIG,
+                      verify=self.ratings_stored),
+            BuildStep("curated", self.curated, deps=["generated", "tool_use", "ratings"],
+                      config_keys=["curate.threshold", "curate.tool_use_threshold"],
+                      verify=lambda value: _files_match(value["files"])),
+            BuildStep("final", self.final, deps=["sources", "chunks", "curated"], config_keys=["generation"],
+                      verify=lambda value: _files_match(value["files"])),
+        ]
+        return BuildGraph(steps, self.config, self.build_dir)
@@ -0,0 +1,253 @@
+# synthetic_data_kit/pipeline/sharding.py
+"""Deterministic corpus sharding and the merge of shard outputs.
+
+A document belongs to shard ``hash(file name) mod N``, so every process or
+machine computes the same partition from the same file list with no
+coordination. Each shard runs the full pipeline with its outputs, rating
+store, question index and tool cache under ``<output_dir>/shards/<shard>/``,
+so shards sharing a filesystem never write the same file (SQLite databases
+in particular must not be shared between nodes). Pair budgets and curated
+targets are corpus totals, split across shards by their share of documents.
+
+The merge reads every shard's final dataset in shard order, removes
+duplicates across shards with the same MinHash filter generation uses, and
+combines the metrics, so its output does not depend on which shard finished
+first.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from synthetic_data_kit.curate.analytics import RatingArrays, build_report, write_report
+from synthetic_data_kit.curate.rating_store import RatingStore
+from synthetic_data_kit.utils.dedup import PairDeduplicator
+
+logger = logging.getLogger(__name__)
+
+# Per-shard metrics that are counts, summed when merging
+_COUNT_FIELDS = ("total", "kept", "rated", "prefilter_rejected", "prefilter_accepted",
+                 "judge_calls_avoided", "ratings_reused")
+
+# Corpus-wide totals (section, key) that each shard gets its share of
+_BUDGET_FIELDS = (("generation", "num_qa_pairs"), ("generation", "num_cot_pairs"),
+                  ("curate", "target_qa_pairs"), ("curate", "target_cot_pairs"))
+
+
+def shard_of(name: str, count: int) -> int:
+    """Shard of a document, from its file name so every node agrees"""
+    digest = hashlib.sha1(Path(name).name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+class Shard:
+    """Shard ``index`` of ``count``"""
+
+    def __init__(self, index: int, count: int):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index}/{count}: need 0 <= index < count")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """Shard from an ``i/N`` spec, e.g. ``3/16``"""
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"Shard spec must look like i/N, got {spec!r}") from None
+        return cls(index, count)
+
+    @property
+    def name(self) -> str:
+        return f"shard-{self.index:04d}-of-{self.count:04d}"
+
+    def owns(self, path: Any) -> bool:
+        return shard_of(str(path), self.count) == self.index
+
+    def select(self, paths: Sequence[Any]) -> List[Any]:
+        return [path for path in paths if self.owns(path)]
+
+
+def shard_dir(output_dir: Path, shard: Shard) -> Path:
+    return Path(output_dir) / "shards" / shard.name
+
+
+def split_budget(total: int, shard: Shard, documents: Sequence[Any]) -> int:
+    """
+    The shard's share of a corpus-wide budget, by its share of ``documents``
+
+    Largest-remainder rounding (ties to the lower shard index) makes the
+    shares of all shards sum to ``total``, and every node computes the same
+    split from the same file list.
+    """
+    counts = [0] * shard.count
+    for document in documents:
+        counts[shard_of(str(document), shard.count)] += 1
+    if not documents:
+        return 0
+    shares = [total * c / len(documents) for c in counts]
+    allocation = [int(share) for share in shares]
+    leftover = total - sum(allocation)
+    by_remainder = sorted(range(shard.count), key=lambda i: (allocation[i] - shares[i], i))
+    return allocation[shard.index] + (1 if shard.index in by_remainder[:leftover] else 0)
+
+
+def shard_config(config: Dict[str, Any], shard: Shard) -> Dict[str, Any]:
+    """
+    Copy of ``config`` for one shard
+
+    Every per-run output path moves under the shard's directory, and the
+    pair budgets and curated targets become the shard's share of the totals.
+    """
+    config = copy.deepcopy(config)
+    documents = list(Path(config.get("data", {}).get("input_dir", "data/input")).glob("*.pdf"))
+    for section, key in _BUDGET_FIELDS:
+        total = config.get(section, {}).get(key)
+        if total is not None:
+            config[section][key] = split_budget(total, shard, documents)
+    root = shard_dir(config.get("data", {}).get("output_dir", "data"), shard)
+    config.setdefault("data", {})["output_dir"] = str(root)
+    config.setdefault("ratings", {})["path"] = str(root / "ratings" / "ratings.sqlite")
+    config.setdefault("index", {})["dir"] = str(root / "index")
+    config.setdefault("tool_use", {}).setdefault("cache", {})["path"] = str(root / "cache" / "tool_results.sqlite")
+    return config
+
+
+def _request_text(conversation: Dict[str, Any]) -> str:
+    for message in conversation.get("messages", []):
+        if message.get("role") == "user":
+            return str(message.get("content", ""))
+    return ""
+
+
+def merge_metrics(shard_metrics: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Combine per-shard curation metrics
+
+    Counts are summed and averages are weighted by the number of pairs each
+    shard rated.
+    """
+    shard_metrics = [m for m in shard_metrics if m]
+    if not shard_metrics:
+        return None
+    merged: Dict[str, Any] = {}
+    for field in _COUNT_FIELDS:
+        if any(field in m for m in shard_metrics):
+            merged[field] = sum(m.get(field, 0) for m in shard_metrics)
+    rated = [m.get("rated", m.get("total", 0)) for m in shard_metrics]
+    for field in sorted({k for m in shard_metrics for k in m if k.startswith("avg_")}):
+        weight = sum(r for r, m in zip(rated, shard_metrics) if field in m)
+        total = sum(m[field] * r for r, m in zip(rated, shard_metrics) if field in m)
+        merged[field] = round(total / weight, 2) if weight else 0
+    thresholds = {m["threshold"] for m in shard_metrics if "threshold" in m}
+    if len(thresholds) == 1:
+        merged["threshold"] = thresholds.pop()
+    elif thresholds:
+        logger.warning(f"Shards were curated at different thresholds: {sorted(thresholds)}")
+        merged["threshold"] = sorted(thresholds)
+    return merged
+
+
+class ShardMerger:
+    """Merges the final datasets of every shard into one"""
+
+    def __init__(self, config: Dict[str, Any], count: int):
+        self.config = config
+        self.count = count
+        self.output_dir = Path(config.get("data", {}).get("output_dir", "data"))
+        self.shards = [Shard(i, count) for i in range(count)]
+
+    def _load(self) -> List[Tuple[Shard, Dict[str, Any]]]:
+        datasets, missing = [], []
+        for shard in self.shards:
+            path = shard_dir(self.output_dir, shard) / "final_training_dataset.json"
+            if not path.exists():
+                missing.append(shard.name)
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                datasets.append((shard, json.load(f)))
+        if missing:
+            raise FileNotFoundError(f"{len(missing)} shard(s) have no final dataset yet: {', '.join(missing)}")
+        return datasets
+
+    def _dedup(self, items: List[Dict[str, Any]], text_of=None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Drop items duplicating an earlier one, globally across shards"""
+        deduplicator = PairDeduplicator.from_config(self.config)
+        if deduplicator is None:
+            return items, {"total": len(items), "exact": 0, "near": 0}
+        if text_of is None:
+            return deduplicator.filter(items)
+        kept, counts = deduplicator.filter([{"question": text_of(item), "item": item} for item in items])
+        return [wrapped["item"] for wrapped in kept], counts
+
+    def _report(self):
+        """Curation report over the ratings of every shard, broken down by shard"""
+        parts, names = [], []
+        for shard in self.shards:
+            store_path = shard_dir(self.output_dir, shard) / "ratings" / "ratings.sqlite"
+            if not store_path.exists():
+                continue
+            store = RatingStore(str(store_path))
+            parts.append(RatingArrays.from_store(store, accept_version=store.most_common_version(auto_accepted=True)))
+            names.append(shard.name)
+            store.close()
+        arrays = RatingArrays.concat(parts, names)
+        report = build_report(arrays, self.config["curate"]["threshold"])
+        write_report(report, str(self.output_dir / "reports" / "curation"))
+
+    def _generation_config(self, datasets: List[Tuple[Shard, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Generation config with the pair budgets the shards actually ran with, summed"""
+        generation = dict(self.config["generation"])
+        for key in ("num_qa_pairs", "num_cot_pairs"):
+            budgets = [dataset["metadata"].get("generation_config", {}).get(key) for _, dataset in datasets]
+            if budgets and all(budget is not None for budget in budgets):
+                generation[key] = sum(budgets)
+        return generation
+
+    def merge(self) -> Dict[str, Any]:
+        """
+        Write ``<output_dir>/final_training_dataset.json`` from every shard
+
+        Raises:
+            FileNotFoundError: if any shard has not finished
+        """
+        datasets = self._load()
+        fields = {"qa": "qa_pairs", "cot": "cot_pairs", "tool_use": "tool_use_conversations"}
+        merged, metrics, duplicates = {}, {}, {}
+        for gtype, field in fields.items():
+            items = [item for _, dataset in datasets for item in dataset.get(field, [])]
+            merged[field], counts = self._dedup(items, _request_text if gtype == "tool_use" else None)
+            duplicates[gtype] = counts["exact"] + counts["near"]
+            metrics[gtype] = merge_metrics([dataset["metadata"].get(f"{gtype}_metrics") for _, dataset in datasets])
+            if metrics[gtype] is not None:
+                metrics[gtype]["kept_before_merge"] = len(items)
+                metrics[gtype]["kept"] = len(merged[field])
+                metrics[gtype]["cross_shard_duplicates"] = duplicates[gtype]
+
+        final_dataset = {
+            **merged,
+            "metadata": {
+                "source_pdfs": sorted(pdf for _, dataset in datasets for pdf in dataset["metadata"]["source_pdfs"]),
+                "total_chunks": sum(dataset["metadata"]["total_chunks"] for _, dataset in datasets),
+                "generation_config": self._generation_config(datasets),
+                "shards": [shard.name for shard, _ in datasets],
+                "qa_metrics": metrics["qa"],
+                "cot_metrics": metrics["cot"],
+                "tool_use_metrics": metrics["tool_use"],
+            }
+        }
+        path = self.output_dir / "final_training_dataset.json"
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(final_dataset, f, indent=2)
+        os.replace(tmp, path)
+        self._report()
+
+        logger.info(f"✓ Merged {len(datasets)} shard(s) into {path}")
+        logger.info(f"✓ Cross-shard duplicates removed: {duplicates}")
+        return final_dataset
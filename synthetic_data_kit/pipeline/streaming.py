@@ -0,0 +1,211 @@
+# synthetic_data_kit/pipeline/streaming.py
+"""Producer/consumer pipeline of stages joined by bounded queues.
+
+Each stage has its own workers and an input queue of fixed size. A worker
+takes an item (or a small batch of items), runs the stage function and puts
+every output on the next stage's queue. When a downstream queue is full the
+put blocks, so a fast stage can never run ahead of a slow one by more than a
+queue's worth of items (backpressure). Process stages send each item to a
+shared process pool, for CPU-bound work such as PDF parsing; their function
+must be picklable and return a list.
+
+A failing item is logged and counted; it does not stop the pipeline.
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker passed from stage to stage
+_DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised inside workers when the pipeline is shut down early"""
+
+
+class Stage:
+    """One pipeline stage: a function applied to items by a fixed number of workers"""
+
+    def __init__(self, name: str, fn: Callable[[Any], Optional[Iterable[Any]]], workers: int = 1,
+                 queue_size: int = 64, processes: bool = False, batch_size: int = 1, batch_wait: float = 0.5):
+        """
+        Args:
+            name: Stage name used in logs and stats
+            fn: Called with one item (or a list of up to ``batch_size`` items);
+                returns the items to pass downstream, or None
+            workers: Concurrent workers (processes for a process stage)
+            queue_size: Capacity of the stage's input queue
+            processes: Run ``fn`` in a process pool instead of on the worker thread
+            batch_size: Items handed to ``fn`` at once; above 1 ``fn`` gets a list
+            batch_wait: Seconds to wait for a batch to fill before running it short
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.processes = processes
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.stats = {"in": 0, "out": 0, "errors": 0, "busy_seconds": 0.0, "first_output_seconds": None}
+
+
+class StreamingPipeline:
+    """Runs items through a chain of stages concurrently, with bounded queues between them"""
+
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._started = 0.0
+
+    def _put(self, q: queue.Queue, item: Any):
+        """Blocking put that gives up once the pipeline is stopped"""
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue, timeout: Optional[float] = None) -> Any:
+        """Blocking get that gives up once the pipeline is stopped; None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            try:
+                return q.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _next_batch(self, stage: Stage, q: queue.Queue):
+        """(items, done): up to ``batch_size`` items, and whether the end of the stream was reached"""
+        first = self._get(q)
+        if first is _DONE:
+            return [], True
+        items = [first]
+        deadline = time.monotonic() + stage.batch_wait
+        while len(items) < stage.batch_size:
+            item = self._get(q, max(0.0, deadline - time.monotonic()))
+            if item is None:
+                break
+            if item is _DONE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _apply(self, stage: Stage, items: List[Any]) -> List[Any]:
+        arg = items if stage.batch_size > 1 else items[0]
+        if stage.processes:
+            return list(self._pool.submit(stage.fn, arg).result())
+        return list(stage.fn(arg) or [])
+
+    def _worker(self, index: int, finished: List[int]):
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+        try:
+            while True:
+                items, done = self._next_batch(stage, inbox)
+                if items:
+                    start = time.perf_counter()
+                    try:
+                        outputs = self._apply(stage, items)
+                    except PipelineStopped:
+                        raise
+                    except Exception as e:
+                        outputs = []
+                        logger.warning(f"Stage {stage.name} failed on {len(items)} item(s): {e}")
+                        with self._lock:
+                            stage.stats["errors"] += len(items)
+                    with self._lock:
+                        stage.stats["in"] += len(items)
+                        stage.stats["out"] += len(outputs)
+                        stage.stats["busy_seconds"] += time.perf_counter() - start
+                        if outputs and stage.stats["first_output_seconds"] is None:
+                            stage.stats["first_output_seconds"] = round(time.monotonic() - self._started, 3)
+                    if outbox is not None:
+                        for output in outputs:
+                            self._put(outbox, output)
+                if done:
+                    # Let sibling workers see the end of the stream too
+                    self._put(inbox, _DONE)
+                    break
+        except PipelineStopped:
+            return
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            with self._lock:
+                finished[index] += 1
+                last = finished[index] == stage.workers
+            if last and outbox is not None and not self._stop.is_set():
+                try:
+                    self._put(outbox, _DONE)
+                except PipelineStopped:
+                    pass
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Feed ``items`` through every stage and wait for the stream to drain
+
+        Returns:
+            Per-stage stats: items in and out, errors, busy seconds, and
+            seconds from start to the stage's first output
+        """
+        self._started = time.monotonic()
+        process_workers = sum(stage.workers for stage in self.stages if stage.processes)
+        if process_workers:
+            # Worker processes start while stage threads are running, so they are spawned rather than forked
+            self._pool = ProcessPoolExecutor(max_workers=process_workers, mp_context=multiprocessing.get_context("spawn"))
+
+        finished = [0] * len(self.stages)
+        threads = [
+            threading.Thread(target=self._worker, args=(index, finished), name=f"{stage.name}-{n}", daemon=True)
+            for index, stage in enumerate(self.stages)
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in items:
+                self._put(self._queues[0], item)
+            self._put(self._queues[0], _DONE)
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=not self._stop.is_set(), cancel_futures=True)
+                self._pool = None
+
+        if self._stop.is_set():
+            raise PipelineStopped("A stage worker crashed; see the log for the cause")
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                stage.name: {**stage.stats, "busy_seconds": round(stage.stats["busy_seconds"], 3)}
+                for stage in self.stages
+            }
@@ -1,4 +1,8 @@
-from .tool_definitions import get_tool_definitions, TOOLS
-from .tool_executor import ToolExecutor
+from .tool_definitions import get_tool_definitions, TOOLS, TOOL_KEYWORDS
+from .tool_executor import ToolExecutor, is_error_result
+from .fixtures import FixtureStore, FixtureMissing
+from .cache import ToolResultCache
+from .registry import ToolRegistry
 
-__all__ = ['get_tool_definitions', 'TOOLS', 'ToolExecutor']
\ No newline at end of file
+__all__ = ['get_tool_definitions', 'TOOLS', 'TOOL_KEYWORDS', 'ToolExecutor', 'is_error_result', 'FixtureStore',
+           'FixtureMissing', 'ToolResultCache', 'ToolRegistry']
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Persistent TTL cache for tool results.
+
+Results are stored in a small sqlite database keyed by tool name and
+normalized arguments, so repeated search terms across chunks and runs are
+answered locally instead of hitting (and getting rate-limited by) upstream.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .fixtures import tool_call_key
+
+_MISS = object()
+
+
+class ToolResultCache:
+    """sqlite-backed tool result cache with a time-to-live"""
+
+    def __init__(self, path: str = "data/cache/tool_results.sqlite", ttl_seconds: float = 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stored": 0}
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_results ("
+            "key TEXT PRIMARY KEY, tool TEXT NOT NULL, arguments TEXT NOT NULL, "
+            "result TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, tool_name: str, arguments: Dict[str, Any], default: Any = _MISS) -> Any:
+        """Return a fresh cached result, or ``default`` on a miss or expired entry"""
+        key = tool_call_key(tool_name, arguments)
+        with self._lock:
+            row = self._conn.execute("SELECT result, created FROM tool_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return default
+            if time.time() - row[1] > self.ttl_seconds:
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return default
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, tool_name: str, arguments: Dict[str, Any], result: Any):
+        key = tool_call_key(tool_name, arguments)
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_results (key, tool, arguments, result, created) VALUES (?, ?, ?, ?, ?)",
+                (key, tool_name, json.dumps(arguments, sort_keys=True), payload, time.time()),
+            )
+            self._conn.commit()
+            self.stats["stored"] += 1
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, returning how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM tool_results WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def hit_rate(self) -> float:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return self.stats["hits"] / lookups if lookups else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["hit_rate"] = round(self.hit_rate(), 3)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ToolResultCache"]:
+        """Build a cache from ``tool_use.cache``, or None if disabled"""
+        cache_cfg = config.get("tool_use", {}).get("cache", {})
+        if not cache_cfg.get("enabled", False):
+            return None
+        return cls(
+            cache_cfg.get("path", "data/cache/tool_results.sqlite"),
+            ttl_seconds=cache_cfg.get("ttl_hours", 24) * 3600,
+        )
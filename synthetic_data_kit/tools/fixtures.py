@@ -0,0 +1,85 @@
+"""Record/replay store for real tool results.
+
+In ``record`` mode every live tool call is saved under ``fixture_dir`` as one
+JSON file keyed by tool name and normalized arguments; in ``replay`` mode
+results are served from those files only, so tool-use generation runs fully
+offline (tests, CI, reproducing a dataset) without the search backends.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from synthetic_data_kit.utils.checkpoint import content_hash
+
+FIXTURE_MODES = ("off", "record", "replay")
+
+
+def normalize_arguments(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Arguments with string values case- and whitespace-normalized"""
+    return {
+        name: " ".join(value.lower().split()) if isinstance(value, str) else value
+        for name, value in sorted(arguments.items())
+    }
+
+
+def tool_call_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+    """Stable key for a tool call, shared by equivalent argument spellings"""
+    return content_hash(tool_name, normalize_arguments(arguments))
+
+
+class FixtureMissing(KeyError):
+    """Raised in replay mode when no recording exists for a tool call"""
+
+
+class FixtureStore:
+    """Saves and serves tool results as per-call JSON fixtures"""
+
+    def __init__(self, fixture_dir: str = "data/tool_fixtures", mode: str = "record"):
+        if mode not in FIXTURE_MODES:
+            raise ValueError(f"fixture mode must be one of {FIXTURE_MODES}")
+        self.fixture_dir = fixture_dir
+        self.mode = mode
+        self.stats = {"replayed": 0, "recorded": 0, "missing": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["FixtureStore"]:
+        """Build a store from ``tool_use.fixtures``, or None when mode is off"""
+        fixture_cfg = config.get("tool_use", {}).get("fixtures", {})
+        mode = fixture_cfg.get("mode", "off")
+        if mode == "off":
+            return None
+        return cls(fixture_cfg.get("dir", "data/tool_fixtures"), mode)
+
+    def _path(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        return os.path.join(self.fixture_dir, tool_name, f"{tool_call_key(tool_name, arguments)}.json")
+
+    def load(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Return the recorded result for a call
+
+        Raises:
+            FixtureMissing: if nothing was recorded for this call
+        """
+        path = self._path(tool_name, arguments)
+        if not os.path.exists(path):
+            with self._lock:
+                self.stats["missing"] += 1
+            raise FixtureMissing(f"No recorded {tool_name} result for {normalize_arguments(arguments)}")
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)["result"]
+        with self._lock:
+            self.stats["replayed"] += 1
+        return result
+
+    def save(self, tool_name: str, arguments: Dict[str, Any], result: Any):
+        """Record a live result, written atomically so concurrent calls never tear a file"""
+        path = self._path(tool_name, arguments)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"tool": tool_name, "arguments": arguments, "result": result}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stats["recorded"] += 1
@@ -0,0 +1,146 @@
+"""Single registry of tool schemas with argument validation and query routing.
+
+Schemas come from ``tool_definitions.TOOLS`` and routing keywords from
+``tool_definitions.TOOL_KEYWORDS``. All keywords of all tools are compiled
+into one Aho-Corasick automaton, so routing a query is a single pass over its
+characters however many tools are registered.
+"""
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .tool_definitions import TOOLS, TOOL_KEYWORDS
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over lowercase keywords"""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]]):
+        # Node 0 is the root; each node has transitions, a failure link and outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+
+        for keyword, label in keywords:
+            keyword = keyword.lower()
+            node = 0
+            for ch in keyword:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(keyword), label))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[int, Any]]:
+        """(start offset, label) for every keyword occurrence in ``text``"""
+        matches = []
+        node = 0
+        for i, ch in enumerate(text.lower()):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, label in self._out[node]:
+                matches.append((i - length + 1, label))
+        return matches
+
+
+class ToolRegistry:
+    """Tool schemas, argument validation and keyword routing in one place"""
+
+    def __init__(self, tools: Optional[List[Dict[str, Any]]] = None,
+                 keywords: Optional[Dict[str, List[str]]] = None,
+                 default_tool: str = "duckduckgo_search"):
+        tools = TOOLS if tools is None else tools
+        keywords = TOOL_KEYWORDS if keywords is None else keywords
+        self.tools: Dict[str, Dict[str, Any]] = {tool["name"]: tool for tool in tools}
+        if default_tool not in self.tools:
+            raise ValueError(f"Default tool '{default_tool}' is not registered")
+        self.default_tool = default_tool
+        self._order = {name: i for i, name in enumerate(self.tools)}
+        self._matcher = KeywordMatcher(
+            (keyword, (name, keyword.lower()))
+            for name, words in keywords.items() if name in self.tools for keyword in words
+        )
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def schema(self, name: str) -> Dict[str, Any]:
+        """Tool definition in the function-calling format used in training conversations"""
+        tool = self.tools[name]
+        return {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": tool["description"],
+                "parameters": tool["input_schema"],
+            },
+        }
+
+    def validate(self, name: str, arguments: Any) -> bool:
+        """Check arguments against the tool's ``input_schema``"""
+        if name not in self.tools or not isinstance(arguments, dict):
+            return False
+        params = self.tools[name]["input_schema"]
+        for required in params.get("required", []):
+            if required not in arguments:
+                return False
+        for arg, value in arguments.items():
+            spec = params.get("properties", {}).get(arg)
+            if spec is None:
+                return False
+            expected = _JSON_TYPES.get(spec.get("type"))
+            if expected is None:
+                continue
+            if isinstance(value, bool) and spec.get("type") != "boolean":
+                return False
+            if not isinstance(value, expected):
+                return False
+            if "enum" in spec and value not in spec["enum"]:
+                return False
+        return True
+
+    def route(self, query: str) -> str:
+        """
+        Pick the tool whose keywords best match the query
+
+        Keywords match at the start of a word, so "study" also matches
+        "studying". The tool with the most distinct keyword hits wins, ties go
+        to the earlier registered tool, and queries matching nothing go to the
+        default tool.
+        """
+        text = query.lower()
+        hits: Dict[str, set] = {}
+        for start, (name, keyword) in self._matcher.find(text):
+            if start == 0 or not text[start - 1].isalnum():
+                hits.setdefault(name, set()).add(keyword)
+        if not hits:
+            return self.default_tool
+        return max(hits, key=lambda name: (len(hits[name]), -self._order[name]))
@@ -42,6 +42,12 @@ DUCKDUCKGO_TOOL = {
 
 TOOLS = [ARXIV_TOOL, DUCKDUCKGO_TOOL]
 
+# Routing keywords per tool, kept apart from the schemas shown to the model
+TOOL_KEYWORDS = {
+    "arxiv_search": ["research", "papers", "academic", "study", "studies", "journal", "publication", "scholar"],
+    "duckduckgo_search": [],
+}
+
 def get_tool_definitions():
     """Return all tool definitions"""
     return TOOLS
\ No newline at end of file
@@ -1,58 +1,198 @@
 """Tool execution implementations"""
-import arxiv
-from ddgs import DDGS
-from typing import Dict, Any, List
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cache import ToolResultCache
+from .fixtures import FixtureStore, tool_call_key
+
+logger = logging.getLogger(__name__)
+
+# A backend takes the tool arguments and returns result dicts, raising on failure
+Backend = Callable[..., List[Dict[str, Any]]]
+
+# Upstream rate limits are per service, so concurrency is capped per tool
+DEFAULT_CONCURRENCY = {"arxiv_search": 1, "duckduckgo_search": 2}
+
 
 class ToolExecutor:
     """Executes tool calls and returns results"""
-    
-    def __init__(self):
-        self.ddgs = DDGS()
-    
+
+    def __init__(self, fixtures: Optional[FixtureStore] = None, cache: Optional[ToolResultCache] = None,
+                 backends: Optional[Dict[str, Backend]] = None,
+                 max_concurrency: Optional[Dict[str, int]] = None,
+                 max_retries: int = 3, backoff_base: float = 1.0, max_workers: int = 4):
+        # Search backends are imported on first live call so replay runs need neither package
+        self._ddgs = None
+        self.fixtures = fixtures
+        self.cache = cache
+        # Any backend can be swapped for a local stand-in, e.g. in offline tests
+        self.backends: Dict[str, Backend] = {
+            "arxiv_search": self._arxiv_backend,
+            "duckduckgo_search": self._duckduckgo_backend,
+        }
+        self.backends.update(backends or {})
+        concurrency = {**DEFAULT_CONCURRENCY, **(max_concurrency or {})}
+        self._semaphores = {name: threading.BoundedSemaphore(concurrency.get(name, 1)) for name in self.backends}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_workers = max_workers
+        self.stats = {"calls": 0, "retries": 0, "failures": 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], backends: Optional[Dict[str, Backend]] = None) -> "ToolExecutor":
+        executor_cfg = config.get("tool_use", {}).get("executor", {})
+        return cls(
+            fixtures=FixtureStore.from_config(config),
+            cache=ToolResultCache.from_config(config),
+            backends=backends,
+            max_concurrency=executor_cfg.get("max_concurrency"),
+            max_retries=executor_cfg.get("max_retries", 3),
+            backoff_base=executor_cfg.get("backoff_base", 1.0),
+            max_workers=executor_cfg.get("max_workers", 4),
+        )
+
+    @property
+    def ddgs(self):
+        if self._ddgs is None:
+            from ddgs import DDGS
+            self._ddgs = DDGS()
+        return self._ddgs
+
+    def _arxiv_backend(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        import arxiv
+        search = arxiv.Search(
+            query=query,
+            max_results=min(max_results, 10),
+            sort_by=arxiv.SortCriterion.Relevance
+        )
+
+        results = []
+        for paper in search.results():
+            results.append({
+                "title": paper.title,
+                "authors": [author.name for author in paper.authors],
+                "summary": paper.summary[:500],  # Truncate for brevity
+                "published": paper.published.strftime("%Y-%m-%d"),
+                "pdf_url": paper.pdf_url,
+                "entry_id": paper.entry_id
+            })
+
+        return results
+
+    def _duckduckgo_backend(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        results = list(self.ddgs.text(query, max_results=min(max_results, 10)))
+        return [
+            {
+                "title": r.get("title", ""),
+                "body": r.get("body", ""),
+                "url": r.get("href", "")
+            }
+            for r in results
+        ]
+
     def execute_arxiv_search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """Execute ArXiv search"""
-        try:
-            search = arxiv.Search(
-                query=query,
-                max_results=min(max_results, 10),
-                sort_by=arxiv.SortCriterion.Relevance
-            )
-            
-            results = []
-            for paper in search.results():
-                results.append({
-                    "title": paper.title,
-                    "authors": [author.name for author in paper.authors],
-                    "summary": paper.summary[:500],  # Truncate for brevity
-                    "published": paper.published.strftime("%Y-%m-%d"),
-                    "pdf_url": paper.pdf_url,
-                    "entry_id": paper.entry_id
-                })
-            
-            return results
-        except Exception as e:
-            return [{"error": f"ArXiv search failed: {str(e)}"}]
-    
+        return self.execute_tool("arxiv_search", {"query": query, "max_results": max_results})
+
     def execute_duckduckgo_search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """Execute DuckDuckGo search"""
-        try:
-            results = list(self.ddgs.text(query, max_results=min(max_results, 10)))
-            return [
-                {
-                    "title": r.get("title", ""),
-                    "body": r.get("body", ""),
-                    "url": r.get("href", "")
-                }
-                for r in results
-            ]
-        except Exception as e:
-            return [{"error": f"DuckDuckGo search failed: {str(e)}"}]
-    
+        return self.execute_tool("duckduckgo_search", {"query": query, "max_results": max_results})
+
+    def _execute_live(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
+        """Call the backend under its concurrency limit, retrying with exponential backoff"""
+        backend = self.backends[tool_name]
+        label = "ArXiv" if tool_name == "arxiv_search" else "DuckDuckGo" if tool_name == "duckduckgo_search" else tool_name
+
+        with self._semaphores[tool_name]:
+            for attempt in range(self.max_retries + 1):
+                with self._stats_lock:
+                    self.stats["calls"] += 1
+                try:
+                    return backend(**tool_input)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        with self._stats_lock:
+                            self.stats["failures"] += 1
+                        return [{"error": f"{label} search failed: {str(e)}"}]
+                    delay = self.backoff_base * (2 ** attempt) * (1 + random.random())
+                    logger.warning(f"{tool_name} failed ({e}); retrying in {delay:.1f}s")
+                    with self._stats_lock:
+                        self.stats["retries"] += 1
+                    time.sleep(delay)
+
     def execute_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
-        """Execute a tool by name"""
-        if tool_name == "arxiv_search":
-            return self.execute_arxiv_search(**tool_input)
-        elif tool_name == "duckduckgo_search":
-            return self.execute_duckduckgo_search(**tool_input)
-        else:
-            return {"error": f"Unknown tool: {tool_name}"}
\ No newline at end of file
+        """
+        Execute a tool by name, consulting fixtures and the result cache when configured
+
+        Raises:
+            FixtureMissing: in replay mode, for a call with no recording; a
+                replay run must never fall back to a live or synthetic result
+        """
+        if tool_name not in self.backends:
+            return {"error": f"Unknown tool: {tool_name}"}
+
+        if self.fixtures is not None and self.fixtures.mode == "replay":
+            return self.fixtures.load(tool_name, tool_input)
+
+        if self.cache is not None:
+            cached = self.cache.get(tool_name, tool_input, None)
+            if cached is not None:
+                return cached
+
+        result = self._execute_live(tool_name, tool_input)
+        if not is_error_result(result):
+            if self.cache is not None:
+                self.cache.put(tool_name, tool_input, result)
+            if self.fixtures is not None:
+                self.fixtures.save(tool_name, tool_input, result)
+        return result
+
+    def execute_many(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """
+        Execute many tool calls concurrently
+
+        Identical calls (same tool and normalized arguments) run once. Each
+        tool's concurrency limit still applies, so a large batch cannot flood
+        a single upstream.
+
+        Args:
+            calls: (tool_name, tool_input) pairs
+
+        Returns:
+            Results aligned with ``calls``
+        """
+        unique: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        keys = []
+        for tool_name, tool_input in calls:
+            key = tool_call_key(tool_name, tool_input)
+            unique.setdefault(key, (tool_name, tool_input))
+            keys.append(key)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {key: pool.submit(self.execute_tool, *call) for key, call in unique.items()}
+            results = {key: future.result() for key, future in futures.items()}
+        return [results[key] for key in keys]
+
+    def summary(self) -> Dict[str, Any]:
+        """Call, retry and cache metrics for the run"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        if self.cache is not None:
+            stats["cache"] = self.cache.summary()
+        if self.fixtures is not None:
+            stats["fixtures"] = dict(self.fixtures.stats)
+        return stats
+
+
+def is_error_result(result: Any) -> bool:
+    """True for empty results and the error payloads returned by failed searches"""
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list):
+        return not result or any(isinstance(r, dict) and "error" in r for r in result)
+    return not result
@@ -1,4 +1,5 @@
 # synthetic_data_kit/utils/__init__.py
 from .chunker import chunk_text
+from .json_parser import extract_json, extract_json_list, get_parse_stats, reset_parse_stats
 
-__all__ = ['chunk_text']
\ No newline at end of file
+__all__ = ['chunk_text', 'extract_json', 'extract_json_list', 'get_parse_stats', 'reset_parse_stats']
\ No newline at end of file
@@ -0,0 +1,132 @@
+# synthetic_data_kit/utils/checkpoint.py
+"""Append-only JSONL checkpoint journals for crash-safe, resumable stages.
+
+Each completed unit of paid work (a chunk's generation, a judge batch) is
+written as one ``{"key": ..., "value": ...}`` line and fsynced before moving
+on. A resumed run replays recorded keys instead of calling the model again.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable hash of JSON-serialisable parts, used as a journal key"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class CheckpointJournal:
+    """Append-only, fsynced JSONL journal keyed by content hash"""
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries: Dict[str, Any] = {}
+        self.replayed = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+        if resume and self.path.exists():
+            # Cut a torn tail off so the next record starts on a line of its own
+            good_end = self._load()
+            needs_newline = False
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+                if good_end > 0:
+                    f.seek(good_end - 1)
+                    needs_newline = f.read(1) != b"\n"
+            self._file = open(self.path, "a", encoding="utf-8")
+            if needs_newline:
+                self._file.write("\n")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def _load(self) -> int:
+        """Read every intact entry; returns the byte offset just past the last one"""
+        good_end = 0
+        offset = 0
+        with open(self.path, "rb") as f:
+            for raw in f:
+                offset += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line.decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    # Torn line from a crash mid-write
+                    continue
+                self.entries[entry["key"]] = entry["value"]
+                good_end = offset
+        return good_end
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the recorded value for key, counting it as a replay"""
+        if key not in self.entries:
+            return default
+        with self._lock:
+            self.replayed += 1
+        return self.entries[key]
+
+    def record(self, key: str, value: Any):
+        """Append a completed unit of work and fsync it to disk"""
+        line = json.dumps({"key": key, "value": value}, ensure_ascii=False)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entries[key] = value
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+
+class JournalSet:
+    """One journal per pipeline stage under a shared checkpoint directory"""
+
+    def __init__(self, checkpoint_dir: str, stages: Iterable[str], resume: bool = False):
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.journals = {
+            stage: CheckpointJournal(self.checkpoint_dir / f"{stage}.jsonl", resume=resume)
+            for stage in stages
+        }
+
+    def __getitem__(self, stage: str) -> CheckpointJournal:
+        return self.journals[stage]
+
+    def get(self, stage: str) -> Optional[CheckpointJournal]:
+        return self.journals.get(stage)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {
+            stage: {"replayed": j.replayed, "recorded": j.recorded}
+            for stage, j in self.journals.items()
+        }
+
+    def close(self):
+        for journal in self.journals.values():
+            journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
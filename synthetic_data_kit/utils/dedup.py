@@ -0,0 +1,205 @@
+# synthetic_data_kit/utils/dedup.py
+"""Streaming exact and near-duplicate filtering for generated pairs.
+
+Exact duplicates are caught by a hash of the normalized question. Near
+duplicates are caught with character-shingle MinHash signatures bucketed by
+LSH bands, so each lookup only compares against a handful of candidates and
+the filter stays fast at millions of pairs.
+"""
+import hashlib
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_PRIME = np.uint64((1 << 31) - 1)
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+# Texts hashed per vectorized pass in PairDeduplicator.filter
+_SIGNATURE_BLOCK = 1024
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = _NON_WORD_RE.sub(" ", (text or "").lower())
+    return " ".join(text.split())
+
+
+def exact_key(text: str) -> bytes:
+    """Compact digest of the normalized text"""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).digest()
+
+
+class MinHasher:
+    """Character-shingle MinHash with a fixed seed, stable across runs"""
+
+    def __init__(self, num_perm: int = 32, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=(num_perm, 1)).astype(np.uint64)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """
+        MinHash signatures for many texts in one vectorized pass
+
+        Shingles are rolling hashes over the UTF-8 bytes of the normalized
+        text; texts shorter than a shingle are padded to one shingle.
+
+        Returns:
+            uint32 array of shape (len(texts), num_perm)
+        """
+        k = self.shingle_size
+        encoded = [normalize_text(t).encode("utf-8").ljust(k, b"\0") for t in texts]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+        n = len(data) - k + 1
+        hashes = np.zeros(n, dtype=np.uint64)
+        for j in range(k):
+            hashes = hashes * np.uint64(257) + data[j:j + n]
+
+        # Keep only shingles that do not straddle two texts
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        segment = np.repeat(np.arange(len(encoded)), lengths)[:n]
+        valid = (np.arange(n) - starts[segment]) <= (lengths[segment] - k)
+        hashes = hashes[valid] % _PRIME
+
+        counts = lengths - k + 1
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        permuted = (self._a * hashes[np.newaxis, :] + self._b) % _PRIME
+        return np.minimum.reduceat(permuted, offsets, axis=1).T.astype(np.uint32)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature as a uint32 vector of length ``num_perm``"""
+        return self.signatures([text])[0]
+
+
+class PairDeduplicator:
+    """Streaming duplicate filter over a text field of generated pairs"""
+
+    def __init__(self, near_threshold: float = 0.8, num_perm: int = 32, bands: int = 8,
+                 shingle_size: int = 5, field: str = "question"):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.near_threshold = near_threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.field = field
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+
+        self._exact = set()
+        self._buckets: List[Dict[int, Any]] = [dict() for _ in range(bands)]
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.stats = {"seen": 0, "exact": 0, "near": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["PairDeduplicator"]:
+        """Build a deduplicator from the ``dedup`` config section, or None if disabled"""
+        dedup_cfg = config.get("dedup", {})
+        if not dedup_cfg.get("enabled", False):
+            return None
+        return cls(
+            near_threshold=dedup_cfg.get("near_threshold", 0.8),
+            num_perm=dedup_cfg.get("num_perm", 32),
+            bands=dedup_cfg.get("bands", 8),
+            shingle_size=dedup_cfg.get("shingle_size", 5),
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        return [
+            hash(signature[b * self.rows:(b + 1) * self.rows].tobytes())
+            for b in range(self.bands)
+        ]
+
+    def _find_near(self, signature: np.ndarray, band_keys: List[int]) -> bool:
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            hit = self._buckets[band].get(key)
+            if hit is None:
+                continue
+            if isinstance(hit, list):
+                candidates.update(hit)
+            else:
+                candidates.add(hit)
+        if not candidates:
+            return False
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[ids] == signature).mean(axis=1)
+        return bool(similarity.max() >= self.near_threshold)
+
+    def _add(self, signature: np.ndarray, band_keys: List[int]):
+        idx = self._count
+        if idx >= len(self._signatures):
+            grown = np.zeros((len(self._signatures) * 2, self._signatures.shape[1]), dtype=np.uint32)
+            grown[:idx] = self._signatures
+            self._signatures = grown
+        self._signatures[idx] = signature
+        self._count += 1
+
+        for band, key in enumerate(band_keys):
+            bucket = self._buckets[band]
+            hit = bucket.get(key)
+            if hit is None:
+                bucket[key] = idx
+            elif isinstance(hit, list):
+                hit.append(idx)
+            else:
+                bucket[key] = [hit, idx]
+
+    def add_signature(self, signature: np.ndarray):
+        """Register a precomputed signature (e.g. loaded from an index) without checking it"""
+        with self._lock:
+            self._add(signature, self._band_keys(signature))
+
+    def _check(self, text: str, signature: np.ndarray) -> Optional[str]:
+        key = exact_key(text)
+        band_keys = self._band_keys(signature)
+
+        with self._lock:
+            self.stats["seen"] += 1
+            if key in self._exact:
+                self.stats["exact"] += 1
+                return "exact"
+            self._exact.add(key)
+            if self._find_near(signature, band_keys):
+                self.stats["near"] += 1
+                return "near"
+            self._add(signature, band_keys)
+            return None
+
+    def check(self, text: str) -> Optional[str]:
+        """
+        Check text against everything seen so far, remembering it if new
+
+        Returns:
+            "exact", "near", or None if the text is novel
+        """
+        return self._check(text, self.hasher.signature(text))
+
+    def filter(self, pairs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Drop duplicate pairs, keyed on ``field``
+
+        Returns:
+            (kept pairs, {"total", "exact", "near"} counts for this call)
+        """
+        kept = []
+        counts = {"total": len(pairs), "exact": 0, "near": 0}
+        for start in range(0, len(pairs), _SIGNATURE_BLOCK):
+            block = pairs[start:start + _SIGNATURE_BLOCK]
+            texts = [str(pair.get(self.field, "")) for pair in block]
+            signatures = self.hasher.signatures(texts)
+            for pair, text, signature in zip(block, texts, signatures):
+                verdict = self._check(text, signature)
+                if verdict is None:
+                    kept.append(pair)
+                else:
+                    counts[verdict] += 1
+        return kept, counts
@@ -0,0 +1,209 @@
+# synthetic_data_kit/utils/json_parser.py
+"""Tolerant JSON extraction for model responses.
+
+Model output is often wrapped in markdown fences, surrounded by prose, or cut
+off at ``max_tokens``. ``extract_json`` recovers as much as it can instead of
+failing the whole response, and counts which recovery path was taken.
+"""
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*[ \t]*\n?(.*?)(?:```|\Z)", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+
+# How many candidate start brackets to try before giving up on prose
+_MAX_CANDIDATES = 20
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(path: str, n: int = 1):
+    with _stats_lock:
+        _stats[path] += n
+
+
+def get_parse_stats() -> Dict[str, int]:
+    """Return a copy of the recovery-path counters"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_parse_stats():
+    """Reset the recovery-path counters"""
+    with _stats_lock:
+        _stats.clear()
+
+
+def strip_code_fences(text: str) -> str:
+    """Return the body of the first markdown code fence, or the text unchanged"""
+    match = _FENCE_RE.search(text)
+    if match:
+        return match.group(1).strip()
+    return text
+
+
+def _loads(text: str) -> Tuple[bool, Any]:
+    try:
+        return True, json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return False, None
+
+
+def _scan(text: str, start: int) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+    """
+    Bracket-balanced scan from ``text[start]`` (an opening bracket).
+
+    Returns:
+        (end, items) where ``end`` is the index of the matching close bracket
+        (None if the value is truncated) and ``items`` are the spans of every
+        complete top-level element seen inside it.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    item_start = None
+    items = []
+
+    for i in range(start, len(text)):
+        ch = text[i]
+
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                if depth == 1 and item_start is not None:
+                    items.append((item_start, i + 1))
+                    item_start = None
+            continue
+
+        if ch == '"':
+            in_string = True
+            if depth == 1:
+                item_start = i
+        elif ch in "[{":
+            depth += 1
+            if depth == 2:
+                item_start = i
+        elif ch in "]}":
+            depth -= 1
+            if depth == 1 and item_start is not None:
+                items.append((item_start, i + 1))
+                item_start = None
+            elif depth == 0:
+                return i, items
+
+    return None, items
+
+
+def _salvage_items(text: str, items: List[Tuple[int, int]]) -> List[Any]:
+    salvaged = []
+    for s, e in items:
+        ok, value = _loads(text[s:e])
+        if not ok:
+            ok, value = _loads(_TRAILING_COMMA_RE.sub(r"\1", text[s:e]))
+        if ok:
+            salvaged.append(value)
+    return salvaged
+
+
+def extract_json(text: str, expect: Optional[str] = None, default: Any = None) -> Any:
+    """
+    Extract a JSON value from raw model output.
+
+    Recovery paths, tried in order: direct parse, code-fence stripping,
+    bracket-balanced extraction from surrounding prose, trailing-comma repair,
+    and salvaging every complete element of a truncated or damaged array.
+
+    Args:
+        text: Raw model output
+        expect: "array" or "object" to prefer that kind of value, or None
+        default: Returned when nothing can be recovered
+
+    Returns:
+        Parsed JSON value, or ``default``
+    """
+    if not text or not text.strip():
+        _count("empty")
+        return default
+
+    text = text.strip()
+    ok, value = _loads(text)
+    if ok:
+        _count("direct")
+        return value
+
+    unfenced = strip_code_fences(text)
+    if unfenced != text:
+        ok, value = _loads(unfenced)
+        if ok:
+            _count("fence_stripped")
+            return value
+        text = unfenced
+
+    openers = {"array": "[", "object": "{"}.get(expect, "[{")
+    best_salvage = None
+    truncated_outer = False
+    skip_until = -1
+    tried = 0
+
+    for start, ch in enumerate(text):
+        if ch not in openers and not (truncated_outer and ch == "["):
+            continue
+        if start <= skip_until:
+            continue
+        tried += 1
+        if tried > _MAX_CANDIDATES:
+            break
+
+        end, items = _scan(text, start)
+
+        # Inside an unclosed outer value, closed inner values are fragments
+        # of it, so only array elements may still be salvaged
+        if end is not None and not truncated_outer:
+            candidate = text[start:end + 1]
+            ok, value = _loads(candidate)
+            if ok:
+                _count("prose_stripped" if (start > 0 or end < len(text) - 1) else "direct")
+                return value
+            ok, value = _loads(_TRAILING_COMMA_RE.sub(r"\1", candidate))
+            if ok:
+                _count("comma_repaired")
+                return value
+            # Values nested in a damaged one are not answers on their own
+            skip_until = end
+
+        # Truncated or damaged array: keep every element that parses on its own
+        if ch == "[" and items:
+            salvaged = _salvage_items(text, items)
+            if salvaged and (best_salvage is None or len(salvaged) > len(best_salvage)):
+                best_salvage = salvaged
+            if end is None:
+                break
+        if end is None:
+            # Everything after an unclosed opener belongs to it
+            truncated_outer = True
+
+    if best_salvage is not None:
+        _count("salvaged_partial")
+        _count("salvaged_items", len(best_salvage))
+        return best_salvage
+
+    _count("failed")
+    return default
+
+
+def extract_json_list(text: str) -> List[Any]:
+    """Extract a JSON array from model output, wrapping a lone object; [] on failure"""
+    value = extract_json(text)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        return [value]
+    return value
@@ -0,0 +1,112 @@
+# synthetic_data_kit/utils/json_repair.py
+"""Cheap repair pass for model output that still fails to parse.
+
+Only the broken output is sent, never the source chunk, so a repair call costs
+a fraction of re-running the original prompt.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from synthetic_data_kit.providers.bedrock_provider import BedrockProvider
+from synthetic_data_kit.utils.json_parser import extract_json
+
+DEFAULT_REPAIR_PROMPT = """The text below was meant to be valid JSON matching this schema:
+{schema}
+
+Fix it so it is valid JSON matching the schema. Keep every value exactly as written,
+drop any item that is cut off or cannot be fixed, and add nothing new.
+Return ONLY the JSON (no markdown, no explanations).
+
+Broken output:
+{text}"""
+
+# Expected shapes for the repair prompt
+QA_SCHEMA = '[{"question": "string", "answer": "string"}]'
+COT_SCHEMA = '[{"question": "string", "reasoning": "string", "answer": "string"}]'
+QUERIES_SCHEMA = '["question string", "..."]'
+TOOL_BATCH_SCHEMA = ('[{"id": "q0", "tool": "tool_name", "arguments": {"query": "string"}, '
+                     '"tool_result": "string", "final_answer": "string"}]')
+RATING_SCHEMA = ('[{"id": "p0", "accuracy": int, "relevance": int, '
+                 '"clarity": int, "usefulness": int, "combined_score": int}]')
+TOOL_USE_RATING_SCHEMA = ('[{"id": "p0", "tool_choice": int, "argument_quality": int, '
+                          '"grounding": int, "combined_score": int}]')
+
+
+class JSONRepairer:
+    """Asks a small model to turn malformed output into valid JSON"""
+
+    def __init__(self, provider: BedrockProvider, prompt: str = DEFAULT_REPAIR_PROMPT,
+                 max_attempts: int = 1, max_total_attempts: Optional[int] = None,
+                 max_tokens: int = 4096, max_input_chars: int = 20000):
+        self.provider = provider
+        self.prompt = prompt
+        self.max_attempts = max_attempts
+        self.max_total_attempts = max_total_attempts
+        self.max_tokens = max_tokens
+        self.max_input_chars = max_input_chars
+        self.stats = {"attempts": 0, "repaired": 0, "failed": 0, "skipped_budget": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["JSONRepairer"]:
+        """Build a repairer from the ``repair`` config section, or None if disabled"""
+        repair_cfg = config.get("repair", {})
+        if not repair_cfg.get("enabled", False):
+            return None
+
+        provider = BedrockProvider(
+            model_id=repair_cfg.get("model", config["bedrock"]["model"]),
+            region=repair_cfg.get("region", config["bedrock"]["region"]),
+        )
+        return cls(
+            provider,
+            prompt=config.get("prompts", {}).get("json_repair", DEFAULT_REPAIR_PROMPT),
+            max_attempts=repair_cfg.get("max_attempts", 1),
+            max_total_attempts=repair_cfg.get("max_total_attempts"),
+            max_tokens=repair_cfg.get("max_tokens", 4096),
+        )
+
+    def _take_attempt(self) -> bool:
+        with self._lock:
+            if self.max_total_attempts is not None and self.stats["attempts"] >= self.max_total_attempts:
+                self.stats["skipped_budget"] += 1
+                return False
+            self.stats["attempts"] += 1
+            return True
+
+    def repair(self, broken_text: str, schema: str, expect: Optional[str] = "array") -> Any:
+        """
+        Repair malformed JSON output
+
+        Args:
+            broken_text: Raw model output that failed to parse
+            schema: Short description of the expected JSON shape
+            expect: "array" or "object", passed to the extractor
+
+        Returns:
+            Parsed JSON value, or None if every attempt failed
+        """
+        if not broken_text or not broken_text.strip():
+            return None
+
+        prompt = self.prompt.format(schema=schema, text=broken_text[:self.max_input_chars])
+
+        for _ in range(self.max_attempts):
+            if not self._take_attempt():
+                return None
+
+            response = self.provider.generate(prompt, temperature=0.0, max_tokens=self.max_tokens)
+
+            text_output = ""
+            if "content" in response and len(response["content"]) > 0:
+                text_output = response["content"][0]["text"]
+
+            parsed = extract_json(text_output, expect=expect)
+            if parsed is not None and parsed != []:
+                with self._lock:
+                    self.stats["repaired"] += 1
+                return parsed
+
+        with self._lock:
+            self.stats["failed"] += 1
+        return None
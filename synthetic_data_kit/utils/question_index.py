@@ -0,0 +1,170 @@
+# synthetic_data_kit/utils/question_index.py
+"""Persistent index of already-curated questions, one per source document.
+
+Each document is stored as a compressed ``.npz`` of MinHash signatures and
+chunk ids, plus a ``.jsonl`` of question text used for negative examples.
+``Generator`` uses it to skip saturated chunks, to seed its duplicate filter,
+and to tell the model which questions it has already asked.
+"""
+import glob
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from synthetic_data_kit.utils.dedup import MinHasher, PairDeduplicator
+
+
+def chunk_id(chunk: str) -> str:
+    """Short stable id for a chunk, stored on generated pairs"""
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def group_by_source(pairs: List[Dict[str, Any]], default: str = "combined") -> Dict[str, List[Dict[str, Any]]]:
+    """Pairs grouped by the source document they were generated from"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for pair in pairs:
+        groups.setdefault(pair.get("source_pdf") or default, []).append(pair)
+    return groups
+
+
+class _DocIndex:
+    def __init__(self, num_perm: int):
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self.chunk_ids = np.zeros(0, dtype=np.uint64)
+        self.questions: List[str] = []
+        self.dirty = False
+
+
+class QuestionIndex:
+    """On-disk index of previously curated questions per source document"""
+
+    def __init__(self, index_dir: str = "data/index", num_perm: int = 32, shingle_size: int = 5):
+        self.index_dir = index_dir
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self._docs: Dict[str, _DocIndex] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["QuestionIndex"]:
+        """Build an index from the ``index`` config section, or None if disabled"""
+        index_cfg = config.get("index", {})
+        if not index_cfg.get("enabled", False):
+            return None
+        dedup_cfg = config.get("dedup", {})
+        return cls(
+            index_dir=index_cfg.get("dir", "data/index"),
+            num_perm=dedup_cfg.get("num_perm", 32),
+            shingle_size=dedup_cfg.get("shingle_size", 5),
+        )
+
+    def _paths(self, doc: str):
+        base = os.path.join(self.index_dir, doc)
+        return base + ".npz", base + ".questions.jsonl"
+
+    def _load(self, doc: str) -> _DocIndex:
+        if doc in self._docs:
+            return self._docs[doc]
+
+        entry = _DocIndex(self.hasher.num_perm)
+        npz_path, questions_path = self._paths(doc)
+        if os.path.exists(npz_path) and os.path.exists(questions_path):
+            with open(questions_path, "r", encoding="utf-8") as f:
+                entry.questions = [json.loads(line) for line in f if line.strip()]
+            data = np.load(npz_path)
+            entry.chunk_ids = data["chunk_ids"]
+            same_params = (
+                int(data["num_perm"]) == self.hasher.num_perm
+                and int(data["shingle_size"]) == self.hasher.shingle_size
+            )
+            if same_params:
+                entry.signatures = data["signatures"]
+            else:
+                # Dedup settings changed since the index was written
+                entry.signatures = self.hasher.signatures(entry.questions)
+                entry.dirty = True
+
+        self._docs[doc] = entry
+        return entry
+
+    def __len__(self) -> int:
+        return sum(len(entry.questions) for entry in self._docs.values())
+
+    def documents(self) -> List[str]:
+        """Names of every document with an index on disk"""
+        paths = glob.glob(os.path.join(self.index_dir, "*.npz"))
+        return sorted(os.path.basename(p)[:-len(".npz")] for p in paths)
+
+    def add(self, doc: str, pairs: List[Dict[str, Any]]):
+        """Add curated pairs for a document (call ``save`` to persist)"""
+        questions = [str(p.get("question", "")) for p in pairs if p.get("question")]
+        if not questions:
+            return
+        ids = np.fromiter(
+            (int(p.get("chunk_id") or "0", 16) for p in pairs if p.get("question")),
+            dtype=np.uint64,
+            count=len(questions),
+        )
+
+        entry = self._load(doc)
+        entry.signatures = np.vstack([entry.signatures, self.hasher.signatures(questions)])
+        entry.chunk_ids = np.concatenate([entry.chunk_ids, ids])
+        entry.questions.extend(questions)
+        entry.dirty = True
+
+    def save(self, doc: Optional[str] = None):
+        """Write one document's index (or every modified one) to disk"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        docs = [doc] if doc is not None else list(self._docs)
+        for name in docs:
+            entry = self._docs.get(name)
+            if entry is None or not entry.dirty:
+                continue
+            npz_path, questions_path = self._paths(name)
+            np.savez_compressed(
+                npz_path,
+                signatures=entry.signatures,
+                chunk_ids=entry.chunk_ids,
+                num_perm=self.hasher.num_perm,
+                shingle_size=self.hasher.shingle_size,
+            )
+            with open(questions_path, "w", encoding="utf-8") as f:
+                for question in entry.questions:
+                    f.write(json.dumps(question, ensure_ascii=False) + "\n")
+            entry.dirty = False
+
+    def build_from_curated(self, curated_dir: str = "data/curated") -> int:
+        """
+        Index every ``<name>_<type>_curated.json`` file; returns pairs added
+
+        Pairs are indexed under their ``source_pdf``, falling back to the file's name.
+        """
+        added = 0
+        for path in sorted(glob.glob(os.path.join(curated_dir, "*_curated.json"))):
+            name = os.path.basename(path)[:-len("_curated.json")]
+            with open(path, "r", encoding="utf-8") as f:
+                pairs = json.load(f)
+            for doc, doc_pairs in group_by_source(pairs, default=name.rsplit("_", 1)[0]).items():
+                self.add(doc, doc_pairs)
+            added += len(pairs)
+        self.save()
+        return added
+
+    def chunk_coverage(self, doc: str, chunk: str) -> int:
+        """Number of indexed questions generated from this exact chunk"""
+        entry = self._load(doc)
+        return int(np.count_nonzero(entry.chunk_ids == np.uint64(int(chunk_id(chunk), 16))))
+
+    def negative_examples(self, doc: str, chunk: str, limit: int = 5, max_chars: int = 120) -> List[str]:
+        """Short already-asked questions for this chunk, to steer the model elsewhere"""
+        entry = self._load(doc)
+        matches = np.flatnonzero(entry.chunk_ids == np.uint64(int(chunk_id(chunk), 16)))
+        return [entry.questions[i][:max_chars] for i in matches[-limit:]]
+
+    def seed(self, doc: str, deduplicator: PairDeduplicator) -> int:
+        """Register a document's indexed questions with a duplicate filter"""
+        entry = self._load(doc)
+        for signature in entry.signatures:
+            deduplicator.add_signature(signature)
+        return len(entry.signatures)
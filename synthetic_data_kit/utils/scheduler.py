@@ -0,0 +1,298 @@
+# synthetic_data_kit/utils/scheduler.py
+"""Dependency-aware task scheduling on a shared bounded worker pool.
+
+Each task names the step it belongs to and the futures it depends on. A task
+is handed to the pool only once all of its dependencies have finished, so no
+worker ever blocks waiting on another and many small per-item DAGs can share
+one pool without deadlocking.
+
+PriorityScheduler is such a pool shared by every task type in a run, with a
+global concurrency limit, priorities between task types and fair sharing
+among task types of equal priority.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class DependencyFailed(Exception):
+    """Raised for a task whose upstream dependency failed"""
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class DAGScheduler:
+    """Runs tasks once their dependencies resolve, recording per-step latency"""
+
+    def __init__(self, max_workers: int = 8, executor: Optional[Executor] = None):
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def submit(self, step: str, fn: Callable[..., Any], *deps: Future) -> Future:
+        """
+        Schedule ``fn(*dep_results)`` to run after every dependency succeeds
+
+        Args:
+            step: Step name used for latency stats
+            fn: Callable receiving the dependency results positionally
+            deps: Futures this task depends on
+
+        Returns:
+            Future for the task's result; it fails with DependencyFailed,
+            caused by the upstream error, if any dependency failed
+        """
+        result = Future()
+        remaining = [len(deps)]
+        remaining_lock = threading.Lock()
+
+        def run():
+            if not result.set_running_or_notify_cancel():
+                return
+            start = time.perf_counter()
+            try:
+                value = fn(*[d.result() for d in deps])
+            except BaseException as e:
+                result.set_exception(e)
+            else:
+                result.set_result(value)
+            finally:
+                with self._lock:
+                    self.latencies[step].append(time.perf_counter() - start)
+
+        def launch():
+            failed = next((d for d in deps if d.exception() is not None), None)
+            if failed is not None:
+                error = DependencyFailed(f"{step}: upstream failed: {failed.exception()}")
+                error.__cause__ = failed.exception()
+                result.set_exception(error)
+                return
+            self._executor.submit(run)
+
+        def on_dep_done(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                launch()
+
+        if not deps:
+            launch()
+        for dep in deps:
+            dep.add_done_callback(on_dep_done)
+        return result
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean, p50, p95 and max latency in seconds for each step"""
+        with self._lock:
+            snapshot = {step: sorted(values) for step, values in self.latencies.items()}
+        return {
+            step: {
+                "count": len(values),
+                "mean": round(sum(values) / len(values), 3),
+                "p50": round(_percentile(values, 50), 3),
+                "p95": round(_percentile(values, 95), 3),
+                "max": round(values[-1], 3),
+            }
+            for step, values in snapshot.items()
+            if values
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
+
+
+class _Lane:
+    """Queue and fair-share state of one task type"""
+
+    def __init__(self, name: str, priority: int, weight: float):
+        self.name = name
+        self.priority = priority
+        self.weight = float(weight)
+        self.queue: deque = deque()
+        # Stride scheduling: a lane's pass grows by 1/weight per dispatched task
+        self.pass_value = 0.0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "max_queued": 0,
+                      "wait_seconds": 0.0, "busy_seconds": 0.0}
+
+
+class LaneExecutor(Executor):
+    """Executor view of one lane of a PriorityScheduler; shutting it down leaves the scheduler running"""
+
+    def __init__(self, scheduler: "PriorityScheduler", name: str):
+        self._scheduler = scheduler
+        self.name = name
+        # Lets callers that size a window of in-flight work from max_workers use the whole quota
+        self.max_workers = scheduler.max_concurrency
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self._scheduler.submit_to(self.name, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        pass
+
+
+class PriorityScheduler(Executor):
+    """
+    One bounded worker pool shared by every task type
+
+    Each task type submits to its own lane. A free worker takes the next
+    task from the highest-priority lane with queued work (lower number
+    first), so, for example, judge tasks run ahead of new generation and the
+    backlog of unjudged pairs stays small. Lanes of equal priority share
+    workers in proportion to their weights. A worker never idles while any
+    lane has work, so ``max_concurrency`` requests are in flight for as long
+    as there is anything to do.
+
+    Tasks must not wait on other tasks of the same scheduler, or every
+    worker can end up waiting.
+    """
+
+    def __init__(self, max_concurrency: int = 16, lanes: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.max_concurrency = max_concurrency
+        self._lanes: Dict[str, _Lane] = {}
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._running = 0
+        self._started = time.monotonic()
+        for name, lane_cfg in (lanes or {}).items():
+            self._add_lane(name, lane_cfg.get("priority", 1), lane_cfg.get("weight", 1.0))
+        self._workers = [
+            threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True)
+            for i in range(max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["PriorityScheduler"]:
+        """Scheduler for the ``scheduler`` config section, or None if disabled"""
+        sched_cfg = config.get("scheduler", {})
+        if not sched_cfg.get("enabled", False):
+            return None
+        return cls(max_concurrency=sched_cfg.get("max_concurrency", 16), lanes=sched_cfg.get("lanes", {}))
+
+    def _add_lane(self, name: str, priority: int = 1, weight: float = 1.0) -> _Lane:
+        if weight <= 0:
+            raise ValueError(f"Lane {name} needs a positive weight")
+        lane = _Lane(name, priority, weight)
+        self._lanes[name] = lane
+        return lane
+
+    def lane(self, name: str) -> LaneExecutor:
+        """Executor submitting to lane ``name``; unconfigured lanes get priority 1, weight 1"""
+        with self._cond:
+            if name not in self._lanes:
+                self._add_lane(name)
+        return LaneExecutor(self, name)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self.submit_to("default", fn, *args, **kwargs)
+
+    def submit_to(self, lane_name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new tasks after shutdown")
+            lane = self._lanes.get(lane_name) or self._add_lane(lane_name)
+            if not lane.queue:
+                # A lane that was idle starts level with the busiest competitor instead of catching up
+                active = [other.pass_value for other in self._lanes.values()
+                          if other.queue and other.priority == lane.priority]
+                lane.pass_value = max([lane.pass_value] + active)
+            lane.queue.append((future, fn, args, kwargs, time.monotonic()))
+            lane.stats["submitted"] += 1
+            lane.stats["max_queued"] = max(lane.stats["max_queued"], len(lane.queue))
+            self._cond.notify()
+        return future
+
+    def _next(self) -> Optional[Tuple[_Lane, Any]]:
+        """Highest-priority lane with work, lowest pass within that priority; call with the lock held"""
+        ready = [lane for lane in self._lanes.values() if lane.queue]
+        if not ready:
+            return None
+        top = min(lane.priority for lane in ready)
+        lane = min((lane for lane in ready if lane.priority == top), key=lambda lane: lane.pass_value)
+        lane.pass_value += 1.0 / lane.weight
+        return lane, lane.queue.popleft()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                picked = self._next()
+                while picked is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    picked = self._next()
+                self._running += 1
+            lane, (future, fn, args, kwargs, queued_at) = picked
+
+            start = time.monotonic()
+            failed = False
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    failed = True
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            with self._cond:
+                self._running -= 1
+                lane.stats["completed"] += 1
+                lane.stats["failed"] += int(failed)
+                lane.stats["wait_seconds"] += start - queued_at
+                lane.stats["busy_seconds"] += time.monotonic() - start
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-lane task counts and times, and the share of worker time spent busy"""
+        with self._cond:
+            elapsed = time.monotonic() - self._started
+            busy = sum(lane.stats["busy_seconds"] for lane in self._lanes.values())
+            return {
+                "max_concurrency": self.max_concurrency,
+                "utilization": round(busy / (elapsed * self.max_concurrency), 3) if elapsed > 0 else 0.0,
+                "lanes": {
+                    name: {
+                        "priority": lane.priority,
+                        "weight": lane.weight,
+                        "submitted": lane.stats["submitted"],
+                        "completed": lane.stats["completed"],
+                        "failed": lane.stats["failed"],
+                        "max_queued": lane.stats["max_queued"],
+                        "mean_wait": round(lane.stats["wait_seconds"] / lane.stats["completed"], 3)
+                        if lane.stats["completed"] else 0.0,
+                        "busy_seconds": round(lane.stats["busy_seconds"], 3),
+                    }
+                    for name, lane in self._lanes.items()
+                },
+            }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for lane in self._lanes.values():
+                    while lane.queue:
+                        lane.queue.popleft()[0].cancel()
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
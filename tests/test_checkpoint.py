@@ -0,0 +1,80 @@
+import json
+
+from main import load_config
+from synthetic_data_kit.curate.judge import QualityCurator
+from synthetic_data_kit.utils.checkpoint import CheckpointJournal
+
+
+def test_resume_after_torn_tail_keeps_new_records(tmp_path):
+    path = tmp_path / "qa.jsonl"
+    journal = CheckpointJournal(path)
+    journal.record("a", 1)
+    journal.close()
+    # Crash halfway through writing the next record
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "b", "va')
+
+    journal = CheckpointJournal(path, resume=True)
+    assert dict(journal.entries) == {"a": 1}
+    journal.record("c", 3)
+    journal.close()
+
+    journal = CheckpointJournal(path, resume=True)
+    assert dict(journal.entries) == {"a": 1, "c": 3}
+    journal.close()
+
+
+def test_resume_after_record_missing_its_newline(tmp_path):
+    path = tmp_path / "qa.jsonl"
+    path.write_text('{"key": "a", "value": 1}', encoding="utf-8")
+
+    journal = CheckpointJournal(path, resume=True)
+    journal.record("b", 2)
+    journal.close()
+
+    assert dict(CheckpointJournal(path, resume=True).entries) == {"a": 1, "b": 2}
+
+
+def test_fresh_run_truncates(tmp_path):
+    path = tmp_path / "qa.jsonl"
+    journal = CheckpointJournal(path)
+    journal.record("a", 1)
+    journal.close()
+
+    journal = CheckpointJournal(path)
+    journal.close()
+    assert dict(CheckpointJournal(path, resume=True).entries) == {}
+
+
+class DroppingJudge:
+    """Rates every pair except the questions in ``drop``"""
+
+    def __init__(self, drop):
+        self.drop = set(drop)
+        self.calls = 0
+
+    def generate(self, prompt, max_tokens=1000, temperature=0.7):
+        self.calls += 1
+        items = json.loads(prompt[prompt.index("[\n"):prompt.rindex("]") + 1])
+        ratings = [{"id": item["id"], "accuracy": 3, "relevance": 3, "clarity": 3, "usefulness": 3}
+                   for item in items if item["question"] not in self.drop]
+        return {"content": [{"type": "text", "text": json.dumps(ratings)}]}
+
+
+def test_partially_rated_batch_is_rated_again_on_resume(tmp_path):
+    config = load_config()
+    config["curate"]["rerate_attempts"] = 0
+    batch = [{"question": "Q1?", "answer": "A"}, {"question": "Q2?", "answer": "A"}]
+    path = tmp_path / "curate_qa.jsonl"
+
+    journal = CheckpointJournal(path)
+    curator = QualityCurator(DroppingJudge(drop=["Q2?"]), config)
+    assert len(curator.rate_batch_checkpointed(batch, journal)) == 1
+    assert journal.recorded == 0
+    journal.close()
+
+    judge = DroppingJudge(drop=[])
+    journal = CheckpointJournal(path, resume=True)
+    assert len(QualityCurator(judge, config).rate_batch_checkpointed(batch, journal)) == 2
+    assert judge.calls == 1 and journal.recorded == 1
+    journal.close()
@@ -0,0 +1,56 @@
+import json
+import sqlite3
+
+import numpy as np
+
+from synthetic_data_kit.curate.analytics import RatingArrays, breakdown
+from synthetic_data_kit.curate.rating_store import RatingStore, pair_hash
+
+
+def rated(document, score):
+    pair = {"question": f"Q{document}{score}?", "answer": "A", "source_pdf": document}
+    return pair, {"accuracy": score, "clarity": 1, "combined_score": score + 1}
+
+
+def test_arrays_group_by_source_document(tmp_path):
+    store = RatingStore(str(tmp_path / "ratings.sqlite"))
+    store.add([rated("a", 3), rated("a", 1), rated("b", 2)], "v1", "combined", "qa")
+    store.add([({"question": "Auto?", "answer": "A"}, {"combined_score": 9.0})], "accept", "combined", "qa",
+              auto_accepted=True)
+
+    arrays = RatingArrays.from_store(store, "v1", accept_version="accept")
+
+    assert sorted(arrays.metrics) == ["accuracy", "clarity", "combined_score"]
+    assert sorted(arrays.combined.tolist()) == [2.0, 3.0, 4.0]
+    assert arrays.auto_accepted == 1
+    rows = {row["source"]: row["count"] for row in breakdown(arrays, threshold=3.0)}
+    assert rows == {"a": 2, "b": 1}
+
+
+def test_older_store_is_backfilled(tmp_path):
+    path = str(tmp_path / "ratings.sqlite")
+    pair, scores = rated("a", 3)
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE pairs (hash TEXT PRIMARY KEY, pair TEXT NOT NULL);
+        CREATE TABLE ratings (
+            pair_hash TEXT NOT NULL, prompt_version TEXT NOT NULL, source TEXT NOT NULL,
+            generation_type TEXT NOT NULL, combined_score REAL, scores TEXT NOT NULL,
+            auto_accepted INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL,
+            PRIMARY KEY (pair_hash, prompt_version)
+        );
+        """
+    )
+    conn.execute("INSERT INTO pairs VALUES (?, ?)", (pair_hash(pair), json.dumps(pair)))
+    conn.execute("INSERT INTO ratings VALUES (?, 'v1', 'combined', 'qa', ?, ?, 0, 0)",
+                 (pair_hash(pair), scores["combined_score"], json.dumps(scores)))
+    conn.commit()
+    conn.close()
+
+    store = RatingStore(path)
+    store.add([rated("b", 1)], "v1", "combined", "qa")
+    arrays = RatingArrays.from_store(store, "v1")
+
+    assert arrays.source_names == ["a", "b"]
+    np.testing.assert_array_equal(arrays.metrics["accuracy"][np.argsort(arrays.sources)], [3.0, 1.0])
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from synthetic_data_kit.tools import ToolExecutor, ToolResultCache, is_error_result
+from synthetic_data_kit.tools import cache as cache_module
+from synthetic_data_kit.tools import tool_executor as executor_module
+
+RESULT = [{"title": "A result", "body": "", "url": "https://example.com"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(executor_module.time, "sleep", delays.append)
+    return delays
+
+
+def flaky_backend(failures):
+    calls = []
+
+    def backend(query, max_results=5):
+        calls.append(query)
+        if len(calls) <= failures:
+            raise ConnectionError("rate limited")
+        return RESULT
+
+    return backend, calls
+
+
+def test_cache_entry_expires_after_ttl(clock):
+    cache = ToolResultCache(":memory:", ttl_seconds=60)
+    cache.put("duckduckgo_search", {"query": "Index  Funds"}, RESULT)
+
+    clock[0] += 59
+    assert cache.get("duckduckgo_search", {"query": "index funds"}) == RESULT
+    clock[0] += 2
+    assert cache.get("duckduckgo_search", {"query": "index funds"}, None) is None
+    assert cache.stats["expired"] == 1
+    assert cache.purge_expired() == 1
+
+
+def test_expired_entry_is_fetched_again(clock, sleeps):
+    backend, calls = flaky_backend(failures=0)
+    executor = ToolExecutor(cache=ToolResultCache(":memory:", ttl_seconds=60),
+                            backends={"duckduckgo_search": backend})
+
+    executor.execute_tool("duckduckgo_search", {"query": "index funds"})
+    executor.execute_tool("duckduckgo_search", {"query": "index funds"})
+    assert len(calls) == 1
+    clock[0] += 61
+    executor.execute_tool("duckduckgo_search", {"query": "index funds"})
+    assert len(calls) == 2
+
+
+def test_retries_with_exponential_backoff(sleeps):
+    backend, calls = flaky_backend(failures=2)
+    executor = ToolExecutor(backends={"duckduckgo_search": backend}, max_retries=3, backoff_base=0.5)
+
+    assert executor.execute_tool("duckduckgo_search", {"query": "index funds"}) == RESULT
+    assert len(calls) == 3
+    assert executor.stats == {"calls": 3, "retries": 2, "failures": 0}
+    # Each delay doubles, with up to 100% jitter on top
+    assert 0.5 <= sleeps[0] < 1.0
+    assert 1.0 <= sleeps[1] < 2.0
+
+
+def test_gives_up_after_max_retries_and_caches_nothing(sleeps):
+    backend, calls = flaky_backend(failures=10)
+    cache = ToolResultCache(":memory:")
+    executor = ToolExecutor(cache=cache, backends={"duckduckgo_search": backend}, max_retries=2)
+
+    result = executor.execute_tool("duckduckgo_search", {"query": "index funds"})
+    assert is_error_result(result)
+    assert len(calls) == 3 and len(sleeps) == 2
+    assert executor.stats["failures"] == 1
+    assert cache.stats["stored"] == 0
+
+
+def test_execute_many_keeps_order_and_runs_repeated_calls_once():
+    lock, in_flight, peak, calls = threading.Lock(), [0], [0], []
+
+    def backend(query, max_results=5):
+        with lock:
+            calls.append(query)
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return [{"title": query, "body": "", "url": ""}]
+
+    executor = ToolExecutor(backends={"duckduckgo_search": backend}, max_concurrency={"duckduckgo_search": 2},
+                            max_workers=8)
+    queries = ["a", "b", "A ", "c", "d", "b", "e"]
+
+    results = executor.execute_many([("duckduckgo_search", {"query": q}) for q in queries])
+
+    assert [r[0]["title"] for r in results] == ["a", "b", "a", "c", "d", "b", "e"]
+    assert sorted(calls) == ["a", "b", "c", "d", "e"]
+    # Eight threads, but never more calls in flight than the tool allows
+    assert peak[0] <= 2
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from synthetic_data_kit.create.tool_use_generator import ToolUseGenerator
+from synthetic_data_kit.tools import FixtureMissing, FixtureStore, ToolExecutor
+
+QUERY = "What recent academic papers discuss index fund fees?"
+
+
+class StubProvider:
+    """Answers each generator prompt from its wording and remembers every prompt"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, max_tokens=1000, temperature=0.7):
+        self.prompts.append(prompt)
+        if "generate 1 questions" in prompt:
+            text = json.dumps([QUERY])
+        elif prompt.startswith("Extract the most relevant search terms"):
+            text = "index fund fees"
+        elif "realistic" in prompt:
+            text = "synthetic search results"
+        else:
+            text = "Fees have fallen according to the papers found."
+        return {"content": [{"type": "text", "text": text}]}
+
+
+def replay_generator(fixture_dir, provider):
+    executor = ToolExecutor(fixtures=FixtureStore(str(fixture_dir), mode="replay"),
+                            backends={"arxiv_search": _no_live_calls, "duckduckgo_search": _no_live_calls})
+    return ToolUseGenerator(provider, tool_executor=executor, max_workers=2)
+
+
+def _no_live_calls(**kwargs):
+    raise AssertionError("replay mode must not call a live backend")
+
+
+def test_replay_serves_recorded_results(tmp_path):
+    recorded = [{"title": "Fees in passive investing", "authors": ["A. Author"], "summary": "Fees fell."}]
+    FixtureStore(str(tmp_path), mode="record").save(
+        "arxiv_search", {"query": "index fund fees", "max_results": 5}, recorded)
+    provider = StubProvider()
+
+    examples = replay_generator(tmp_path, provider).generate_from_chunks(["Index funds charge low fees."], 1)
+
+    assert len(examples) == 1
+    tool_turn = examples[0]["messages"][2]["content"]
+    assert json.loads(tool_turn) == recorded
+    assert not any("realistic" in prompt for prompt in provider.prompts)
+
+
+def test_replay_without_recording_fails_loudly(tmp_path):
+    provider = StubProvider()
+
+    with pytest.raises(FixtureMissing):
+        replay_generator(tmp_path, provider).generate_from_chunks(["Index funds charge low fees."], 1)
+
+    # No synthetic stand-in was requested for the missing result
+    assert not any("realistic" in prompt for prompt in provider.prompts)